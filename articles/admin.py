@@ -1,8 +1,8 @@
 from django.contrib import admin
 from .models import (
-    Topic, Article, Comment, Favorite, Clap, Pin, Follow,
-    Recommendation, Notification, ReadingHistory, TopicFollow,
-    FAQ, Report
+    Topic, Article, Comment, Favorite, Clap, Pin, Follow, AuthorSuggestion,
+    Recommendation, Notification, NotificationArchive, ReadingHistory, TopicFollow,
+    FAQ, Report, MediaBlob, PopularAuthor
 )
 
 
@@ -53,6 +53,19 @@ class FollowAdmin(admin.ModelAdmin):
     list_display_links = ('id', 'follower',)
 
 
+@admin.register(AuthorSuggestion)
+class AuthorSuggestionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'author', 'rank', 'score', 'created_at',)
+    list_display_links = ('id', 'user',)
+
+
+@admin.register(PopularAuthor)
+class PopularAuthorAdmin(admin.ModelAdmin):
+    list_display = ('id', 'period', 'topic', 'rank', 'author', 'reads_count', 'refreshed_at',)
+    list_display_links = ('id', 'author',)
+    list_filter = ('period',)
+
+
 @admin.register(Recommendation)
 class RecommendationAdmin(admin.ModelAdmin):
     list_display = ('id', 'user',)
@@ -65,6 +78,12 @@ class NotificationAdmin(admin.ModelAdmin):
     list_display_links = ('id', 'user',)
 
 
+@admin.register(NotificationArchive)
+class NotificationArchiveAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'message', 'created_at', 'archived_at',)
+    list_display_links = ('id', 'user',)
+
+
 @admin.register(ReadingHistory)
 class ReadingHistoryAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'article',)
@@ -87,3 +106,10 @@ class ReportAdmin(admin.ModelAdmin):
 class FAQAdmin(admin.ModelAdmin):
     list_display = ('id', 'question',)
     list_display_links = ('id', 'question',)
+
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'size', 'refcount', 'updated_at',)
+    list_display_links = ('id', 'name',)
+    readonly_fields = ('name', 'digest', 'size',)
@@ -0,0 +1,69 @@
+"""
+Topic-affinity scoring for the recommended feed.
+
+Users are rows of ``A`` (users × topics, their ``TopicAffinity`` vectors
+scaled to unit length) and candidate articles rows of ``M`` (articles ×
+topics, each article's topics sharing a unit of weight). One product
+``A @ Mᵀ`` scores a whole batch of users against every candidate.
+"""
+from typing import Iterable
+
+import numpy as np
+from scipy import sparse
+
+from articles.models import Article
+from articles.services import TopicAffinity
+
+
+class CandidateSet:
+    """ Candidate articles and their topics as a sparse articles × topics matrix. """
+
+    def __init__(self, article_ids: Iterable[int]):
+        self.article_ids = np.array(list(article_ids), dtype=np.int64)
+        links = np.array(list(Article.topics.through.objects.filter(article_id__in=self.article_ids.tolist())
+                              .values_list('article_id', 'topic_id')), dtype=np.int64).reshape(-1, 2)
+        self.topic_ids, columns = np.unique(links[:, 1], return_inverse=True)
+        order = np.argsort(self.article_ids)
+        rows = order[np.searchsorted(self.article_ids[order], links[:, 0])]
+        matrix = sparse.csr_matrix((np.ones(len(links), dtype=np.float32), (rows, columns)),
+                                   shape=(len(self.article_ids), len(self.topic_ids)))
+        sizes = np.asarray(matrix.sum(axis=1)).ravel()
+        sizes[sizes == 0] = 1
+        self.matrix = (sparse.diags(1 / np.sqrt(sizes)) @ matrix).tocsr()
+
+    def affinity_matrix(self, vectors: list[dict[int, float]]) -> np.ndarray:
+        """ Users × candidate topics, rows scaled to unit length. Topics no candidate has are dropped. """
+        affinity = np.zeros((len(vectors), len(self.topic_ids)), dtype=np.float32)
+        for row, vector in enumerate(vectors):
+            if not vector or not len(self.topic_ids):
+                continue
+            topic_ids = np.fromiter(vector.keys(), dtype=np.int64, count=len(vector))
+            weights = np.fromiter(vector.values(), dtype=np.float32, count=len(vector))
+            columns = np.searchsorted(self.topic_ids, topic_ids).clip(max=len(self.topic_ids) - 1)
+            known = self.topic_ids[columns] == topic_ids
+            affinity[row, columns[known]] = weights[known]
+        norms = np.linalg.norm(affinity, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return affinity / norms
+
+    def score(self, vectors: list[dict[int, float]]) -> np.ndarray:
+        """ Users × candidates scores. """
+        return np.asarray((self.matrix @ self.affinity_matrix(vectors).T).T)
+
+    def rank(self, vectors: list[dict[int, float]]) -> list[list[int]]:
+        """
+        Candidate ids per user, best first. Ties keep the candidates' order,
+        articles scoring below zero (mostly "less" topics) are left out.
+        """
+        scores = self.score(vectors)
+        order = np.argsort(-scores, axis=1, kind='stable')
+        ranked = np.take_along_axis(scores, order, axis=1)
+        return [self.article_ids[row_order[row_scores >= 0]].tolist()
+                for row_order, row_scores in zip(order, ranked)]
+
+
+def rank_feed(user_ids: list[int], article_ids: Iterable[int]) -> dict[int, list[int]]:
+    """ Ranks ``article_ids`` for every user of ``user_ids``. """
+    candidates = CandidateSet(article_ids)
+    vectors = TopicAffinity.get_many(user_ids)
+    return dict(zip(user_ids, candidates.rank([vectors[user_id] for user_id in user_ids])))
@@ -1,7 +1,9 @@
 import django_filters
-from .models import Article, Topic, Recommendation
+from django.conf import settings
+from .affinity import rank_feed
+from .models import Article, Topic
 from django.db.models import Q
-from django.db.models import Count
+from django.db.models import Case, Count, When
 
 class ArticleFilter(django_filters.FilterSet):
     get_top_articles = django_filters.NumberFilter(method='filter_by_top')
@@ -16,20 +18,16 @@ class ArticleFilter(django_filters.FilterSet):
         return queryset.order_by('-views_count')[:value]
 
     def filter_by_recommend(self, queryset, name, value):
+        if not value:
+            return queryset
         user = self.request.user
-        recommendations = Recommendation.objects.filter(user=user)
-        more_topics = recommendations.values_list('more', flat=True)
-        less_topics = recommendations.values_list('less', flat=True)
-
-        followed_topics = user.topic_follows.values_list('id', flat=True)
-
-        if more_topics.exists():
-            queryset = queryset.filter(Q(topics__in=more_topics) | Q(topics__in=followed_topics))
-
-        if less_topics.exists():
-            queryset = queryset.exclude(topics__in=less_topics)
-
-        return queryset
+        candidates = queryset.order_by('-created_at').values_list('id', flat=True)[:settings.TOPIC_AFFINITY_CANDIDATES]
+        ranked = rank_feed([user.id], candidates)[user.id]
+        if not ranked:
+            return queryset.none()
+        return queryset.filter(id__in=ranked).order_by(
+            Case(*[When(id=article_id, then=position) for position, article_id in enumerate(ranked)])
+        )
 
     def filter_by_topic(self, queryset, name, value):
         return queryset.filter(topics__id=value)
@@ -0,0 +1,29 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from articles.services import NotificationArchiveService
+
+
+class Command(BaseCommand):
+    help = "Moves read notifications older than the retention period to the archive table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.NOTIFICATION_RETENTION_DAYS)
+        parser.add_argument('--batch-size', type=int, default=settings.NOTIFICATION_ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=0,
+                            help="Seconds to sleep between batches, to go easy on a busy database.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        partitioned = NotificationArchiveService.is_partitioned()
+
+        archived = 0
+        while moved := NotificationArchiveService.archive_batch(cutoff, options['batch_size'], partitioned):
+            archived += moved
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(f"Archived {archived} notification(s) read before {cutoff:%Y-%m-%d}.")
@@ -0,0 +1,44 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from articles.models import Follow, Notification
+from articles.services import NotificationService
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Creates an author with N synthetic followers, fans a notification out to them and rolls everything back."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--followers', type=int, default=1_000_000)
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        followers = options['followers']
+        batch_size = options['batch_size']
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            author = User.objects.create(username='benchmark-fanout-author')
+            for offset in range(0, followers, 10_000):
+                users = User.objects.bulk_create([
+                    User(username=f'benchmark-fanout-{i}', password='!')
+                    for i in range(offset, min(offset + 10_000, followers))
+                ])
+                Follow.objects.bulk_create([Follow(follower=user, followee=author) for user in users])
+            self.stdout.write(f"Created {followers} followers in {time.perf_counter() - started:.1f}s.")
+
+            report = NotificationService.fan_out(author.id, 'benchmark', 'benchmark:fanout', batch_size)
+            self.stdout.write(f"Fan-out: {report['recipients']} notifications in {report['seconds']:.2f}s, "
+                              f"{report['per_second']:.0f} followers/s")
+
+            # every row collides now, this is the cost of a retried fan-out
+            report = NotificationService.fan_out(author.id, 'benchmark', 'benchmark:fanout', batch_size)
+            self.stdout.write(f"Retry:   {report['followers'] - report['recipients']} duplicates skipped in "
+                              f"{report['seconds']:.2f}s, {report['per_second']:.0f} followers/s")
+            assert Notification.objects.filter(event='benchmark:fanout').count() == followers
+            transaction.set_rollback(True)
@@ -0,0 +1,52 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from articles.affinity import CandidateSet
+from articles.models import Article, ArticleStatus
+from articles.services import TopicAffinity
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Reports how many users per second the topic-affinity engine ranks the recommended feed for."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000,
+                            help="Users to score; the active users in the database are repeated to reach it.")
+        parser.add_argument('--candidates', type=int, default=None, help="Defaults to TOPIC_AFFINITY_CANDIDATES.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Users scored in one matrix product.")
+
+    def handle(self, *args, **options):
+        article_ids = list(Article.objects.filter(status=ArticleStatus.PUBLISH).order_by('-created_at')
+                           .values_list('id', flat=True)[:options['candidates'] or settings.TOPIC_AFFINITY_CANDIDATES])
+        user_ids = list(User.objects.filter(is_active=True).order_by('id')
+                        .values_list('id', flat=True)[:options['users']])
+        if not article_ids or not user_ids:
+            raise CommandError("Needs published articles and active users.")
+
+        started = time.perf_counter()
+        candidates = CandidateSet(article_ids)
+        self.report("Candidate matrix", started, extra=f"{len(article_ids)} articles × {len(candidates.topic_ids)} topics")
+
+        started = time.perf_counter()
+        vectors = TopicAffinity.get_many(user_ids)
+        self.report("Vectors, cold", started, len(user_ids))
+        started = time.perf_counter()
+        vectors = TopicAffinity.get_many(user_ids)
+        self.report("Vectors, cached", started, len(user_ids))
+
+        vectors = [vectors[user_ids[i % len(user_ids)]] for i in range(options['users'])]
+        batch_size = options['batch_size']
+        started = time.perf_counter()
+        for start in range(0, len(vectors), batch_size):
+            candidates.rank(vectors[start:start + batch_size])
+        self.report(f"Scoring and ranking ({len(user_ids)} distinct)", started, len(vectors))
+
+    def report(self, step: str, started: float, users: int = None, extra: str = '') -> None:
+        seconds = time.perf_counter() - started
+        rate = f", {users / seconds:,.0f} users/s" if users else ''
+        self.stdout.write(f"{step}: {seconds * 1000:.1f}ms{rate}{' ' + extra if extra else ''}")
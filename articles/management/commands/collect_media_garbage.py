@@ -0,0 +1,109 @@
+import posixpath
+import re
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from articles.models import Article, Comment, FAQ, MediaBlob
+from articles.tasks import get_rendition_names
+
+
+class Command(BaseCommand):
+    help = "Deletes content-addressed media files that nothing references any more, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help="Keep blobs touched more recently, e.g. editor uploads of unsaved articles.")
+        parser.add_argument('--reconcile', action='store_true',
+                            help="Recount references of every blob first. Editor uploads are only released this way.")
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if options['reconcile']:
+            self.stdout.write(f"Reconciled {self.reconcile(batch_size)} refcount(s).")
+
+        storage = Article._meta.get_field('thumbnail').storage
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        last_id = deleted = freed = 0
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    MediaBlob.objects.select_for_update(skip_locked=True)
+                    .filter(refcount__lte=0, updated_at__lt=cutoff, id__gt=last_id)
+                    .order_by('id')[:batch_size]
+                )
+                if not batch:
+                    break
+                last_id = batch[-1].id
+                # the refcount can lag behind, never drop a file that is still in use
+                references = self.count_references([blob.name for blob in batch])
+                garbage = [blob for blob in batch if not references[blob.name]]
+                if options['dry_run']:
+                    transaction.set_rollback(True)
+                else:
+                    MediaBlob.objects.filter(id__in=[blob.id for blob in garbage]).delete()
+                    # after the rows, so a failed delete keeps the files, and before the commit, so the
+                    # rows are still locked: an upload of the same file waits in MediaBlob.acquire and
+                    # stores it again once they are gone
+                    for blob in garbage:
+                        self.delete_files(storage, blob)
+            deleted += len(garbage)
+            freed += sum(blob.size for blob in garbage)
+
+        action = "Would delete" if options['dry_run'] else "Deleted"
+        self.stdout.write(f"{action} {deleted} blob(s), {freed / 1024 / 1024:.1f} MB.")
+
+    def reconcile(self, batch_size: int) -> int:
+        changed = 0
+        blobs = MediaBlob.objects.order_by('id')
+        last_id = 0
+        while True:
+            batch = list(blobs.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                return changed
+            last_id = batch[-1].id
+            references = self.count_references([blob.name for blob in batch])
+            stale = [blob for blob in batch if blob.refcount != references[blob.name]]
+            for blob in stale:
+                blob.refcount = references[blob.name]
+            MediaBlob.objects.bulk_update(stale, ['refcount'])
+            changed += len(stale)
+
+    @staticmethod
+    def count_references(names: list[str]) -> dict[str, int]:
+        """ Rows using each name. Every table is scanned once per call, not once per name. """
+        references = dict.fromkeys(names, 0)
+        if not names:
+            return references
+        thumbnails = (Article.objects.filter(thumbnail__in=names)
+                      .values_list('thumbnail').annotate(count=Count('id')))
+        for name, count in thumbnails:
+            references[name] += count
+        # editor uploads are only referenced by URL inside rich text
+        # longest first, so a name that is a prefix of another can't shadow it
+        pattern = re.compile('|'.join(re.escape(name) for name in sorted(names, key=len, reverse=True)))
+        for model, field in ((Article, 'content'), (Comment, 'content'), (FAQ, 'answer')):
+            texts = (model.objects.filter(**{f'{field}__regex': pattern.pattern}).order_by()
+                     .values_list(field, flat=True))
+            for text in texts.iterator(chunk_size=500):
+                for name in set(pattern.findall(text)):
+                    references[name] += 1
+        return references
+
+    @staticmethod
+    def delete_files(storage, blob: MediaBlob) -> None:
+        storage.delete(blob.name)
+        stem, ext = posixpath.splitext(blob.name)
+        # CKEditor's browser thumbnail
+        storage.delete(f"{stem}_thumb{ext}")
+        if not (MediaBlob.objects.filter(digest=blob.digest).exclude(id=blob.id).exists()
+                or Article.objects.filter(thumbnail_hash=blob.digest).exists()):
+            for widths in get_rendition_names(blob.digest).values():
+                for name in widths.values():
+                    default_storage.delete(name)
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from articles.suggestions import compute_author_suggestions
+
+
+class Command(BaseCommand):
+    help = ("Scores authors for every active user from friends of friends and co-reading "
+            "and stores the top K as their \"who to follow\" list.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=None, help="Defaults to AUTHOR_SUGGESTIONS_TOP_K.")
+        parser.add_argument('--block-size', type=int, default=5000, help="Users scored and written at a time.")
+
+    def handle(self, *args, **options):
+        stats = compute_author_suggestions(options['top_k'], options['block_size'])
+        self.stdout.write(f"Stored {stats['suggestions']} suggestion(s) for {stats['users']} user(s) "
+                          f"in {stats['seconds']:.1f}s.")
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from articles.services import NotificationDigest
+
+
+class Command(BaseCommand):
+    help = "Writes one notification for every closed digest window."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help="Repeat every N seconds instead of running once.")
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                written = NotificationDigest.flush()
+                self.stdout.write(f"Wrote {written} digest notification(s).")
+                if not options['interval']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
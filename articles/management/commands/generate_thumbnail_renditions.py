@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from articles.models import Article
+from articles.tasks import generate_thumbnail_renditions
+
+
+class Command(BaseCommand):
+    help = "Generates thumbnail renditions for articles that don't have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        # rows hashed before widths were recorded are filled in too, their renditions are reused
+        pending = (Article.objects.exclude(thumbnail='').exclude(thumbnail__isnull=True)
+                   .filter(Q(thumbnail_hash='') | Q(thumbnail_width__isnull=True)).values_list('id', 'thumbnail'))
+        done = failed = 0
+        for article_id, thumbnail_name in pending.iterator(chunk_size=options['batch_size']):
+            try:
+                generate_thumbnail_renditions(article_id, thumbnail_name)
+                done += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"Article {article_id}: {e}")
+        self.stdout.write(f"Generated renditions for {done} article(s), {failed} failed.")
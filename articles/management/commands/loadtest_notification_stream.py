@@ -0,0 +1,102 @@
+import asyncio
+import resource
+import statistics
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core import events
+from users.services import UserService
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ("Opens N idle Server-Sent Events connections to a running ASGI server "
+            "(uvicorn core.asgi:application), publishes one notification and reports delivery.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8001/users/notifications/stream/')
+        parser.add_argument('--username', required=True, help="Every connection streams this user's notifications.")
+        parser.add_argument('--connections', type=int, default=10_000)
+        parser.add_argument('--ramp', type=int, default=500, help="Connections opened at the same time.")
+        parser.add_argument('--hold', type=float, default=30, help="Seconds to keep the connections idle.")
+        parser.add_argument('--server-pid', type=int, default=None, help="Report the resident memory of this process.")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f"User '{options['username']}' does not exist.")
+        token = UserService.create_tokens(user)['access']
+
+        # every connection is a file descriptor on this side too
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        if options['connections'] + 100 > hard:
+            raise CommandError(f"Open file limit is {hard}, raise it with `ulimit -n`.")
+
+        asyncio.run(self.run(user.id, token, options))
+
+    async def run(self, user_id: int, token: str, options) -> None:
+        url = urlsplit(options['url'])
+        request = (f"GET {url.path} HTTP/1.1\r\nHost: {url.netloc}\r\nAccept: text/event-stream\r\n"
+                   f"Authorization: Bearer {token}\r\n\r\n").encode()
+        ramp = asyncio.Semaphore(options['ramp'])
+        published = asyncio.Event()
+        published_at = 0.0
+
+        async def connect() -> Optional[tuple[asyncio.StreamReader, asyncio.StreamWriter]]:
+            async with ramp:
+                try:
+                    reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+                    writer.write(request)
+                    status = await reader.readuntil(b'\r\n\r\n')
+                except (OSError, asyncio.IncompleteReadError) as e:
+                    self.stderr.write(f"Connection failed: {e}")
+                    return None
+            if b' 200 ' not in status.split(b'\r\n', 1)[0]:
+                writer.close()
+                return None
+            return reader, writer
+
+        async def wait_for_notification(reader: asyncio.StreamReader) -> Optional[float]:
+            await published.wait()
+            try:
+                while b'event: notification' not in await reader.readuntil(b'\n\n'):
+                    pass
+            except (OSError, asyncio.IncompleteReadError):
+                return None
+            return time.perf_counter() - published_at
+
+        started = time.perf_counter()
+        streams = [stream for stream in await asyncio.gather(*(connect() for _ in range(options['connections'])))
+                   if stream]
+        self.stdout.write(f"Opened {len(streams)}/{options['connections']} streams "
+                          f"in {time.perf_counter() - started:.1f}s.")
+        self.report_memory(options['server_pid'])
+
+        waiters = [asyncio.ensure_future(wait_for_notification(reader)) for reader, _ in streams]
+        await asyncio.sleep(options['hold'])
+        published_at = time.perf_counter()
+        published.set()
+        await asyncio.to_thread(events.publish, {user_id: {'message': 'load test'}})
+        latencies = [latency for latency in await asyncio.gather(*waiters) if latency is not None]
+
+        self.stdout.write(f"{len(latencies)}/{len(streams)} streams survived {options['hold']:.0f}s idle "
+                          f"and received the notification.")
+        if latencies:
+            self.stdout.write(f"Delivery latency: median {statistics.median(latencies) * 1000:.0f}ms, "
+                              f"max {max(latencies) * 1000:.0f}ms.")
+        self.report_memory(options['server_pid'])
+        for _, writer in streams:
+            writer.close()
+
+    def report_memory(self, pid: Optional[int]) -> None:
+        if pid is None:
+            return
+        with open(f'/proc/{pid}/status') as status:
+            rss = next(line.split()[1] for line in status if line.startswith('VmRSS'))
+        self.stdout.write(f"Server process {pid}: {int(rss) / 1024:.0f} MB resident.")
@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from articles.services import FollowService
+from users.cache import UserSnapshotCache
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Recomputes followers_count and following_count from the follow table in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        checked = fixed = 0
+        last_id = 0
+        while True:
+            users = list(User.objects.filter(id__gt=last_id).order_by('id')
+                         .values_list('id', 'followers_count', 'following_count')[:batch_size])
+            if not users:
+                break
+            last_id = users[-1][0]
+            counts = FollowService.count_follows([user_id for user_id, *_ in users])
+            drifted = [user_id for user_id, *stored in users if tuple(stored) != counts[user_id]]
+            with transaction.atomic():
+                for user_id in drifted:
+                    followers, following = counts[user_id]
+                    User.objects.filter(id=user_id).update(followers_count=followers, following_count=following)
+            for user_id in drifted:
+                UserSnapshotCache.invalidate(user_id)
+            checked += len(users)
+            fixed += len(drifted)
+        self.stdout.write(f"Checked {checked} user(s), fixed {fixed}.")
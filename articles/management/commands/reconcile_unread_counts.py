@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from articles.services import UnreadCounter
+
+
+class Command(BaseCommand):
+    help = "Rewrites Redis unread notification counters that drifted from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--interval', type=float, default=0,
+                            help="Repeat every N seconds instead of running once.")
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                checked, fixed = self.reconcile(options['batch_size'])
+                self.stdout.write(f"Checked {checked} counter(s), fixed {fixed}.")
+                if not options['interval']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+    @staticmethod
+    def reconcile(batch_size: int) -> tuple[int, int]:
+        redis_client = UnreadCounter.get_redis_client()
+        keys = redis_client.scan_iter(match=UnreadCounter.get_key('*'), count=batch_size)
+        checked = fixed = 0
+        batch = []
+        for key in keys:
+            batch.append(key)
+            if len(batch) < batch_size:
+                continue
+            fixed += Command.reconcile_batch(redis_client, batch)
+            checked, batch = checked + len(batch), []
+        if batch:
+            fixed += Command.reconcile_batch(redis_client, batch)
+            checked += len(batch)
+        return checked, fixed
+
+    @staticmethod
+    def reconcile_batch(redis_client, keys: list[bytes]) -> int:
+        user_ids = [int(key.split(b':')[1]) for key in keys]
+        cached = dict(zip(user_ids, redis_client.mget(keys)))
+        counts = UnreadCounter.count_unread(user_ids)
+        drifted = {user_id: count for user_id, count in counts.items()
+                   if cached[user_id] is None or int(cached[user_id]) != count}
+        if drifted:
+            UnreadCounter.reset(drifted)
+        return len(drifted)
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from articles.services import PopularAuthorService
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the 7 day, 30 day and all-time popular author rankings, overall and per topic."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help="Repeat every N seconds instead of running once.")
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                written = PopularAuthorService.refresh()
+                self.stdout.write(f"Stored {written} ranking row(s).")
+                if not options['interval']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
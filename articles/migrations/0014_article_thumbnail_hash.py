@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 05:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0013_remove_report_topic_report_article_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='thumbnail_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
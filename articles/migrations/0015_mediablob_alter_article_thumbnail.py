@@ -0,0 +1,36 @@
+# Generated by Django 4.2 on 2026-10-19 05:38
+
+import articles.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0014_article_thumbnail_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('digest', models.CharField(db_index=True, max_length=64)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('refcount', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Media Blob',
+                'verbose_name_plural': 'Media Blobs',
+                'db_table': 'media_blob',
+            },
+        ),
+        migrations.AlterField(
+            model_name='article',
+            name='thumbnail',
+            field=models.ImageField(blank=True, null=True, storage=articles.storage.ContentAddressedStorage(), upload_to='articles/thumbnails/'),
+        ),
+    ]
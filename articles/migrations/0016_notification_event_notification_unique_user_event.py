@@ -0,0 +1,22 @@
+# Generated by Django 4.2 on 2026-10-19 05:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0015_mediablob_alter_article_thumbnail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='event',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(fields=('user', 'event'), name='unique_user_event'),
+        ),
+    ]
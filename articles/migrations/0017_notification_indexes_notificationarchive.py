@@ -0,0 +1,75 @@
+# Generated by Django 4.2 on 2026-10-19 05:50
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+PARTITIONED_TABLE_SQL = """
+CREATE TABLE notification_archive (
+    id bigint NOT NULL,
+    user_id bigint NOT NULL,
+    message text NOT NULL,
+    read_at timestamp with time zone NULL,
+    event varchar(64) NULL,
+    created_at timestamp with time zone NOT NULL,
+    archived_at timestamp with time zone NOT NULL,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE INDEX notification_archive_user_idx ON notification_archive (user_id, created_at DESC);
+"""
+
+
+def create_archive_table(apps, schema_editor):
+    model = apps.get_model('articles', 'NotificationArchive')
+    if schema_editor.connection.vendor == 'postgresql' and settings.NOTIFICATION_ARCHIVE_PARTITIONED:
+        # monthly partitions are created on demand by manage.py archive_notifications
+        schema_editor.execute(PARTITIONED_TABLE_SQL)
+    else:
+        schema_editor.create_model(model)
+
+
+def drop_archive_table(apps, schema_editor):
+    schema_editor.delete_model(apps.get_model('articles', 'NotificationArchive'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('articles', '0016_notification_event_notification_unique_user_event'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='NotificationArchive',
+                    fields=[
+                        ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                        ('message', models.TextField()),
+                        ('read_at', models.DateTimeField(blank=True, null=True)),
+                        ('event', models.CharField(blank=True, max_length=64, null=True)),
+                        ('created_at', models.DateTimeField()),
+                        ('archived_at', models.DateTimeField(auto_now_add=True)),
+                        ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'verbose_name': 'Archived notification',
+                        'verbose_name_plural': 'Archived notifications',
+                        'db_table': 'notification_archive',
+                        'ordering': ['-created_at'],
+                        'indexes': [models.Index(fields=['user', '-created_at'], name='notification_archive_user_idx')],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_archive_table, drop_archive_table),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('read_at__isnull', True)), fields=['user', '-created_at'], name='notification_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('read_at__isnull', False)), fields=['created_at'], name='notification_read_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2 on 2026-10-19 06:03
+
+from collections import Counter
+
+from django.db import migrations, models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+BATCH_SIZE = 10_000
+
+
+def delete_duplicate_follows(apps, schema_editor):
+    """
+    Keeps the oldest row of every (follower, followee) pair. The table is
+    read once in pair order, then the duplicates are deleted in batches,
+    each in its own transaction with the follow counters lowered to match.
+    """
+    Follow = apps.get_model('articles', 'Follow')
+    User = apps.get_model('users', 'CustomUser')
+
+    rows = (Follow.objects.order_by('follower_id', 'followee_id', 'id')
+            .values_list('id', 'follower_id', 'followee_id').iterator(chunk_size=BATCH_SIZE))
+    duplicates, previous = [], None
+    for follow_id, follower_id, followee_id in rows:
+        if (follower_id, followee_id) == previous:
+            duplicates.append((follow_id, previous))
+        previous = (follower_id, followee_id)
+
+    for start in range(0, len(duplicates), BATCH_SIZE):
+        batch = duplicates[start:start + BATCH_SIZE]
+        with transaction.atomic():
+            Follow.objects.filter(id__in=[follow_id for follow_id, _ in batch]).delete()
+            for user_id, removed in Counter(followee_id for _, (_, followee_id) in batch).items():
+                User.objects.filter(id=user_id).update(
+                    followers_count=Greatest(F('followers_count') - removed, Value(0)))
+            for user_id, removed in Counter(follower_id for _, (follower_id, _) in batch).items():
+                User.objects.filter(id=user_id).update(
+                    following_count=Greatest(F('following_count') - removed, Value(0)))
+
+
+class Migration(migrations.Migration):
+    # every batch commits on its own, a large table is never locked as a whole
+    atomic = False
+
+    dependencies = [
+        ('articles', '0017_notification_indexes_notificationarchive'),
+        ('users', '0011_customuser_follow_counts'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_follows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('follower', 'followee'), name='unique_follow'),
+        ),
+    ]
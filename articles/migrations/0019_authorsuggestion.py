@@ -0,0 +1,37 @@
+# Generated by Django 4.2 on 2026-10-19 06:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('articles', '0018_follow_unique_follow'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='suggested_to', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='author_suggestions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Author suggestion',
+                'verbose_name_plural': 'Author suggestions',
+                'db_table': 'author_suggestion',
+                'ordering': ['user', 'rank'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='authorsuggestion',
+            constraint=models.UniqueConstraint(fields=('user', 'rank'), name='unique_user_suggestion_rank'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2 on 2026-10-19 06:13
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('articles', '0019_authorsuggestion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularAuthor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('7d', 'Last 7 days'), ('30d', 'Last 30 days'), ('all', 'All time')], max_length=3)),
+                ('reads_count', models.PositiveBigIntegerField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('refreshed_at', models.DateTimeField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='popular_rankings', to=settings.AUTH_USER_MODEL)),
+                ('topic', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='popular_authors', to='articles.topic')),
+            ],
+            options={
+                'verbose_name': 'Popular author',
+                'verbose_name_plural': 'Popular authors',
+                'db_table': 'popular_author',
+                'ordering': ['period', 'topic', 'rank'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArticleReadDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_reads', to='articles.article')),
+            ],
+            options={
+                'verbose_name': 'Daily article reads',
+                'verbose_name_plural': 'Daily article reads',
+                'db_table': 'article_read_daily',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='popularauthor',
+            index=models.Index(fields=['period', 'topic', 'rank'], name='popular_author_rank_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='articlereaddaily',
+            constraint=models.UniqueConstraint(fields=('article', 'date'), name='unique_article_read_date'),
+        ),
+    ]
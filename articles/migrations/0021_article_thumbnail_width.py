@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 06:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0020_popular_authors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='thumbnail_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2 on 2026-10-19 07:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0021_article_thumbnail_width'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['thumbnail'], name='article_thumbnail_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['thumbnail_hash'], name='article_thumbnail_hash_idx'),
+        ),
+    ]
@@ -1,8 +1,15 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from ckeditor.fields import RichTextField
 from django.core import validators
-from django.db.models import UniqueConstraint
+from django.db.models import F, Q, UniqueConstraint
+from django.utils import timezone
+
+from articles.storage import ContentAddressedStorage
+from articles.tasks import (
+    generate_thumbnail_renditions, get_source_width, has_thumbnail_renditions, notify_followers_of_article
+)
+from core.tasks import TaskQueue
 
 User = get_user_model()
 
@@ -46,7 +53,11 @@ class Article(BaseModel):
     summary = models.TextField()
     content = RichTextField()
     thumbnail = models.ImageField(
-        upload_to="articles/thumbnails/", blank=True, null=True)
+        upload_to="articles/thumbnails/", storage=ContentAddressedStorage(), blank=True, null=True)
+    # SHA-256 of the thumbnail, set once its renditions are stored
+    thumbnail_hash = models.CharField(max_length=64, blank=True, editable=False)
+    # width of the thumbnail as displayed, renditions are never wider
+    thumbnail_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
     status = models.CharField(
         max_length=50, choices=ArticleStatus.choices, default=ArticleStatus.DRAFT
     )
@@ -60,10 +71,59 @@ class Article(BaseModel):
         verbose_name = "Article"
         verbose_name_plural = "Articles"
         ordering = ['-created_at']
+        indexes = [
+            # core.media.MediaView checks who may see a thumbnail and its renditions
+            models.Index(fields=['thumbnail'], name='article_thumbnail_idx'),
+            models.Index(fields=['thumbnail_hash'], name='article_thumbnail_hash_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.topics}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remembered so a replaced thumbnail can be released and publishing noticed
+        if 'thumbnail' in field_names:
+            instance._loaded_thumbnail = values[field_names.index('thumbnail')]
+        if 'status' in field_names:
+            instance._loaded_status = values[field_names.index('status')]
+        return instance
+
+    def save(self, *args, **kwargs):
+        thumbnail_uploaded = bool(self.thumbnail) and not self.thumbnail._committed
+        queue_renditions = thumbnail_uploaded
+        if thumbnail_uploaded or not self.thumbnail:
+            self.thumbnail_hash, self.thumbnail_width = '', None
+        if thumbnail_uploaded:
+            # streamed uploads are hashed on arrival, a known image needs no new renditions
+            digest = getattr(self.thumbnail.file, 'sha256', None)
+            if digest and has_thumbnail_renditions(digest):
+                self.thumbnail.file.seek(0)
+                self.thumbnail_hash, self.thumbnail_width = digest, get_source_width(self.thumbnail.file)
+                self.thumbnail.file.seek(0)
+                queue_renditions = False
+        super().save(*args, **kwargs)
+        if queue_renditions:
+            TaskQueue.enqueue(generate_thumbnail_renditions, self.pk, self.thumbnail.name)
+
+        if self.status == ArticleStatus.PUBLISH and getattr(self, '_loaded_status', None) != self.status:
+            TaskQueue.enqueue(notify_followers_of_article, self.pk)
+        self._loaded_status = self.status
+
+        # storing an upload takes a reference, the previous thumbnail gives its one back
+        loaded_thumbnail = getattr(self, '_loaded_thumbnail', None)
+        if loaded_thumbnail and (thumbnail_uploaded or loaded_thumbnail != self.thumbnail.name):
+            MediaBlob.release(loaded_thumbnail)
+        self._loaded_thumbnail = self.thumbnail.name
+
+    def delete(self, *args, **kwargs):
+        thumbnail = self.thumbnail.name
+        result = super().delete(*args, **kwargs)
+        if thumbnail:
+            MediaBlob.release(thumbnail)
+        return result
+
 
 class Comment(BaseModel):
     article = models.ForeignKey(
@@ -147,6 +207,71 @@ class Follow(BaseModel):
         verbose_name = "Follow"
         verbose_name_plural = "Follows"
         ordering = ['-created_at']
+        constraints = [
+            UniqueConstraint(fields=['follower', 'followee'], name='unique_follow')
+        ]
+
+
+class AuthorSuggestion(models.Model):
+    """ "Who to follow" for a user, written by ``manage.py compute_author_suggestions``. """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="author_suggestions")
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="suggested_to")
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "author_suggestion"
+        verbose_name = "Author suggestion"
+        verbose_name_plural = "Author suggestions"
+        ordering = ['user', 'rank']
+        constraints = [
+            UniqueConstraint(fields=['user', 'rank'], name='unique_user_suggestion_rank')
+        ]
+
+
+class ArticleReadDaily(models.Model):
+    """ Reads of an article per day, feeding the windowed popular-author rankings. """
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name="daily_reads")
+    date = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = "article_read_daily"
+        verbose_name = "Daily article reads"
+        verbose_name_plural = "Daily article reads"
+        ordering = ['-date']
+        constraints = [
+            UniqueConstraint(fields=['article', 'date'], name='unique_article_read_date')
+        ]
+
+
+class RankingPeriod(models.TextChoices):
+    WEEK = "7d", "Last 7 days"
+    MONTH = "30d", "Last 30 days"
+    ALL_TIME = "all", "All time"
+
+
+class PopularAuthor(models.Model):
+    """
+    Most read authors per period, overall (``topic`` is null) and per topic.
+    Rebuilt by ``manage.py refresh_popular_authors``.
+    """
+    period = models.CharField(max_length=3, choices=RankingPeriod.choices)
+    topic = models.ForeignKey(Topic, on_delete=models.CASCADE, null=True, blank=True, related_name="popular_authors")
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="popular_rankings")
+    reads_count = models.PositiveBigIntegerField()
+    rank = models.PositiveSmallIntegerField()
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        db_table = "popular_author"
+        verbose_name = "Popular author"
+        verbose_name_plural = "Popular authors"
+        ordering = ['period', 'topic', 'rank']
+        indexes = [
+            models.Index(fields=['period', 'topic', 'rank'], name='popular_author_rank_idx')
+        ]
 
 
 class Recommendation(BaseModel):
@@ -176,12 +301,50 @@ class Notification(BaseModel):
     )
     message = models.TextField()
     read_at = models.DateTimeField(blank=True, null=True)
+    # what the notification is about, e.g. "article_published:42"; one per user
+    event = models.CharField(max_length=64, blank=True, null=True)
 
     class Meta:
         db_table = "notification"
         verbose_name = "Notification"
         verbose_name_plural = "Notifications"
         ordering = ['-created_at']
+        constraints = [
+            UniqueConstraint(fields=['user', 'event'], name='unique_user_event')
+        ]
+        indexes = [
+            # the inbox: unread notifications of a user, newest first
+            models.Index(fields=['user', '-created_at'], condition=Q(read_at__isnull=True),
+                         name='notification_unread_idx'),
+            # read notifications by age, for `manage.py archive_notifications`
+            models.Index(fields=['created_at'], condition=Q(read_at__isnull=False),
+                         name='notification_read_idx'),
+        ]
+
+
+class NotificationArchive(models.Model):
+    """
+    Read notifications moved out of ``notification`` by
+    ``manage.py archive_notifications``. Rows keep their original ids and
+    timestamps. On PostgreSQL the table can be partitioned by month of
+    ``created_at`` (see ``NOTIFICATION_ARCHIVE_PARTITIONED``).
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False, related_name="+")
+    message = models.TextField()
+    read_at = models.DateTimeField(blank=True, null=True)
+    event = models.CharField(max_length=64, blank=True, null=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "notification_archive"
+        verbose_name = "Archived notification"
+        verbose_name_plural = "Archived notifications"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='notification_archive_user_idx'),
+        ]
 
 
 class ReadingHistory(BaseModel):
@@ -246,3 +409,37 @@ class FAQ(BaseModel):
 
     def __str__(self):
         return self.question
+
+
+class MediaBlob(BaseModel):
+    """ A file kept by ContentAddressedStorage and the number of places that use it. """
+    name = models.CharField(max_length=255, unique=True)
+    digest = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField(default=0)
+    refcount = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = "media_blob"
+        verbose_name = "Media Blob"
+        verbose_name_plural = "Media Blobs"
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
+
+    @classmethod
+    def acquire(cls, name: str, digest: str, size: int) -> None:
+        """
+        Takes a reference, creating the row if needed. The row lock waits for
+        a garbage collection that is deleting this blob, which then has
+        removed both the row and the file, so the caller stores it again.
+        """
+        with transaction.atomic():
+            blob, created = cls.objects.select_for_update().get_or_create(
+                name=name, defaults={'digest': digest, 'size': size, 'refcount': 1})
+            if not created:
+                cls.objects.filter(id=blob.id).update(refcount=F('refcount') + 1, updated_at=timezone.now())
+
+    @classmethod
+    def release(cls, name: str) -> None:
+        """ Unknown names (files stored before deduplication) are ignored. """
+        cls.objects.filter(name=name, refcount__gt=0).update(refcount=F('refcount') - 1, updated_at=timezone.now())
@@ -0,0 +1,33 @@
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+class KnownCountPagination(LimitOffsetPagination):
+    """
+    Takes the total from ``view.get_count()`` instead of running COUNT(*) for
+    every page. That total is a stored counter and only approximate (it still
+    includes deactivated users, for one), so it never decides which rows are
+    returned: one extra row is fetched to tell whether there is a next page.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.count = view.get_count()
+        self.offset = self.get_offset(request)
+        if self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+
+        rows = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        return rows[:self.limit]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
@@ -6,7 +6,9 @@ from users.serializers import UserSerializer
 from drf_spectacular.utils import extend_schema_field
 from django.db.models import Sum
 from django.contrib.auth import get_user_model
-from .models import ArticleStatus
+from django.utils.translation import gettext_lazy as _
+from .models import ArticleStatus, RankingPeriod
+from .tasks import get_thumbnail_srcset
 
 User = get_user_model()
 
@@ -55,6 +57,13 @@ class ArticleListSerializer(serializers.ModelSerializer):
     topics = TopicSerializer(many=True, read_only=True)
     comments_count = serializers.SerializerMethodField()
     claps_count = serializers.SerializerMethodField()
+    thumbnail_srcset = serializers.SerializerMethodField()
+
+    @extend_schema_field(serializers.DictField(child=serializers.CharField(), allow_null=True))
+    def get_thumbnail_srcset(self, obj):
+        request = self.context.get('request')
+        return get_thumbnail_srcset(obj.thumbnail_hash, obj.thumbnail_width,
+                                    request.build_absolute_uri if request else None)
 
     @extend_schema_field(serializers.IntegerField)
     def get_comments_count(self, obj):
@@ -68,8 +77,8 @@ class ArticleListSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Article
-        fields = ['id', 'author', 'title', 'summary', 'content', 'status', 'thumbnail', 'views_count', 'reads_count',
-                  'created_at', 'updated_at', 'topics', 'comments_count', 'claps_count']
+        fields = ['id', 'author', 'title', 'summary', 'content', 'status', 'thumbnail', 'thumbnail_srcset',
+                  'views_count', 'reads_count', 'created_at', 'updated_at', 'topics', 'comments_count', 'claps_count']
 
 
 class ArticleDetailSerializer(serializers.ModelSerializer):
@@ -165,6 +174,30 @@ class NotificationSerializer(serializers.ModelSerializer):
         fields = ['id', 'message', 'read_at', 'created_at']
 
 
+class UnreadCountSerializer(serializers.Serializer):
+    unread_count = serializers.IntegerField()
+
+
+class FollowStatusSerializer(serializers.Serializer):
+    is_following = serializers.BooleanField()
+
+
+class MarkReadSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=1000)
+    up_to = serializers.DateTimeField(required=False)
+    marked = serializers.IntegerField(read_only=True)
+
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('up_to' in attrs):
+            raise serializers.ValidationError(_("'ids' yoki 'up_to' dan faqat bittasini yuboring."))
+        return attrs
+
+
+class PopularAuthorsQuerySerializer(serializers.Serializer):
+    period = serializers.ChoiceField(choices=RankingPeriod.choices, required=False)
+    topic = serializers.IntegerField(required=False)
+
+
 class ReportSerializer(serializers.ModelSerializer):
     class Meta:
         model = Report
@@ -0,0 +1,671 @@
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import islice
+from typing import Iterable, Optional
+
+import redis
+from django.conf import settings
+from django.db import connection, transaction
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, QuerySet, Sum, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone, translation
+from django.utils.translation import gettext as _, gettext_noop
+from loguru import logger
+
+from articles.models import (
+    Article, ArticleReadDaily, ArticleStatus, Clap, Favorite, Follow, Notification, NotificationArchive, PopularAuthor,
+    RankingPeriod, ReadingHistory, Recommendation, TopicFollow
+)
+from core import connections, events
+from users.cache import UserSnapshotCache
+
+User = get_user_model()
+
+
+class UnreadCounter:
+    """
+    Per-user unread notification counts in Redis.
+
+    A missing key is rebuilt from the database on read, writers only touch
+    keys that exist, so a counter is never started from a partial count.
+    The little drift left by races is fixed by
+    ``manage.py reconcile_unread_counts``.
+    """
+
+    @classmethod
+    def get_redis_client(cls) -> redis.Redis:
+        return connections.get_redis_client()
+
+    @classmethod
+    def get_key(cls, user_id: int) -> str:
+        return f"user:{user_id}:unread_notifications"
+
+    @classmethod
+    def count_unread(cls, user_ids: Iterable[int]) -> dict[int, int]:
+        counts = dict.fromkeys(user_ids, 0)
+        rows = (Notification.objects.filter(user_id__in=counts, read_at__isnull=True).order_by()
+                .values_list('user_id').annotate(count=Count('id')))
+        counts.update(rows)
+        return counts
+
+    @classmethod
+    def get(cls, user_id: int) -> int:
+        key = cls.get_key(user_id)
+        try:
+            redis_client = cls.get_redis_client()
+            value = redis_client.get(key)
+            if value is not None:
+                return max(int(value), 0)
+            count = cls.count_unread([user_id])[user_id]
+            redis_client.set(key, count, nx=True)
+            return count
+        except redis.RedisError as e:
+            logger.warning(f"Unread counter fell back to the database: {e}")
+            return cls.count_unread([user_id])[user_id]
+
+    @classmethod
+    def add(cls, deltas: dict[int, int]) -> None:
+        """ Applies ``{user_id: delta}`` to the counters that are already there. """
+        deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        try:
+            redis_client = cls.get_redis_client()
+            pipeline = redis_client.pipeline(transaction=False)
+            for user_id in deltas:
+                pipeline.exists(cls.get_key(user_id))
+            existing = [user_id for user_id, exists in zip(deltas, pipeline.execute()) if exists]
+            for user_id in existing:
+                pipeline.incrby(cls.get_key(user_id), deltas[user_id])
+            pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Unread counters of {len(deltas)} user(s) were not updated: {e}")
+
+    @classmethod
+    def reset(cls, counts: dict[int, int]) -> None:
+        pipeline = cls.get_redis_client().pipeline(transaction=False)
+        for user_id, count in counts.items():
+            pipeline.set(cls.get_key(user_id), count)
+        pipeline.execute()
+
+
+class FollowGraph:
+    """
+    Follow edges mirrored into per-user Redis sets, ``following`` and
+    ``followers``.
+
+    A set counts as loaded only while it holds the ``SENTINEL`` member, so
+    empty sets exist and a set created by a write to an expired key is
+    rebuilt from the database on the next read. Writes go through after
+    commit and bump a version key; a rebuild that saw the version change
+    while it read the database is thrown away and retried. Entries expire
+    after ``GRAPH_CACHE_TTL`` seconds without writes.
+    """
+    SENTINEL = '-'
+    LOAD_ATTEMPTS = 3
+    # kind -> (model, owner column, member column)
+    EDGES = {
+        'following': (Follow, 'follower_id', 'followee_id'),
+        'followers': (Follow, 'followee_id', 'follower_id'),
+    }
+
+    @classmethod
+    def get_redis_client(cls) -> redis.Redis:
+        return connections.get_redis_client()
+
+    @classmethod
+    def get_key(cls, user_id: int, kind: str) -> str:
+        return f"graph:{user_id}:{kind}"
+
+    @classmethod
+    def get_version_key(cls, user_id: int, kind: str) -> str:
+        return f"graph:{user_id}:{kind}:version"
+
+    @classmethod
+    def query(cls, user_id: int, kind: str, **filters):
+        model, owner, member = cls.EDGES[kind]
+        return model.objects.filter(**{owner: user_id}, **filters).order_by().values_list(member, flat=True)
+
+    @classmethod
+    def members(cls, user_id: int, kind: str) -> set[int]:
+        try:
+            redis_client = cls.get_redis_client()
+            cls.ensure_loaded(redis_client, user_id, kind)
+            return cls.to_ids(redis_client.smembers(cls.get_key(user_id, kind)))
+        except redis.RedisError as e:
+            logger.warning(f"Graph cache unavailable: {e}")
+            return set(cls.query(user_id, kind))
+
+    @classmethod
+    def is_member(cls, user_id: int, kind: str, member_id: int) -> bool:
+        try:
+            redis_client = cls.get_redis_client()
+            pipeline = redis_client.pipeline(transaction=False)
+            pipeline.sismember(cls.get_key(user_id, kind), cls.SENTINEL)
+            pipeline.sismember(cls.get_key(user_id, kind), member_id)
+            loaded, found = pipeline.execute()
+            if loaded:
+                return bool(found)
+            cls.ensure_loaded(redis_client, user_id, kind)
+            return bool(redis_client.sismember(cls.get_key(user_id, kind), member_id))
+        except redis.RedisError as e:
+            logger.warning(f"Graph cache unavailable: {e}")
+            return cls.query(user_id, kind, **{cls.EDGES[kind][2]: member_id}).exists()
+
+    @classmethod
+    def is_following(cls, user_id: int, author_id: int) -> bool:
+        return cls.is_member(user_id, 'following', author_id)
+
+    @classmethod
+    def mutuals(cls, user_id: int) -> set[int]:
+        """ Users that ``user_id`` follows and who follow back. """
+        try:
+            redis_client = cls.get_redis_client()
+            cls.ensure_loaded(redis_client, user_id, 'following')
+            cls.ensure_loaded(redis_client, user_id, 'followers')
+            return cls.to_ids(redis_client.sinter(cls.get_key(user_id, 'following'),
+                                                  cls.get_key(user_id, 'followers')))
+        except redis.RedisError as e:
+            logger.warning(f"Graph cache unavailable: {e}")
+            return set(cls.query(user_id, 'following')) & set(cls.query(user_id, 'followers'))
+
+    @classmethod
+    def ensure_loaded(cls, redis_client: redis.Redis, user_id: int, kind: str) -> None:
+        key = cls.get_key(user_id, kind)
+        for attempt in range(cls.LOAD_ATTEMPTS):
+            with redis_client.pipeline() as pipeline:
+                try:
+                    # an edge committed after the query below is written through after
+                    # commit, its version bump makes the EXEC fail instead of losing it
+                    pipeline.watch(cls.get_version_key(user_id, kind))
+                    if pipeline.sismember(key, cls.SENTINEL):
+                        return
+                    members = list(cls.query(user_id, kind))
+                    pipeline.multi()
+                    # partial sets left by writes to an expired key are replaced
+                    pipeline.delete(key)
+                    pipeline.sadd(key, cls.SENTINEL, *members)
+                    pipeline.expire(key, settings.GRAPH_CACHE_TTL)
+                    pipeline.execute()
+                    return
+                except redis.WatchError:
+                    continue
+        raise redis.WatchError(f"{key} kept changing while it was loaded")
+
+    @classmethod
+    def to_ids(cls, members) -> set[int]:
+        return {int(member) for member in members if member != cls.SENTINEL.encode()}
+
+    @classmethod
+    def write(cls, edges: list[tuple[int, str, int]], add: bool) -> None:
+        """ Applies ``(user_id, kind, member_id)`` edges to the cached sets. """
+        keys = [cls.get_key(user_id, kind) for user_id, kind, _ in edges]
+        try:
+            pipeline = cls.get_redis_client().pipeline(transaction=False)
+            for key, (user_id, kind, member_id) in zip(keys, edges):
+                (pipeline.sadd if add else pipeline.srem)(key, member_id)
+                pipeline.expire(key, settings.GRAPH_CACHE_TTL)
+                # SREM of a missing member doesn't touch the set, the version always changes
+                pipeline.incr(cls.get_version_key(user_id, kind))
+                pipeline.expire(cls.get_version_key(user_id, kind), settings.GRAPH_CACHE_TTL)
+            pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Graph cache write failed, dropping {keys}: {e}")
+            try:
+                cls.get_redis_client().delete(*keys)
+            except redis.RedisError:
+                pass
+
+    @classmethod
+    def follow_changed(cls, follower_id: int, followee_id: int, followed: bool) -> None:
+        cls.write([(follower_id, 'following', followee_id), (followee_id, 'followers', follower_id)], followed)
+
+
+class TopicAffinity:
+    """
+    How much each user likes each topic, as ``{topic_id: weight}`` hashes
+    in Redis. Every signal adds its ``TOPIC_AFFINITY_WEIGHTS`` entry to the
+    topics it touches: "more"/"less" feedback and topic follows directly,
+    reads, claps and favorites through the article's topics.
+
+    Like ``FollowGraph`` a hash counts as loaded only while it holds the
+    ``SENTINEL`` field. Signals increment loaded hashes after commit, any
+    other hash is rebuilt from the database on read. Hashes are not renewed
+    by writes, so whatever drift races leave is gone after
+    ``TOPIC_AFFINITY_TTL`` seconds.
+    """
+    SENTINEL = '-'
+    # signal -> (model, user column, topic column)
+    SIGNALS = {
+        'more': (Recommendation.more.through, 'recommendation__user_id', 'topic_id'),
+        'less': (Recommendation.less.through, 'recommendation__user_id', 'topic_id'),
+        'follow': (TopicFollow, 'user_id', 'topic_id'),
+        'read': (ReadingHistory, 'user_id', 'article__topics'),
+        'clap': (Clap, 'user_id', 'article__topics'),
+        'favorite': (Favorite, 'user_id', 'article__topics'),
+    }
+
+    @classmethod
+    def get_redis_client(cls) -> redis.Redis:
+        return connections.get_redis_client()
+
+    @classmethod
+    def get_key(cls, user_id: int) -> str:
+        return f"user:{user_id}:topic_affinity"
+
+    @classmethod
+    def compute(cls, user_ids: Iterable[int]) -> dict[int, dict[int, float]]:
+        """ Builds the vectors of ``user_ids`` from the database, one grouped query per signal. """
+        vectors = {user_id: {} for user_id in user_ids}
+        for signal, (model, user_field, topic_field) in cls.SIGNALS.items():
+            weight = settings.TOPIC_AFFINITY_WEIGHTS[signal]
+            rows = (model.objects.filter(**{f'{user_field}__in': list(vectors), f'{topic_field}__isnull': False})
+                    .order_by().values_list(user_field, topic_field).annotate(count=Count('pk')))
+            for user_id, topic_id, count in rows:
+                vectors[user_id][topic_id] = vectors[user_id].get(topic_id, 0) + weight * count
+        return vectors
+
+    @classmethod
+    def get_many(cls, user_ids: Iterable[int]) -> dict[int, dict[int, float]]:
+        user_ids = list(user_ids)
+        try:
+            redis_client = cls.get_redis_client()
+            pipeline = redis_client.pipeline(transaction=False)
+            for user_id in user_ids:
+                pipeline.hgetall(cls.get_key(user_id))
+            vectors, missing = {}, []
+            for user_id, stored in zip(user_ids, pipeline.execute()):
+                if cls.SENTINEL.encode() in stored:
+                    vectors[user_id] = {int(topic_id): float(weight) for topic_id, weight in stored.items()
+                                        if topic_id != cls.SENTINEL.encode()}
+                else:
+                    missing.append(user_id)
+            if missing:
+                computed = cls.compute(missing)
+                # DEL first: a hash without the sentinel holds increments made after it expired
+                pipeline = redis_client.pipeline()
+                for user_id, vector in computed.items():
+                    pipeline.delete(cls.get_key(user_id))
+                    pipeline.hset(cls.get_key(user_id), mapping={cls.SENTINEL: 0, **vector})
+                    pipeline.expire(cls.get_key(user_id), settings.TOPIC_AFFINITY_TTL)
+                pipeline.execute()
+                vectors.update(computed)
+            return vectors
+        except redis.RedisError as e:
+            logger.warning(f"Topic affinity cache unavailable: {e}")
+            return cls.compute(user_ids)
+
+    @classmethod
+    def add(cls, user_id: int, topic_ids: Iterable[int], signal: str, sign: int = 1) -> None:
+        """ Applies one ``signal`` on ``topic_ids``, ``sign=-1`` takes it back. """
+        key = cls.get_key(user_id)
+        weight = settings.TOPIC_AFFINITY_WEIGHTS[signal] * sign
+        try:
+            redis_client = cls.get_redis_client()
+            if not redis_client.hexists(key, cls.SENTINEL):
+                return
+            pipeline = redis_client.pipeline(transaction=False)
+            for topic_id in topic_ids:
+                pipeline.hincrbyfloat(key, topic_id, weight)
+            pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Topic affinity write failed, dropping {key}: {e}")
+            cls.invalidate(user_id)
+
+    @classmethod
+    def article_signal(cls, user_id: int, article_id: int, signal: str, sign: int = 1) -> None:
+        topic_ids = Article.topics.through.objects.filter(article_id=article_id).values_list('topic_id', flat=True)
+        cls.add(user_id, list(topic_ids), signal, sign)
+
+    @classmethod
+    def invalidate(cls, user_id: int) -> None:
+        try:
+            cls.get_redis_client().delete(cls.get_key(user_id))
+        except redis.RedisError as e:
+            logger.warning(f"Topic affinity of user {user_id} was not invalidated: {e}")
+
+
+class FollowService:
+    """
+    Follows with the denormalized ``followers_count``/``following_count``
+    of both users kept in step. The edge is written with a single
+    ``INSERT ... ON CONFLICT DO NOTHING RETURNING`` or ``DELETE ... RETURNING``
+    and the counters only move when a row really changed. On PostgreSQL
+    both run as one statement, so an action is one round trip.
+    """
+    FOLLOW_SQL = ("INSERT INTO {follow} (follower_id, followee_id, created_at, updated_at) VALUES (%s, %s, %s, %s) "
+                  "ON CONFLICT (follower_id, followee_id) DO NOTHING RETURNING id")
+    UNFOLLOW_SQL = "DELETE FROM {follow} WHERE follower_id = %s AND followee_id = %s RETURNING id"
+    # CASE instead of two UPDATEs, so following yourself changes both counters of one row
+    COUNTS_SQL = ("UPDATE {user} SET "
+                  "followers_count = {greatest}(followers_count + CASE WHEN id = %s THEN %s ELSE 0 END, 0), "
+                  "following_count = {greatest}(following_count + CASE WHEN id = %s THEN %s ELSE 0 END, 0) "
+                  "WHERE id IN (%s, %s)")
+
+    @classmethod
+    def follow(cls, follower, followee) -> bool:
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        return cls.change(cls.FOLLOW_SQL, [follower.id, followee.id, now, now], follower.id, followee.id, 1)
+
+    @classmethod
+    def unfollow(cls, follower, followee) -> bool:
+        return cls.change(cls.UNFOLLOW_SQL, [follower.id, followee.id], follower.id, followee.id, -1)
+
+    @classmethod
+    def change(cls, edge_sql: str, edge_params: list, follower_id: int, followee_id: int, delta: int) -> bool:
+        quote = connection.ops.quote_name
+        edge_sql = edge_sql.format(follow=quote(Follow._meta.db_table))
+        counts_sql = cls.COUNTS_SQL.format(user=quote(User._meta.db_table),
+                                           greatest='GREATEST' if connection.vendor == 'postgresql' else 'MAX')
+        counts_params = [followee_id, delta, follower_id, delta, follower_id, followee_id]
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f"WITH changed AS ({edge_sql}) {counts_sql} AND EXISTS (SELECT 1 FROM changed) "
+                               f"RETURNING id", edge_params + counts_params)
+                changed = cursor.fetchone() is not None
+        else:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(edge_sql, edge_params)
+                changed = cursor.fetchone() is not None
+                if changed:
+                    cursor.execute(counts_sql, counts_params)
+        if changed:
+            transaction.on_commit(lambda: (UserSnapshotCache.invalidate(follower_id),
+                                           UserSnapshotCache.invalidate(followee_id),
+                                           FollowGraph.follow_changed(follower_id, followee_id, delta > 0)))
+        return changed
+
+    @classmethod
+    def count_follows(cls, user_ids: list[int]) -> dict[int, tuple[int, int]]:
+        """ ``{user_id: (followers, following)}`` counted from ``follow``. """
+        followers = dict(Follow.objects.filter(followee_id__in=user_ids).order_by()
+                         .values_list('followee_id').annotate(count=Count('id')))
+        following = dict(Follow.objects.filter(follower_id__in=user_ids).order_by()
+                         .values_list('follower_id').annotate(count=Count('id')))
+        return {user_id: (followers.get(user_id, 0), following.get(user_id, 0)) for user_id in user_ids}
+
+
+class NotificationService:
+
+    @classmethod
+    def notify(cls, user_id: int, message: str, event: Optional[str] = None) -> bool:
+        """ Notifications with an ``event`` are created once per user, repeats are ignored. """
+        if event is None:
+            notification, created = Notification.objects.create(user_id=user_id, message=message), True
+        else:
+            notification, created = Notification.objects.get_or_create(user_id=user_id, event=event,
+                                                                       defaults={'message': message})
+        if created:
+            payload = cls.get_payload(notification.id, message, event, notification.created_at)
+            transaction.on_commit(lambda: cls.delivered({user_id: payload}))
+        return created
+
+    @staticmethod
+    def get_payload(notification_id: int, message: str, event: Optional[str], created_at: datetime) -> dict:
+        return {'id': notification_id, 'message': message, 'event': event, 'created_at': created_at}
+
+    @classmethod
+    def delivered(cls, payloads: dict[int, dict]) -> None:
+        """ Runs after the notifications are committed, ``payloads`` maps each recipient to its own. """
+        UnreadCounter.add(dict.fromkeys(payloads, 1))
+        events.publish(payloads)
+
+    @classmethod
+    def mark_read(cls, user_id: int, ids: Optional[Iterable[int]] = None, up_to: Optional[datetime] = None) -> int:
+        """
+        Marks the given notifications, or all created up to ``up_to``, as read
+        with one UPDATE and returns how many were unread. Only unread rows are
+        matched, so the counter goes down exactly once per notification.
+        """
+        notifications = Notification.objects.filter(user_id=user_id, read_at__isnull=True)
+        if ids is not None:
+            notifications = notifications.filter(id__in=ids)
+        if up_to is not None:
+            notifications = notifications.filter(created_at__lte=up_to)
+        marked = notifications.update(read_at=timezone.now(), updated_at=timezone.now())
+        if marked:
+            transaction.on_commit(lambda: UnreadCounter.add({user_id: -marked}))
+        return marked
+
+    @classmethod
+    def fan_out(cls, author_id: int, message: str, event: str, batch_size: Optional[int] = None) -> dict[str, float]:
+        """
+        Sends ``message`` to every follower of ``author_id``. Follower ids are
+        streamed and written ``batch_size`` rows per INSERT, each batch in its
+        own transaction, so a retried fan-out only fills in what is missing.
+        ``per_second`` counts followers processed.
+        """
+        batch_size = batch_size or settings.NOTIFICATION_FANOUT_BATCH_SIZE
+        follower_ids = (Follow.objects.filter(followee_id=author_id).order_by()
+                        .values_list('follower_id', flat=True).iterator(chunk_size=batch_size))
+        started = time.perf_counter()
+        followers = recipients = 0
+        while batch := list(islice(follower_ids, batch_size)):
+            with transaction.atomic():
+                # skipping users that already have it keeps the unread counters exact
+                notified = set(Notification.objects.filter(user_id__in=batch, event=event)
+                               .values_list('user_id', flat=True))
+                new_ids = {user_id for user_id in batch if user_id not in notified}
+                Notification.objects.bulk_create(
+                    [Notification(user_id=user_id, message=message, event=event) for user_id in new_ids],
+                    batch_size=batch_size,
+                    ignore_conflicts=True,
+                )
+                # ignore_conflicts leaves the ids unset, they are read back for the live payloads
+                payloads = {
+                    user_id: cls.get_payload(notification_id, message, event, created_at)
+                    for user_id, notification_id, created_at in Notification.objects.filter(
+                        user_id__in=new_ids, event=event).values_list('user_id', 'id', 'created_at')
+                } if new_ids else {}
+                transaction.on_commit(lambda payloads=payloads: cls.delivered(payloads))
+            followers += len(batch)
+            recipients += len(new_ids)
+
+        seconds = time.perf_counter() - started
+        report = {
+            'followers': followers,
+            'recipients': recipients,
+            'seconds': seconds,
+            'per_second': followers / seconds if seconds else 0.0,
+        }
+        logger.info(f"Fan-out '{event}': {recipients}/{followers} follower(s) notified, {report['per_second']:.0f}/s")
+        return report
+
+
+class NotificationDigest:
+    """
+    Collapses bursts of the same kind of event for one user into a single
+    notification per ``NOTIFICATION_DIGEST_WINDOW`` seconds.
+
+    Events only add their actor to a Redis set per (kind, user, window);
+    when the window has closed, ``manage.py flush_notification_digests``
+    writes one row for it ("X va yana 341 kishi ..."). The row's event is
+    unique per window, so a flush repeated after a crash writes it once.
+
+    The text is translated when flushed, in the language the events were
+    made in. An actor is announced to a user once per
+    ``NOTIFICATION_DIGEST_REPEAT_AFTER`` seconds, so unfollowing and
+    following again doesn't notify twice, whichever windows it spans.
+    """
+    PENDING_KEY = "notifications:digest:pending"
+    # kind -> (one actor, actor and N others)
+    MESSAGES = {
+        'follow': (gettext_noop("{actor} sizga follow qildi."),
+                   gettext_noop("{actor} va yana {others} kishi sizga follow qildi.")),
+    }
+
+    @classmethod
+    def get_redis_client(cls) -> redis.Redis:
+        return connections.get_redis_client()
+
+    @classmethod
+    def get_window(cls, now: Optional[float] = None) -> int:
+        return int((now or time.time()) // settings.NOTIFICATION_DIGEST_WINDOW)
+
+    @classmethod
+    def get_key(cls, member: str) -> str:
+        return f"notifications:digest:{member}"
+
+    @classmethod
+    def add(cls, user_id: int, kind: str, actor_id: int, actor: str) -> None:
+        member = f"{kind}:{user_id}:{cls.get_window()}"
+        key = cls.get_key(member)
+        seen_key = cls.get_key(f"{kind}:{user_id}:seen")
+        now, repeat_after = time.time(), settings.NOTIFICATION_DIGEST_REPEAT_AFTER
+        try:
+            redis_client = cls.get_redis_client()
+            pipeline = redis_client.pipeline()
+            # actors announced to this user lately, scored by when
+            pipeline.zremrangebyscore(seen_key, '-inf', now - repeat_after)
+            pipeline.zadd(seen_key, {actor_id: now}, nx=True)
+            pipeline.expire(seen_key, repeat_after)
+            if not pipeline.execute()[1]:
+                return
+
+            pipeline = redis_client.pipeline()
+            pipeline.sadd(f"{key}:actors", actor_id)
+            pipeline.set(f"{key}:actor", actor)
+            pipeline.set(f"{key}:language", translation.get_language() or settings.LANGUAGE_CODE)
+            # kept well past the window in case the flusher is down for a while
+            for suffix in ('actors', 'actor', 'language'):
+                pipeline.expire(f"{key}:{suffix}", settings.NOTIFICATION_DIGEST_WINDOW * 100)
+            pipeline.sadd(cls.PENDING_KEY, member)
+            pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Digest unavailable, notifying user {user_id} directly: {e}")
+            NotificationService.notify(user_id, cls.get_message(kind, actor, 1), event=f"{kind}:{actor_id}")
+
+    @classmethod
+    def get_message(cls, kind: str, actor: str, count: int) -> str:
+        single, many = cls.MESSAGES[kind]
+        return _(single).format(actor=actor) if count == 1 else _(many).format(actor=actor, others=count - 1)
+
+    @classmethod
+    def flush(cls, now: Optional[float] = None) -> int:
+        """ Writes the digests of every closed window and returns how many were written. """
+        redis_client = cls.get_redis_client()
+        current = cls.get_window(now)
+        written = 0
+        for member in redis_client.sscan_iter(cls.PENDING_KEY, count=1000):
+            kind, user_id, window = member.decode().split(':')
+            if int(window) >= current:
+                continue
+            key = cls.get_key(member.decode())
+            count, actor = redis_client.scard(f"{key}:actors"), redis_client.get(f"{key}:actor")
+            language = redis_client.get(f"{key}:language")
+            if count and actor:
+                with translation.override(language.decode() if language else settings.LANGUAGE_CODE):
+                    message = cls.get_message(kind, actor.decode(), count)
+                written += NotificationService.notify(int(user_id), message, event=f"{kind}_digest:{window}")
+            redis_client.delete(f"{key}:actors", f"{key}:actor", f"{key}:language")
+            redis_client.srem(cls.PENDING_KEY, member)
+        return written
+
+
+class NotificationArchiveService:
+    """ Moves old read notifications to ``notification_archive``, one short transaction per batch. """
+    ARCHIVED_FIELDS = ['id', 'user_id', 'message', 'read_at', 'event', 'created_at']
+
+    @classmethod
+    def is_partitioned(cls) -> bool:
+        if connection.vendor != 'postgresql':
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass",
+                           [NotificationArchive._meta.db_table])
+            return cursor.fetchone() is not None
+
+    @classmethod
+    def ensure_partitions(cls, months: Iterable[datetime]) -> None:
+        """ Creates the monthly partitions holding ``months`` if they don't exist yet. """
+        table = NotificationArchive._meta.db_table
+        with connection.cursor() as cursor:
+            starts = {month.astimezone(dt_timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+                      for month in months}
+            for month in sorted(starts):
+                next_month = (month + timedelta(days=32)).replace(day=1)
+                cursor.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{table}_p{month:%Y_%m}" PARTITION OF "{table}" '
+                    f'FOR VALUES FROM (%s) TO (%s)', [month, next_month]
+                )
+
+    @classmethod
+    def archive_batch(cls, cutoff: datetime, batch_size: int, partitioned: bool = False) -> int:
+        """ Archives up to ``batch_size`` notifications read and created before ``cutoff``. """
+        with transaction.atomic():
+            rows = list(Notification.objects.filter(read_at__isnull=False, created_at__lt=cutoff)
+                        .order_by('created_at').values(*cls.ARCHIVED_FIELDS)[:batch_size])
+            if not rows:
+                return 0
+            if partitioned:
+                cls.ensure_partitions(row['created_at'] for row in rows)
+            # a batch interrupted after the insert is simply inserted again
+            NotificationArchive.objects.bulk_create([NotificationArchive(**row) for row in rows],
+                                                    ignore_conflicts=True)
+            Notification.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        return len(rows)
+
+
+class PopularAuthorService:
+    """
+    Keeps ``popular_author`` so the popular authors endpoint reads a few
+    ranked rows instead of summing the reads of every published article.
+
+    Reads are counted per article and day as they happen; ``refresh``
+    rebuilds the rankings from those buckets (and ``Article.reads_count``
+    for all time) in one transaction, so readers see either the old or the
+    new ranking, never a partial one.
+    """
+    RECORD_READ_SQL = ("INSERT INTO {table} (article_id, date, count) VALUES (%s, %s, 1) "
+                       "ON CONFLICT (article_id, date) DO UPDATE SET count = {table}.count + 1")
+    WINDOWS = {RankingPeriod.WEEK: 7, RankingPeriod.MONTH: 30}
+
+    @classmethod
+    def record_read(cls, article_id: int) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(cls.RECORD_READ_SQL.format(table=ArticleReadDaily._meta.db_table),
+                           [article_id, timezone.localdate()])
+
+    @classmethod
+    def rank(cls, queryset: QuerySet, reads: str, author: str, topic: Optional[str] = None) -> list[dict]:
+        """ Top ``POPULAR_AUTHORS_LIMIT`` authors of ``queryset`` by ``Sum(reads)``, per topic if ``topic`` is given. """
+        if topic:
+            # articles without topics would otherwise land in a ``topic=None`` ranking
+            queryset = queryset.filter(**{f'{topic}__isnull': False})
+        rows = (queryset.order_by().values(author, *([topic] if topic else []))
+                .annotate(reads_count=Sum(reads))
+                .annotate(rank=Window(RowNumber(), partition_by=[F(topic)] if topic else None,
+                                      order_by=[F('reads_count').desc(), F(author)]))
+                .filter(rank__lte=settings.POPULAR_AUTHORS_LIMIT))
+        return [{'author_id': row[author], 'topic_id': row.get(topic), 'reads_count': row['reads_count'],
+                 'rank': row['rank']} for row in rows]
+
+    @classmethod
+    def refresh(cls, now: Optional[datetime] = None) -> int:
+        now = now or timezone.now()
+        today = timezone.localdate(now)
+        sources = {RankingPeriod.ALL_TIME: (
+            Article.objects.filter(status=ArticleStatus.PUBLISH, author__is_active=True),
+            'reads_count', 'author_id', 'topics'
+        )}
+        for period, days in cls.WINDOWS.items():
+            sources[period] = (
+                ArticleReadDaily.objects.filter(date__gt=today - timedelta(days=days),
+                                                article__status=ArticleStatus.PUBLISH,
+                                                article__author__is_active=True),
+                'count', 'article__author_id', 'article__topics'
+            )
+
+        rankings = []
+        for period, (queryset, reads, author, topic) in sources.items():
+            for row in cls.rank(queryset, reads, author) + cls.rank(queryset, reads, author, topic):
+                rankings.append(PopularAuthor(period=period, refreshed_at=now, **row))
+
+        with transaction.atomic():
+            PopularAuthor.objects.all().delete()
+            PopularAuthor.objects.bulk_create(rankings, batch_size=1000)
+        # buckets older than the longest window are never read again
+        ArticleReadDaily.objects.filter(date__lte=today - timedelta(days=max(cls.WINDOWS.values()))).delete()
+        return len(rankings)
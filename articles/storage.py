@@ -0,0 +1,85 @@
+import hashlib
+import os
+import posixpath
+import re
+import uuid
+from typing import Optional
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+DIGEST_RE = re.compile(r'^([0-9a-f]{64})')
+# CKEditor's thumbnail of a stored blob: <upload dir>/<ab>/<sha256>_thumb<ext>
+DERIVED_RE = re.compile(r'^(?P<dirname>(?:.*/)?(?P<prefix>[0-9a-f]{2}))/(?P<digest>[0-9a-f]{64})_thumb(?P<ext>\.\w+)$')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores each file once, under ``<upload dir>/<ab>/<sha256><ext>``.
+
+    Saving content that is already stored only bumps its ``MediaBlob``
+    refcount. Files derived from a stored blob (CKEditor's
+    ``<ab>/<sha256>_thumb.jpg`` next to it) are written only if they don't
+    exist yet, so renditions are made once. Anything else is hashed and
+    stored as a blob of its own, whatever its name looks like.
+    """
+
+    @staticmethod
+    def get_digest(name: str) -> Optional[str]:
+        match = DIGEST_RE.match(posixpath.basename(name))
+        return match.group(1) if match else None
+
+    @staticmethod
+    def get_derived_parent(name: str) -> Optional[str]:
+        """ Name of the blob ``name`` would be derived from, if it has the derived shape. """
+        match = DERIVED_RE.match(name)
+        if match is None or match['prefix'] != match['digest'][:2]:
+            return None
+        return f"{match['dirname']}/{match['digest']}{match['ext']}"
+
+    def is_derived(self, name: str) -> bool:
+        from articles.models import MediaBlob
+
+        parent = self.get_derived_parent(name)
+        return parent is not None and MediaBlob.objects.filter(name=parent).exists()
+
+    @staticmethod
+    def hash_content(content) -> str:
+        # set by core.uploads.HashingTemporaryFileUploadHandler while streaming
+        digest = getattr(content, 'sha256', None)
+        if digest:
+            return digest
+        sha256 = hashlib.sha256()
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        content.seek(0)
+        return sha256.hexdigest()
+
+    def get_available_name(self, name, max_length=None):
+        if self.get_derived_parent(name):
+            # derived names are deterministic, an existing file is simply reused;
+            # any other name is replaced by its digest in _save()
+            return name
+        return super().get_available_name(name, max_length)
+
+    def _save(self, name, content):
+        from articles.models import MediaBlob
+
+        if self.is_derived(name):
+            return self._store(name, content)
+
+        digest = self.hash_content(content)
+        dirname, filename = posixpath.split(name)
+        name = posixpath.join(dirname, digest[:2], f"{digest}{os.path.splitext(filename)[1].lower()}")
+        # the row is taken first, garbage collection only deletes the file under the row's lock
+        MediaBlob.acquire(name, digest, content.size)
+        return self._store(name, content)
+
+    def _store(self, name, content):
+        if self.exists(name):
+            return name
+        # write aside and rename, a concurrent upload of the same file just replaces it with equal bytes
+        temp_name = super()._save(f"{name}.{uuid.uuid4().hex}.part", content)
+        os.replace(self.path(temp_name), self.path(name))
+        return name
@@ -0,0 +1,131 @@
+"""
+Offline "who to follow" suggestions.
+
+Two signals are combined per user, each scaled so its best candidate is 1:
+
+* friends of friends: authors followed by the people the user follows,
+  ``F @ F`` over the follow matrix ``F``;
+* co-reading: authors read together with the authors the user reads,
+  ``R @ C`` where ``C`` is the cosine similarity ``Rᵀ R`` of the user ×
+  author reading matrix ``R``, cut to each author's closest neighbours.
+
+Both products are taken in blocks of rows and pruned to a fixed number of
+entries per row, so memory is bounded by the block, not by users².
+"""
+import time
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from scipy import sparse
+
+from articles.models import AuthorSuggestion, Follow, ReadingHistory
+
+User = get_user_model()
+
+
+def load_edges(queryset, fields: tuple[str, str], user_ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """ Reads a two column id queryset and maps both columns to rows of ``user_ids``, dropping unknown ids. """
+    edges = np.array(list(queryset.order_by().values_list(*fields).iterator(chunk_size=10_000)),
+                     dtype=np.int64).reshape(-1, 2)
+    rows = np.searchsorted(user_ids, edges[:, 0])
+    cols = np.searchsorted(user_ids, edges[:, 1])
+    known = ((rows < len(user_ids)) & (cols < len(user_ids))
+             & (user_ids[rows.clip(max=len(user_ids) - 1)] == edges[:, 0])
+             & (user_ids[cols.clip(max=len(user_ids) - 1)] == edges[:, 1]))
+    return rows[known], cols[known]
+
+
+def build_matrices(user_ids: np.ndarray) -> tuple[sparse.csr_matrix, sparse.csr_matrix]:
+    size = len(user_ids)
+    rows, cols = load_edges(Follow.objects.all(), ('follower_id', 'followee_id'), user_ids)
+    follows = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(size, size))
+
+    rows, cols = load_edges(ReadingHistory.objects.all(), ('user_id', 'article__author_id'), user_ids)
+    reads = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(size, size))
+    # duplicates were summed; damp heavy readers of a single author
+    reads.data = np.log1p(reads.data)
+    return follows, reads
+
+
+def scale_rows(matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+    """ Divides every row by its largest value. """
+    peaks = matrix.max(axis=1).toarray().ravel()
+    peaks[peaks == 0] = 1
+    return sparse.diags(1 / peaks) @ matrix
+
+
+def top_k(row_data: np.ndarray, row_indices: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    if len(row_data) > k:
+        best = np.argpartition(-row_data, k)[:k]
+        row_data, row_indices = row_data[best], row_indices[best]
+    # highest score first, lower user id breaks ties so reruns are stable
+    order = np.lexsort((row_indices, -row_data))
+    return row_data[order], row_indices[order]
+
+
+def keep_top_k(matrix: sparse.csr_matrix, k: int) -> sparse.csr_matrix:
+    """ Keeps the ``k`` largest entries of every row, each row sorted best first. """
+    data, indices, indptr = [], [], [0]
+    for row in range(matrix.shape[0]):
+        row_slice = slice(matrix.indptr[row], matrix.indptr[row + 1])
+        values, columns = top_k(matrix.data[row_slice], matrix.indices[row_slice], k)
+        data.append(values)
+        indices.append(columns)
+        indptr.append(indptr[-1] + len(values))
+    return sparse.csr_matrix((np.concatenate(data or [[]]), np.concatenate(indices or [[]]), indptr),
+                             shape=matrix.shape)
+
+
+def build_co_reading(reads: sparse.csr_matrix, neighbours: int, block_size: int) -> sparse.csr_matrix:
+    """ Author × author cosine similarity, each author keeping its ``neighbours`` closest authors. """
+    norms = np.sqrt(np.asarray(reads.multiply(reads).sum(axis=0)).ravel())
+    norms[norms == 0] = 1
+    scaled = (reads @ sparse.diags(1 / norms)).tocsr()
+    by_author = scaled.T.tocsr()
+    blocks = []
+    for start in range(0, by_author.shape[0], block_size):
+        block = (by_author[start:start + block_size] @ scaled).tocsr()
+        block.setdiag(0, k=start)
+        block.eliminate_zeros()
+        blocks.append(keep_top_k(block, neighbours))
+    return sparse.vstack(blocks, format='csr') if blocks else by_author
+
+
+def compute_author_suggestions(top_k_size: int = None, block_size: int = 5000) -> dict[str, float]:
+    top_k_size = top_k_size or settings.AUTHOR_SUGGESTIONS_TOP_K
+    weights = settings.AUTHOR_SUGGESTIONS_WEIGHTS
+    started = time.perf_counter()
+
+    user_ids = np.array(User.objects.filter(is_active=True).order_by('id').values_list('id', flat=True),
+                        dtype=np.int64)
+    follows, reads = build_matrices(user_ids)
+    co_reads = build_co_reading(reads, settings.AUTHOR_SUGGESTIONS_NEIGHBOURS, block_size)
+
+    written = 0
+    for start in range(0, len(user_ids), block_size):
+        block = slice(start, min(start + block_size, len(user_ids)))
+        scores = (weights['friends_of_friends'] * scale_rows(follows[block] @ follows)
+                  + weights['co_reading'] * scale_rows(reads[block] @ co_reads)).tocsr()
+
+        # never suggest yourself or someone you already follow
+        known = follows[block] + sparse.eye(block.stop - block.start, len(user_ids), k=block.start, format='csr')
+        scores = (scores - scores.multiply(known.astype(bool))).tocsr()
+        scores.eliminate_zeros()
+
+        scores = keep_top_k(scores, top_k_size)
+
+        suggestions = []
+        for offset, user_id in enumerate(user_ids[block]):
+            row = slice(scores.indptr[offset], scores.indptr[offset + 1])
+            suggestions += [
+                AuthorSuggestion(user_id=int(user_id), author_id=int(user_ids[column]), score=float(value), rank=rank)
+                for rank, (value, column) in enumerate(zip(scores.data[row], scores.indices[row]), start=1)
+            ]
+        with transaction.atomic():
+            AuthorSuggestion.objects.filter(user_id__in=user_ids[block].tolist()).delete()
+            AuthorSuggestion.objects.bulk_create(suggestions, batch_size=5000)
+        written += len(suggestions)
+
+    return {'users': len(user_ids), 'suggestions': written, 'seconds': time.perf_counter() - started}
@@ -0,0 +1,122 @@
+import hashlib
+from io import BytesIO
+from typing import Optional
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils.translation import gettext as _
+from PIL import ExifTags, Image, ImageOps
+from loguru import logger
+
+from core.tasks import TaskQueue
+
+# file extension -> Pillow format
+THUMBNAIL_FORMATS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+
+
+def get_rendition_name(digest: str, width: int, ext: str) -> str:
+    """ Renditions are addressed by the hash of the original, so their URLs never change content. """
+    return f"articles/renditions/{digest[:2]}/{digest}/{width}.{ext}"
+
+
+def get_rendition_names(digest: str) -> dict[str, dict[int, str]]:
+    return {
+        ext: {width: get_rendition_name(digest, width, ext) for width in settings.THUMBNAIL_RENDITION_WIDTHS}
+        for ext in THUMBNAIL_FORMATS
+    }
+
+
+def has_thumbnail_renditions(digest: str, storage=default_storage) -> bool:
+    return all(storage.exists(name) for widths in get_rendition_names(digest).values() for name in widths.values())
+
+
+def get_source_width(file) -> int:
+    """ Width of the image in ``file`` once its EXIF rotation is applied. Only the header is read. """
+    image = Image.open(file)
+    # orientations 5-8 turn the image on its side
+    if image.getexif().get(ExifTags.Base.Orientation) in (5, 6, 7, 8):
+        return image.height
+    return image.width
+
+
+def store_thumbnail_renditions(data: bytes, storage=default_storage) -> tuple[str, int]:
+    """
+    Writes every width/format of the image in ``data`` that isn't stored yet
+    and returns its SHA-256 and width. Images are never upscaled, so widths
+    past the source's hold the source size.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    source_width = get_source_width(BytesIO(data))
+    names = get_rendition_names(digest)
+    missing = [(ext, width, name) for ext, widths in names.items() for width, name in widths.items()
+               if not storage.exists(name)]
+    if not missing:
+        return digest, source_width
+
+    image = Image.open(BytesIO(data))
+    image.draft('RGB', (max(settings.THUMBNAIL_RENDITION_WIDTHS), 1))
+    image = ImageOps.exif_transpose(image).convert('RGB')
+
+    resized = {}
+    # largest first, each width is scaled down from the previous one
+    for width in sorted(settings.THUMBNAIL_RENDITION_WIDTHS, reverse=True):
+        if width < image.width:
+            image = image.resize((width, max(round(image.height * width / image.width), 1)),
+                                 Image.Resampling.LANCZOS)
+        resized[width] = image
+
+    for ext, width, name in missing:
+        content = BytesIO()
+        resized[width].save(content, format=THUMBNAIL_FORMATS[ext], quality=settings.THUMBNAIL_RENDITION_QUALITY)
+        storage.save(name, ContentFile(content.getvalue()))
+    return digest, source_width
+
+
+def get_thumbnail_srcset(digest: str, source_width: Optional[int] = None,
+                         build_url=None) -> Optional[dict[str, str]]:
+    """
+    ``{'webp': 'url 160w, url 320w, ...', 'jpg': ...}`` or ``None`` while
+    renditions are pending. Widths stop at the first rendition that holds the
+    whole source, which is listed at its real width; larger ones are copies.
+    """
+    if not digest:
+        return None
+    build_url = build_url or (lambda url: url)
+    srcset = {}
+    for ext, widths in get_rendition_names(digest).items():
+        candidates = []
+        for width, name in sorted(widths.items()):
+            candidates.append(f"{build_url(default_storage.url(name))} {min(width, source_width or width)}w")
+            if source_width and width >= source_width:
+                break
+        srcset[ext] = ", ".join(candidates)
+    return srcset
+
+
+@TaskQueue.register
+def generate_thumbnail_renditions(article_id: int, thumbnail_name: str) -> None:
+    from articles.models import Article
+
+    article = Article.objects.filter(id=article_id, thumbnail=thumbnail_name).first()
+    if article is None:
+        # the thumbnail was replaced or removed after the job was queued
+        return
+
+    with article.thumbnail.open('rb') as source:
+        digest, width = store_thumbnail_renditions(source.read())
+    Article.objects.filter(id=article_id, thumbnail=thumbnail_name).update(thumbnail_hash=digest,
+                                                                           thumbnail_width=width)
+    logger.info(f"Thumbnail renditions for article {article_id} stored under {digest}")
+
+
+@TaskQueue.register
+def notify_followers_of_article(article_id: int) -> None:
+    from articles.models import Article
+    from articles.services import NotificationService
+
+    article = Article.objects.select_related('author').filter(id=article_id).first()
+    if article is None:
+        return
+    message = _("{author} yangi maqola chop etdi: {title}").format(author=article.author.username, title=article.title)
+    NotificationService.fan_out(article.author_id, message, event=f"article_published:{article.id}")
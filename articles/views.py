@@ -1,6 +1,5 @@
-from django.db.models import Sum
 from django.shortcuts import get_object_or_404
-from rest_framework import permissions, status, viewsets, parsers, generics, exceptions
+from rest_framework import permissions, status, viewsets, generics, exceptions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
@@ -8,21 +7,27 @@ from django.utils.translation import gettext_lazy as _
 from drf_spectacular.utils import extend_schema, extend_schema_view
 from .models import (
     Topic, Article, TopicFollow, ArticleStatus,
-    Comment, Favorite, Clap, ReadingHistory, Follow,
-    Recommendation, Pin, Notification, Report, FAQ)
+    Comment, Favorite, Clap, ReadingHistory,
+    Recommendation, Pin, Notification, Report, FAQ, PopularAuthor, RankingPeriod)
 from .serializers import (
     ArticleListSerializer, ArticleCreateSerializer,
     ArticleDetailSerializer, CommentSerializer,
     FavoriteSerializer, ClapSerializer, DefaultResponseSerializer,
     ReadingHistorySerializer, RecommendationSerializer,
     NotificationSerializer, ReportSerializer, FAQSerializer,
-    ArticleDetailCommentsSerializer, CommentResponseSerializer)
+    ArticleDetailCommentsSerializer, CommentResponseSerializer, UnreadCountSerializer,
+    MarkReadSerializer, FollowStatusSerializer, PopularAuthorsQuerySerializer)
+from core.uploads import StreamingMultiPartParser
 from users.serializers import UserSerializer
 from django_filters.rest_framework import DjangoFilterBackend
 from .filters import ArticleFilter, SearchFilter
+from .pagination import KnownCountPagination
+from .services import (
+    FollowGraph, FollowService, NotificationDigest, NotificationService, PopularAuthorService, TopicAffinity,
+    UnreadCounter
+)
 from rest_framework.decorators import action
-from django.utils import timezone
-from django.db import models
+from django.db import models, transaction
 from typing import Dict, Any
 
 User = get_user_model()
@@ -80,7 +85,7 @@ class ArticlesView(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     filterset_class = ArticleFilter
     filter_backends = [DjangoFilterBackend]
-    parser_classes = [parsers.MultiPartParser]
+    parser_classes = [StreamingMultiPartParser]
     http_method_names = ['get', 'post', 'patch', 'delete']
 
     def get_serializer_class(self):
@@ -108,9 +113,12 @@ class ArticlesView(viewsets.ModelViewSet):
         instance.views_count += 1
         instance.save(update_fields=['views_count'])
 
-        ReadingHistory.objects.get_or_create(
+        history, is_created = ReadingHistory.objects.get_or_create(
             user=request.user, article=instance
         )
+        if is_created:
+            user_id = request.user.id
+            transaction.on_commit(lambda: TopicAffinity.article_signal(user_id, instance.id, 'read'))
 
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
@@ -199,6 +207,7 @@ class ArticlesView(viewsets.ModelViewSet):
         try:
             article.reads_count += 1
             article.save(update_fields=['reads_count'])
+            PopularAuthorService.record_read(article.id)
             return Response({"detail": _("Maqolani o'qish soni ortdi.")}, status=status.HTTP_200_OK)
         except Article.DoesNotExist:
             raise exceptions.NotFound
@@ -258,6 +267,7 @@ class TopicFollowView(APIView):
             user=user, topic=topic)
 
         if is_created:
+            transaction.on_commit(lambda: TopicAffinity.add(user.id, [topic.id], 'follow'))
             return Response(
                 {"detail": _("Siz '{topic_name}' mavzusini kuzatyapsiz.").format(topic_name=topic.name)},
                 status=status.HTTP_201_CREATED
@@ -277,6 +287,7 @@ class TopicFollowView(APIView):
         try:
             topic_follow = TopicFollow.objects.get(user=user, topic=topic)
             topic_follow.delete()
+            transaction.on_commit(lambda: TopicAffinity.add(user.id, [topic.id], 'follow', -1))
             return Response(status=status.HTTP_204_NO_CONTENT)
         except TopicFollow.DoesNotExist:
             return Response(
@@ -286,6 +297,13 @@ class TopicFollowView(APIView):
 
 
 @extend_schema_view(
+    get=extend_schema(
+        summary="Do I follow this author",
+        request=None,
+        responses=default_response(
+            (200, FollowStatusSerializer), 401
+        )
+    ),
     post=extend_schema(
         summary="Follow a author",
         request=None,
@@ -304,8 +322,8 @@ class TopicFollowView(APIView):
 class AuthorFollowView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
-    def create_notification(self, user, message):
-        Notification.objects.create(user=user, message=message)
+    def get(self, request, *args, **kwargs):
+        return Response({'is_following': FollowGraph.is_following(request.user.id, self.kwargs.get('id'))})
 
     def post(self, request, *args, **kwargs):
         author_id = self.kwargs.get('id')
@@ -314,10 +332,9 @@ class AuthorFollowView(APIView):
         followee = get_object_or_404(User, id=author_id)
 
         try:
-            follow, is_created = Follow.objects.get_or_create(follower=follower, followee=followee)
-            if is_created:
-                message_followee = _("{} sizga follow qildi.").format(follower.username)
-                self.create_notification(followee, message_followee)
+            if FollowService.follow(follower, followee):
+                # a popular author gets one "X va yana N kishi" row per window instead of one per follower
+                NotificationDigest.add(followee.id, 'follow', follower.id, follower.username)
                 return Response({'detail': _("Mofaqqiyatli follow qilindi.")}, status=status.HTTP_201_CREATED)
             else:
                 return Response({'detail': _("Siz allaqachon ushbu foydalanuvchini kuzatyapsiz.")},
@@ -332,12 +349,9 @@ class AuthorFollowView(APIView):
         follower = request.user
         followee = get_object_or_404(User, id=author_id)
 
-        try:
-            follow = Follow.objects.get(follower=follower, followee=followee)
-            follow.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        except Follow.DoesNotExist:
+        if not FollowService.unfollow(follower, followee):
             raise exceptions.NotFound(detail=_("Follow relationship not found"))
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 @extend_schema_view(
@@ -446,6 +460,7 @@ class FavoriteArticleView(generics.CreateAPIView, generics.DestroyAPIView):
         favorite, is_created = Favorite.objects.get_or_create(
             user=request.user, article=article)
         if is_created:
+            transaction.on_commit(lambda: TopicAffinity.article_signal(request.user.id, article.id, 'favorite'))
             return Response({'detail': _("Maqola sevimlilarga qo'shildi.")}, status=status.HTTP_201_CREATED)
         else:
             return Response({'detail': _("Maqola sevimlilarga allaqachon qo'shilgan.")}, status=status.HTTP_400_BAD_REQUEST)
@@ -455,6 +470,7 @@ class FavoriteArticleView(generics.CreateAPIView, generics.DestroyAPIView):
         favorite = get_object_or_404(
             Favorite, user=request.user, article=article)
         favorite.delete()
+        transaction.on_commit(lambda: TopicAffinity.article_signal(request.user.id, article.id, 'favorite', -1))
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -503,6 +519,8 @@ class ClapView(generics.GenericAPIView):
         clap, is_created = Clap.objects.get_or_create(user=user, article=article)
         clap.count = min(clap.count + 1, 50)
         clap.save()
+        if is_created:
+            transaction.on_commit(lambda: TopicAffinity.article_signal(user.id, article.id, 'clap'))
 
         response_serializer = self.serializer_class(clap)
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
@@ -514,6 +532,7 @@ class ClapView(generics.GenericAPIView):
         try:
             clap = Clap.objects.get(user=user, article=article)
             clap.delete()
+            transaction.on_commit(lambda: TopicAffinity.article_signal(user.id, article.id, 'clap', -1))
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Clap.DoesNotExist:
             raise exceptions.NotFound
@@ -521,8 +540,9 @@ class ClapView(generics.GenericAPIView):
 
 @extend_schema_view(
     get=extend_schema(
-        summary="Popular Authors recommendations with reads count",
+        summary="Who to follow: precomputed suggestions, or the most read authors of a period and topic",
         request=None,
+        parameters=[PopularAuthorsQuerySerializer],
         responses=default_response(
             (200, UserSerializer), 400, 401, 404
         )
@@ -533,12 +553,24 @@ class PopularAuthorsView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return User.objects.filter(
-            is_active=True,
-            article__status=ArticleStatus.PUBLISH
-        ).annotate(
-            total_reads_count=Sum('article__reads_count')
-        ).order_by('-total_reads_count')[:5]
+        user = self.request.user
+        query = PopularAuthorsQuerySerializer(data=self.request.query_params)
+        query.is_valid(raise_exception=True)
+        if not query.validated_data:
+            # suggestions are computed offline, skip authors followed since
+            suggested = list(User.objects.filter(
+                suggested_to__user=user, is_active=True
+            ).exclude(
+                followers__follower=user
+            ).order_by('suggested_to__rank')[:5])
+            if suggested:
+                return suggested
+        rankings = PopularAuthor.objects.filter(
+            period=query.validated_data.get('period', RankingPeriod.ALL_TIME),
+            topic_id=query.validated_data.get('topic'),
+            author__is_active=True
+        ).select_related('author').order_by('rank')[:5]
+        return [ranking.author for ranking in rankings]
 
 
 @extend_schema_view(
@@ -570,11 +602,15 @@ class ReadingHistoryView(generics.ListAPIView):
 class FollowersListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = UserSerializer
+    pagination_class = KnownCountPagination
 
     def get_queryset(self):
         user_id = self.request.user.id
         return User.objects.filter(following__followee_id=user_id, is_active=True)
 
+    def get_count(self):
+        return self.request.user.followers_count
+
 
 @extend_schema_view(
     get=extend_schema(
@@ -588,11 +624,32 @@ class FollowersListView(generics.ListAPIView):
 class FollowingListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = UserSerializer
+    pagination_class = KnownCountPagination
 
     def get_queryset(self):
         user_id = self.request.user.id
         return User.objects.filter(followers__follower_id=user_id, is_active=True)
 
+    def get_count(self):
+        return self.request.user.following_count
+
+
+@extend_schema_view(
+    get=extend_schema(
+        summary="Mutual follows",
+        request=None,
+        responses={
+            200: UserSerializer
+        }
+    )
+)
+class MutualFollowsView(generics.ListAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = UserSerializer
+
+    def get_queryset(self):
+        return User.objects.filter(id__in=FollowGraph.mutuals(self.request.user.id), is_active=True)
+
 
 @extend_schema_view(
     post=extend_schema(
@@ -639,6 +696,8 @@ class RecommendationView(generics.GenericAPIView):
                     recommendation.more.remove(topic)
                 recommendation.less.add(topic)
 
+        # feedback moves topics between "more" and "less", rebuilding is simpler than undoing
+        transaction.on_commit(lambda: TopicAffinity.invalidate(user.id))
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -663,23 +722,51 @@ class RecommendationView(generics.GenericAPIView):
         responses=default_response(
             (204, None), 400, 401, 404
         )
+    ),
+    unread_count=extend_schema(
+        summary="Number of unread notifications",
+        request=None,
+        responses=default_response(
+            (200, UnreadCountSerializer), 401
+        )
+    ),
+    create=extend_schema(exclude=True),
+    mark_read=extend_schema(
+        summary="Mark notifications as read",
+        request=MarkReadSerializer,
+        responses=default_response(
+            (200, MarkReadSerializer), 400, 401
+        )
     )
 )
 class UserNotificationView(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = NotificationSerializer
-    http_method_names = ['get', 'patch']
+    http_method_names = ['get', 'patch', 'post']
 
     def get_queryset(self):
         return Notification.objects.filter(user=self.request.user, read_at__isnull=True)
 
+    def create(self, request, *args, **kwargs):
+        # POST is only open for the mark_read action
+        raise exceptions.MethodNotAllowed(request.method)
 
     def partial_update(self, request, *args, **kwargs):
         instance = self.get_object()
-        instance.read_at = timezone.now()
-        instance.save()
+        NotificationService.mark_read(request.user.id, ids=[instance.id])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False, methods=['post'])
+    def mark_read(self, request, *args, **kwargs):
+        serializer = MarkReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        marked = NotificationService.mark_read(request.user.id, **serializer.validated_data)
+        return Response({'marked': marked})
+
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request, *args, **kwargs):
+        return Response({'unread_count': UnreadCounter.get(request.user.id)})
+
 
 @extend_schema_view(
     post=extend_schema(
@@ -3,6 +3,9 @@ ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The notification stream (``NOTIFICATION_STREAM_PATH``) is served here
+without a thread per connection, see ``core.events``.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
@@ -13,4 +16,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from core.events import NotificationStream, Router  # noqa: E402
+
+application = Router(django_application, NotificationStream())
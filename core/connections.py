@@ -0,0 +1,21 @@
+"""
+Redis clients for the services.
+
+Every service reads and writes through the pooled connection of the
+``default`` cache (``REDIS_URL``), so a call doesn't open a new TCP
+connection and the address is configured in one place. Services keep
+their own ``get_redis_client`` so tests can fail a single one.
+"""
+import redis
+import redis.asyncio
+from django.conf import settings
+from django_redis import get_redis_connection
+
+
+def get_redis_client() -> redis.Redis:
+    return get_redis_connection("default")
+
+
+def get_async_redis_client() -> redis.asyncio.Redis:
+    # asyncio connections belong to one event loop, so they can't share the pool above
+    return redis.asyncio.Redis.from_url(settings.REDIS_URL)
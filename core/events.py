@@ -0,0 +1,192 @@
+import asyncio
+import json
+from collections import defaultdict
+from typing import Optional
+from urllib.parse import parse_qs
+
+import redis
+import redis.asyncio
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from loguru import logger
+
+from core import connections
+
+
+def get_channel(user_id) -> str:
+    return f"user:{user_id}:notifications"
+
+
+def publish(payloads: dict[int, dict]) -> None:
+    """ Sends every user of ``payloads`` its payload on their open notification streams. """
+    try:
+        pipeline = NotificationHub.get_redis_client().pipeline(transaction=False)
+        for user_id, payload in payloads.items():
+            pipeline.publish(get_channel(user_id), json.dumps(payload, default=str))
+        pipeline.execute()
+    except redis.RedisError as e:
+        # live delivery is best effort, the notification itself is stored
+        logger.warning(f"Notification was not published: {e}")
+
+
+def authenticate(raw_token: bytes) -> int:
+    """ Runs the same checks as ``CustomJWTAuthentication`` and returns the user id. """
+    from users.authentications import CustomJWTAuthentication
+
+    try:
+        authentication = CustomJWTAuthentication()
+        token = authentication.get_validated_token(raw_token)
+        user = authentication.get_user(token)
+        authentication.is_valid_access_token(user, token)
+        return user.id
+    finally:
+        close_old_connections()
+
+
+class NotificationHub:
+    """
+    One Redis pub/sub connection per process, shared by every open stream.
+    Messages are copied to the bounded queue of each subscriber; a client
+    too slow to keep up loses messages instead of growing memory.
+    """
+
+    def __init__(self):
+        self.queues: dict[str, set[asyncio.Queue]] = defaultdict(set)
+        self.pubsub = None
+        self.reader: Optional[asyncio.Task] = None
+        # SUBSCRIBE/UNSUBSCRIBE of one channel must not interleave
+        self.lock = asyncio.Lock()
+
+    @classmethod
+    def get_redis_client(cls) -> redis.Redis:
+        return connections.get_redis_client()
+
+    @classmethod
+    def get_async_redis_client(cls) -> redis.asyncio.Redis:
+        return connections.get_async_redis_client()
+
+    async def subscribe(self, user_id: int) -> asyncio.Queue:
+        channel = get_channel(user_id)
+        queue = asyncio.Queue(maxsize=settings.NOTIFICATION_STREAM_QUEUE_SIZE)
+        if self.pubsub is None:
+            self.pubsub = self.get_async_redis_client().pubsub(ignore_subscribe_messages=True)
+        async with self.lock:
+            # the queue is registered only once the channel is subscribed, so a
+            # failed SUBSCRIBE leaves nothing behind and the next stream retries it
+            if channel not in self.queues:
+                await self.pubsub.subscribe(channel)
+            self.queues[channel].add(queue)
+        if self.reader is None:
+            self.reader = asyncio.create_task(self.read())
+        return queue
+
+    async def unsubscribe(self, user_id: int, queue: asyncio.Queue) -> None:
+        channel = get_channel(user_id)
+        async with self.lock:
+            self.queues[channel].discard(queue)
+            if not self.queues[channel]:
+                del self.queues[channel]
+                await self.pubsub.unsubscribe(channel)
+
+    async def read(self) -> None:
+        while True:
+            try:
+                message = await self.pubsub.get_message(timeout=1.0)
+            except redis.RedisError as e:
+                # redis-py reconnects and subscribes again on the next read
+                logger.warning(f"Notification hub lost Redis: {e}")
+                await asyncio.sleep(1)
+                continue
+            if not message or message['type'] != 'message':
+                continue
+            for queue in self.queues.get(message['channel'].decode(), ()):
+                if not queue.full():
+                    queue.put_nowait(message['data'])
+
+
+class NotificationStream:
+    """
+    ASGI app serving ``NOTIFICATION_STREAM_PATH`` as Server-Sent Events.
+
+    The JWT is checked once when the stream opens, after that a connection
+    is a coroutine waiting on its queue, with a comment line every
+    ``NOTIFICATION_STREAM_HEARTBEAT`` seconds to keep proxies from closing
+    it. Browsers' EventSource can't send headers, so the token is also
+    accepted as ``?token=``.
+    """
+
+    def __init__(self):
+        self.hub = NotificationHub()
+
+    @staticmethod
+    def get_raw_token(scope) -> Optional[bytes]:
+        headers = dict(scope['headers'])
+        scheme, _, token = headers.get(b'authorization', b'').partition(b' ')
+        if scheme.lower() == b'bearer' and token:
+            return token
+        token = parse_qs(scope.get('query_string', b'').decode()).get('token')
+        return token[0].encode() if token else None
+
+    @staticmethod
+    async def send_json(send, status: int, detail: str) -> None:
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body', 'body': json.dumps({'detail': detail}).encode()})
+
+    @staticmethod
+    async def wait_for_disconnect(receive) -> None:
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    async def __call__(self, scope, receive, send):
+        if scope['method'] != 'GET':
+            return await self.send_json(send, 405, "Method not allowed")
+        raw_token = self.get_raw_token(scope)
+        try:
+            user_id = await sync_to_async(authenticate, thread_sensitive=False)(raw_token) if raw_token else None
+        except Exception as e:
+            logger.debug(f"Notification stream refused: {e}")
+            user_id = None
+        if user_id is None:
+            return await self.send_json(send, 401, "Authentication credentials were not provided or are invalid.")
+
+        queue = None
+        disconnected = asyncio.ensure_future(self.wait_for_disconnect(receive))
+        try:
+            queue = await self.hub.subscribe(user_id)
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                # nginx would otherwise buffer the stream
+                (b'x-accel-buffering', b'no'),
+            ]})
+            await send({'type': 'http.response.body', 'body': b'retry: 5000\n\n', 'more_body': True})
+            while not disconnected.done():
+                getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({getter, disconnected}, timeout=settings.NOTIFICATION_STREAM_HEARTBEAT,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    body = b'event: notification\ndata: ' + getter.result() + b'\n\n'
+                else:
+                    getter.cancel()
+                    body = b': ping\n\n'
+                if not disconnected.done():
+                    await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+        finally:
+            disconnected.cancel()
+            if queue is not None:
+                await self.hub.unsubscribe(user_id, queue)
+
+
+class Router:
+    """ Sends the notification stream to ``NotificationStream`` and everything else to Django. """
+
+    def __init__(self, django_app, stream_app):
+        self.django_app = django_app
+        self.stream_app = stream_app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] == settings.NOTIFICATION_STREAM_PATH:
+            return await self.stream_app(scope, receive, send)
+        return await self.django_app(scope, receive, send)
@@ -0,0 +1,162 @@
+import mimetypes
+import os
+import re
+from typing import Optional
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+from rest_framework import permissions
+from rest_framework.views import APIView
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# articles.tasks.get_rendition_name
+RENDITION_RE = re.compile(r'^articles/renditions/[0-9a-f]{2}/([0-9a-f]{64})/')
+
+
+class RangeFile:
+    """
+    File object limited to ``length`` bytes from ``start``. It keeps
+    ``fileno()``, so WSGI servers with a file wrapper still use sendfile(2).
+    """
+
+    def __init__(self, file, start: int, length: int):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def tell(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class MediaView(APIView):
+    """
+    Serves MEDIA_ROOT after an authorization check.
+
+    With ``MEDIA_SERVE_MODE`` set to ``x-accel`` (nginx) or ``x-sendfile``
+    (Apache, lighttpd) only headers are returned and the proxy sends the file,
+    range requests included. The ``django`` mode streams it from the worker.
+    """
+    permission_classes = [permissions.AllowAny]
+    http_method_names = ['get', 'head']
+
+    def get(self, request, path):
+        try:
+            full_path = safe_join(settings.MEDIA_ROOT, path)
+        except SuspiciousFileOperation:
+            raise Http404
+        if not os.path.isfile(full_path):
+            raise Http404
+        access = self.get_access(request, path)
+        if access is None:
+            raise Http404
+
+        stat = os.stat(full_path)
+        if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+            return HttpResponseNotModified()
+
+        content_type, encoding = mimetypes.guess_type(full_path)
+        mode = settings.MEDIA_SERVE_MODE
+        if mode == 'x-accel':
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = quote(f"{settings.MEDIA_ACCEL_PREFIX.rstrip('/')}/{path}")
+        elif mode == 'x-sendfile':
+            response = HttpResponse(content_type=content_type)
+            response['X-Sendfile'] = full_path
+        else:
+            response = self.file_response(request, full_path, stat.st_size, content_type)
+
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        if access == 'private':
+            # shown to the author of a draft, a shared cache must not hand it to anyone else
+            response['Cache-Control'] = 'private'
+        elif path.startswith('articles/renditions/'):
+            response['Cache-Control'] = settings.RENDITION_CACHE_CONTROL
+        return response
+
+    @staticmethod
+    def file_response(request, full_path: str, size: int, content_type: Optional[str]):
+        byte_range = MediaView.parse_range(request.META.get('HTTP_RANGE'), size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f"bytes */{size}"
+            return response
+
+        file = open(full_path, 'rb')
+        if byte_range is None:
+            response = FileResponse(file, content_type=content_type)
+        else:
+            start, end = byte_range
+            response = FileResponse(RangeFile(file, start, end - start + 1), status=206, content_type=content_type)
+            response['Content-Length'] = end - start + 1
+            response['Content-Range'] = f"bytes {start}-{end}/{size}"
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+    @staticmethod
+    def parse_range(header: Optional[str], size: int):
+        """
+        Returns ``(start, end)`` for a single satisfiable range, ``None`` to
+        send the whole file and ``False`` for 416. Multiple ranges are answered
+        with the whole file, which RFC 9110 allows.
+        """
+        match = RANGE_RE.match(header or '')
+        if not match or match.groups() == ('', ''):
+            return None
+        start, end = match.groups()
+        if not start:
+            start, end = max(size - int(end), 0), size - 1
+        else:
+            start, end = int(start), min(int(end), size - 1) if end else size - 1
+        if start >= size or start > end:
+            return False
+        return start, end
+
+    def get_access(self, request, path: str) -> Optional[str]:
+        """
+        ``'public'``, ``'private'`` when only this user may see the file, or
+        ``None`` when it is hidden. Thumbnails of drafts and trashed articles,
+        and the renditions made from them, stay private. One indexed query.
+        """
+        if path.startswith('articles/thumbnails/'):
+            lookup = Q(thumbnail=path)
+        elif path.startswith('articles/renditions/'):
+            match = RENDITION_RE.match(path)
+            if not match:
+                return None
+            lookup = Q(thumbnail_hash=match.group(1))
+        else:
+            return 'public'
+
+        from articles.models import Article, ArticleStatus
+
+        user = request.user
+        visible = Q(status=ArticleStatus.PUBLISH)
+        if user.is_authenticated:
+            visible |= Q(author=user)
+        statuses = set(Article.objects.filter(lookup, visible).order_by().values_list('status', flat=True).distinct())
+        if ArticleStatus.PUBLISH in statuses:
+            return 'public'
+        if statuses or (user.is_authenticated and user.is_staff):
+            return 'private'
+        return None
@@ -115,6 +115,19 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Argon2id first, older PBKDF2 hashes are upgraded on the next login.
+# Defaults follow the OWASP minimum (19 MiB, 2 passes, 1 lane).
+PASSWORD_HASHERS = [
+    'users.hashers.TunedArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+ARGON2_TIME_COST = config('ARGON2_TIME_COST', default=2, cast=int)
+ARGON2_MEMORY_COST = config('ARGON2_MEMORY_COST', default=19456, cast=int)
+ARGON2_PARALLELISM = config('ARGON2_PARALLELISM', default=1, cast=int)
+
 # Internationalization
 
 LANGUAGE_CODE = 'en-us'
@@ -149,10 +162,23 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / "media"
 
+# core.media.MediaView: "django" streams files from the worker, "x-accel" (nginx) and
+# "x-sendfile" (Apache, lighttpd) only authorize and let the proxy send them
+MEDIA_SERVE_MODE = config('MEDIA_SERVE_MODE', default='django')
+# internal nginx location aliased to MEDIA_ROOT, used with x-accel
+MEDIA_ACCEL_PREFIX = config('MEDIA_ACCEL_PREFIX', default='/protected-media/')
+
+# Image uploads on the article and avatar endpoints stream to temp files (core.uploads)
+UPLOAD_MAX_SIZE = config('UPLOAD_MAX_SIZE', default=10 * 1024 * 1024, cast=int)
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
 
 # ckeditor
 CKEDITOR_BASEPATH = "/static/ckeditor/ckeditor/"
 CKEDITOR_UPLOAD_PATH = "uploads/"
+# uploads are stored by content hash, so date folders would only split identical files
+CKEDITOR_STORAGE_BACKEND = 'articles.storage.ContentAddressedStorage'
+CKEDITOR_RESTRICT_BY_DATE = False
 CKEDITOR_IMAGE_BACKEND = "pillow"
 
 CKEDITOR_CONFIGS = {
@@ -173,7 +199,6 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.BasicAuthentication',
         'users.authentications.CustomJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -182,6 +207,9 @@ REST_FRAMEWORK = {
     'DATETIME_FORMAT': '%Y-%m-%d %H:%M:%S',
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 10,
+    # proxies in front of the app that append to X-Forwarded-For, 0 when clients connect directly;
+    # throttles identify clients by the address the nearest of them saw (REMOTE_ADDR with 0)
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
 }
 
 # drf_spectacular
@@ -234,6 +262,12 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=10),
 }
 
+# "allowlist" keeps per-session jti sets in Redis, "generation" compares a per-user counter claim
+TOKEN_REVOCATION_MODE = config('TOKEN_REVOCATION_MODE', default='allowlist')
+# unix time from which every token must be in the allowlist; set it to the deploy time
+# while tokens issued before allowlists were recorded are still alive, then unset it
+TOKEN_ALLOWLIST_REQUIRED_SINCE = config('TOKEN_ALLOWLIST_REQUIRED_SINCE', default=0, cast=float)
+
 # Custom User
 
 AUTH_USER_MODEL = 'users.CustomUser'
@@ -247,6 +281,64 @@ DJANGORESIZED_DEFAULT_KEEP_META = True
 DJANGORESIZED_DEFAULT_FORMAT_EXTENSIONS = {'JPEG': ".jpg"}
 DJANGORESIZED_DEFAULT_NORMALIZE_ROTATION = True
 
+# rows per INSERT when a notification goes out to all followers of an author
+NOTIFICATION_FANOUT_BATCH_SIZE = 2000
+# read notifications older than this are moved to the archive table
+NOTIFICATION_RETENTION_DAYS = config('NOTIFICATION_RETENTION_DAYS', default=90, cast=int)
+NOTIFICATION_ARCHIVE_BATCH_SIZE = 1000
+# PostgreSQL only, read when the archive table is created
+NOTIFICATION_ARCHIVE_PARTITIONED = config('NOTIFICATION_ARCHIVE_PARTITIONED', default=False, cast=bool)
+
+# follows of one author within this many seconds become one notification
+NOTIFICATION_DIGEST_WINDOW = config('NOTIFICATION_DIGEST_WINDOW', default=300, cast=int)
+# a follower who unfollows and follows again is announced again only after this many seconds
+NOTIFICATION_DIGEST_REPEAT_AFTER = config('NOTIFICATION_DIGEST_REPEAT_AFTER', default=7 * 24 * 60 * 60, cast=int)
+
+# authors kept per popular-authors ranking, see `manage.py refresh_popular_authors`
+POPULAR_AUTHORS_LIMIT = config('POPULAR_AUTHORS_LIMIT', default=50, cast=int)
+
+# follow graph sets in Redis live this long without writes
+GRAPH_CACHE_TTL = 24 * 60 * 60
+
+# topic affinity of a user: weight each signal adds to the topics it touches
+TOPIC_AFFINITY_WEIGHTS = {
+    'more': 3.0,
+    'less': -3.0,
+    'follow': 2.0,
+    'favorite': 1.5,
+    'clap': 1.0,
+    'read': 0.5,
+}
+# affinity hashes in Redis are rebuilt this often, bounding drift
+TOPIC_AFFINITY_TTL = 24 * 60 * 60
+# newest articles scored for the ?is_recommend=true feed
+TOPIC_AFFINITY_CANDIDATES = config('TOPIC_AFFINITY_CANDIDATES', default=500, cast=int)
+
+# "who to follow", computed offline by `manage.py compute_author_suggestions`
+AUTHOR_SUGGESTIONS_TOP_K = config('AUTHOR_SUGGESTIONS_TOP_K', default=20, cast=int)
+# co-read authors kept per author, bounds the author × author matrix
+AUTHOR_SUGGESTIONS_NEIGHBOURS = config('AUTHOR_SUGGESTIONS_NEIGHBOURS', default=50, cast=int)
+AUTHOR_SUGGESTIONS_WEIGHTS = {
+    'friends_of_friends': 1.0,
+    'co_reading': 0.5,
+}
+
+# Server-Sent Events stream served by core.asgi
+NOTIFICATION_STREAM_PATH = '/users/notifications/stream/'
+NOTIFICATION_STREAM_HEARTBEAT = 15
+# messages kept for a client that reads slower than they arrive
+NOTIFICATION_STREAM_QUEUE_SIZE = 100
+
+# Avatars are stored as uploaded and resized by `manage.py run_task_worker`
+AVATAR_RENDITION_SIZE = (300, 300)
+AVATAR_RENDITION_QUALITY = DJANGORESIZED_DEFAULT_QUALITY
+
+# Article thumbnails are rendered at these widths in WebP and JPEG
+THUMBNAIL_RENDITION_WIDTHS = (160, 320, 640, 1280)
+THUMBNAIL_RENDITION_QUALITY = 80
+# renditions live under content hashes, so they can be cached forever
+RENDITION_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
 REDIS_HOST = config('REDIS_HOST', default='localhost')
 REDIS_PORT = config('REDIS_PORT', default='6379')
 REDIS_DB = config('REDIS_DB', default='1')
@@ -265,9 +357,25 @@ CACHES = {
     }
 }
 
+# authenticated user snapshots (users.cache.UserSnapshotCache)
+USER_SNAPSHOT_TTL = config('USER_SNAPSHOT_TTL', default=300, cast=int)
+USER_SNAPSHOT_LOCAL_TTL = config('USER_SNAPSHOT_LOCAL_TTL', default=5, cast=int)
+USER_SNAPSHOT_LOCAL_MAXSIZE = config('USER_SNAPSHOT_LOCAL_MAXSIZE', default=1024, cast=int)
+
 SESSION_ENGINE = "django.contrib.sessions.backends.cache"
 SESSION_CACHE_ALIAS = "default"
 
+OTP_MAX_ATTEMPTS = config('OTP_MAX_ATTEMPTS', default=5, cast=int)
+
+# users.throttling.SlidingWindowRateThrottle, keyed by view.throttle_scope
+RATE_LIMIT_ENABLED = config('RATE_LIMIT_ENABLED', default=True, cast=bool)
+RATE_LIMITS = {
+    'login': {'ip': '30/min', 'username': '10/min'},
+    'signup': {'ip': '20/hour'},
+    'password_forgot': {'ip': '20/hour', 'email': '5/hour'},
+    'password_forgot_verify': {'ip': '60/hour', 'email': '10/hour'},
+}
+
 BIRTH_YEAR_MIN = 1900
 BIRTH_YEAR_MAX = datetime.now().year
 
@@ -280,6 +388,12 @@ EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
 EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='your_email@gmail.com')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='your_password')
 
+# users.models.EmailOutbox, delivered by `manage.py run_mail_worker`
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', default=6, cast=int)
+EMAIL_OUTBOX_RETRY_BASE = config('EMAIL_OUTBOX_RETRY_BASE', default=30, cast=int)  # seconds
+EMAIL_OUTBOX_RETRY_MAX = config('EMAIL_OUTBOX_RETRY_MAX', default=60 * 60, cast=int)
+EMAIL_OUTBOX_LEASE = config('EMAIL_OUTBOX_LEASE', default=5 * 60, cast=int)
+
 # LOGURU settings
 LOG_DIR = os.path.join(BASE_DIR, 'logs')
 LOG_FILE = '/debug.log'
@@ -0,0 +1,76 @@
+import importlib
+import json
+from typing import Callable, Optional
+
+import redis
+from django.db import transaction
+from loguru import logger
+
+from core import connections
+
+
+class TaskQueue:
+    """
+    Minimal Redis list queue for work that shouldn't run in the request thread.
+
+    Only functions registered with ``TaskQueue.register`` can be executed by
+    ``manage.py run_task_worker``. Jobs are pushed after the surrounding
+    transaction commits so the worker never sees rows that aren't there yet.
+    """
+    QUEUE_KEY = "tasks:queue"
+    _tasks = {}
+
+    @classmethod
+    def get_redis_client(cls) -> redis.Redis:
+        return connections.get_redis_client()
+
+    @classmethod
+    def register(cls, func: Callable) -> Callable:
+        cls._tasks[f"{func.__module__}:{func.__qualname__}"] = func
+        return func
+
+    @classmethod
+    def enqueue(cls, func: Callable, *args) -> None:
+        name = f"{func.__module__}:{func.__qualname__}"
+        if name not in cls._tasks:
+            raise ValueError(f"{name} is not a registered task")
+        payload = json.dumps({'task': name, 'args': args})
+        transaction.on_commit(lambda: cls._push(payload))
+
+    @classmethod
+    def _push(cls, payload: str) -> None:
+        try:
+            cls.get_redis_client().lpush(cls.QUEUE_KEY, payload)
+        except redis.RedisError as e:
+            logger.warning(f"Task was not queued: {payload}: {e}")
+
+    @classmethod
+    def run_next(cls, timeout: int = 0) -> Optional[bool]:
+        """
+        Runs one job. Returns ``None`` when the queue is empty, otherwise
+        whether the job succeeded. ``timeout=0`` doesn't block.
+        """
+        redis_client = cls.get_redis_client()
+        if timeout:
+            item = redis_client.brpop(cls.QUEUE_KEY, timeout=timeout)
+            payload = item[1] if item else None
+        else:
+            payload = redis_client.rpop(cls.QUEUE_KEY)
+        if payload is None:
+            return None
+
+        job = json.loads(payload)
+        try:
+            func = cls._resolve(job['task'])
+            func(*job['args'])
+        except Exception as e:
+            logger.exception(f"Task {job['task']} failed: {e}")
+            return False
+        return True
+
+    @classmethod
+    def _resolve(cls, name: str) -> Callable:
+        if name not in cls._tasks:
+            # registration happens on import of the defining module
+            importlib.import_module(name.split(':')[0])
+        return cls._tasks[name]
@@ -0,0 +1,58 @@
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.utils.translation import gettext_lazy as _
+from rest_framework import parsers, status
+from rest_framework.exceptions import APIException
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = _("Yuklanayotgan fayl hajmi juda katta.")
+    default_code = 'upload_too_large'
+
+
+class HashingTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams every uploaded file to a temporary file in ``UPLOAD_CHUNK_SIZE``
+    chunks and computes its SHA-256 on the way, available as ``file.sha256``.
+
+    Bodies whose Content-Length already exceeds the limit are refused before
+    anything is read, and a file is dropped as soon as it crosses
+    ``UPLOAD_MAX_SIZE``.
+    """
+    chunk_size = settings.UPLOAD_CHUNK_SIZE
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # leave room for the multipart boundaries and the other form fields
+        if content_length > settings.UPLOAD_MAX_SIZE + settings.DATA_UPLOAD_MAX_MEMORY_SIZE:
+            raise UploadTooLarge()
+        return super().handle_raw_input(input_data, META, content_length, boundary, encoding)
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.UPLOAD_MAX_SIZE:
+            self.file.close()
+            raise UploadTooLarge()
+        self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self.sha256.hexdigest()
+        return file
+
+
+class StreamingMultiPartParser(parsers.MultiPartParser):
+    """ MultiPartParser that never keeps uploaded files in memory. """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        request._request.upload_handlers = [HashingTemporaryFileUploadHandler(request._request)]
+        return super().parse(stream, media_type, parser_context)
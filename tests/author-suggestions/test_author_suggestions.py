@@ -0,0 +1,79 @@
+import pytest
+from django.core.management import call_command
+from articles.models import AuthorSuggestion, Follow, ReadingHistory
+from articles.services import PopularAuthorService
+
+
+def suggestions_of(user):
+    return list(AuthorSuggestion.objects.filter(user=user).values_list('author_id', flat=True))
+
+
+@pytest.mark.django_db
+def test_friends_of_friends_are_ranked_and_known_authors_skipped(user_factory):
+    user, friend, other_friend, common, rare, followed = user_factory.create_batch(6)
+    for follower, followee in [(user, friend), (user, other_friend), (user, followed),
+                               (friend, common), (other_friend, common), (friend, rare),
+                               (friend, followed), (friend, user)]:
+        Follow.objects.create(follower=follower, followee=followee)
+
+    call_command('compute_author_suggestions', block_size=2)
+
+    assert suggestions_of(user) == [common.id, rare.id]
+    assert list(AuthorSuggestion.objects.filter(user=user).values_list('rank', flat=True)) == [1, 2]
+
+
+@pytest.mark.django_db
+def test_co_reading_suggests_authors_read_by_similar_readers(user_factory, article_factory):
+    user, reader, liked, also_read, inactive = user_factory.create_batch(5)
+    inactive.is_active = False
+    inactive.save()
+    for article, readers in [(article_factory(author=liked), [user, reader]),
+                             (article_factory(author=also_read), [reader]),
+                             (article_factory(author=inactive), [reader])]:
+        for read_by in readers:
+            ReadingHistory.objects.create(user=read_by, article=article)
+
+    call_command('compute_author_suggestions')
+
+    assert suggestions_of(user) == [also_read.id]
+    assert inactive.id not in suggestions_of(reader)
+
+
+@pytest.mark.django_db
+def test_rerun_replaces_rows_and_honours_top_k(user_factory):
+    user, *friends, first, second, third = user_factory.create_batch(7)
+    for friend, authors in zip(friends, [[first, second, third], [first, second], [first]]):
+        Follow.objects.create(follower=user, followee=friend)
+        for author in authors:
+            Follow.objects.create(follower=friend, followee=author)
+
+    call_command('compute_author_suggestions')
+    assert suggestions_of(user) == [first.id, second.id, third.id]
+
+    call_command('compute_author_suggestions', top_k=2)
+    assert suggestions_of(user) == [first.id, second.id]
+    assert list(AuthorSuggestion.objects.filter(user=user).values_list('rank', flat=True)) == [1, 2]
+
+    Follow.objects.create(follower=user, followee=first)
+    call_command('compute_author_suggestions', top_k=2)
+    assert suggestions_of(user) == [second.id, third.id]
+
+    Follow.objects.filter(follower=user).delete()
+    call_command('compute_author_suggestions', top_k=2)
+    assert suggestions_of(user) == []
+
+
+@pytest.mark.django_db
+def test_who_to_follow_serves_suggestions_then_falls_back(fake_redis_clients, user_factory, article_factory,
+                                                          tokens, api_client):
+    user, first, second, followed = user_factory.create_batch(4)
+    popular = article_factory(reads_count=10).author
+    PopularAuthorService.refresh()
+    client = api_client(tokens(user)[0])
+    assert [author['id'] for author in client.get('/users/articles/popular/').data['results']] == [popular.id]
+
+    for rank, author in enumerate([second, followed, first], start=1):
+        AuthorSuggestion.objects.create(user=user, author=author, score=1 / rank, rank=rank)
+    Follow.objects.create(follower=user, followee=followed)
+
+    assert [author['id'] for author in client.get('/users/articles/popular/').data['results']] == [second.id, first.id]
@@ -0,0 +1,68 @@
+from io import BytesIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from PIL import Image
+from core.tasks import TaskQueue
+
+User = get_user_model()
+
+
+@pytest.fixture
+def uploaded_avatar(user_factory, tokens, api_client, settings, tmp_path, django_capture_on_commit_callbacks,
+                    fake_redis_clients):
+    settings.MEDIA_ROOT = tmp_path
+    user = user_factory.create()
+    access, _ = tokens(user)
+
+    content = BytesIO()
+    Image.new('RGB', (1600, 1200), 'red').save(content, format='JPEG')
+    avatar = SimpleUploadedFile('photo.jpg', content.getvalue(), content_type='image/jpeg')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        resp = api_client(access).patch('/users/me/', {'avatar': avatar}, format='multipart')
+    assert resp.status_code == 200
+    return user, access, resp.json()
+
+
+@pytest.mark.django_db
+def test_upload_is_stored_raw_and_queued(uploaded_avatar, fake_redis):
+    user, _, resp_json = uploaded_avatar
+
+    user.refresh_from_db()
+    assert user.avatar.name == f'users/avatars/{user.username}.jpg'
+    assert not user.avatar_rendition
+    with Image.open(user.avatar.path) as image:
+        assert image.size == (1600, 1200)
+    # the original is served until the worker is done
+    assert resp_json['avatar'].endswith(user.avatar.url)
+    assert fake_redis.llen(TaskQueue.QUEUE_KEY) == 1
+
+
+@pytest.mark.django_db
+def test_worker_serves_resized_rendition(uploaded_avatar, api_client, fake_redis):
+    user, access, _ = uploaded_avatar
+
+    call_command('run_task_worker', '--once')
+
+    user.refresh_from_db()
+    assert user.avatar_rendition.name.startswith(f'users/avatars/renditions/{user.username}')
+    with Image.open(user.avatar_rendition.path) as image:
+        assert image.size == (300, 300)
+    assert fake_redis.llen(TaskQueue.QUEUE_KEY) == 0
+
+    resp = api_client(access).get('/users/me/')
+    assert resp.json()['avatar'].endswith(user.avatar_rendition.url)
+
+
+@pytest.mark.django_db
+def test_stale_job_is_skipped(uploaded_avatar):
+    user, _, _ = uploaded_avatar
+    User.objects.filter(id=user.id).update(avatar='')
+
+    call_command('run_task_worker', '--once')
+
+    user.refresh_from_db()
+    assert not user.avatar_rendition
@@ -0,0 +1,70 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.template import loader
+from users.services import BulkEmailService
+
+User = get_user_model()
+
+
+@pytest.fixture
+def recipients(user_factory):
+    user_factory.create_batch(5)
+    return User.objects.order_by('id')
+
+
+@pytest.mark.django_db
+def test_send_bulk_reuses_one_connection(recipients, mocker):
+    get_connection = mocker.patch('users.services.get_connection', wraps=mail.get_connection)
+    send_batch = mocker.spy(BulkEmailService, 'send_batch')
+
+    report = BulkEmailService.send_bulk(
+        'Yangiliklar', 'emails/email_template.html', recipients,
+        get_context=lambda user: {'otp_code': user.username}, batch_size=2,
+    )
+
+    assert report['sent'] == 5
+    assert report['failed'] == 0
+    assert report['per_second'] > 0
+    assert send_batch.call_count == 3
+    assert len({id(call.args[0]) for call in send_batch.call_args_list}) == 1
+    assert get_connection.call_count == 1
+
+    assert len(mail.outbox) == 5
+    for message, user in zip(mail.outbox, recipients):
+        assert message.to == [user.email]
+        assert message.content_subtype == 'html'
+        assert user.username in message.body
+
+
+@pytest.mark.django_db
+def test_template_is_loaded_once_per_send(recipients, mocker):
+    get_template = mocker.patch('users.services.get_template', wraps=loader.get_template)
+
+    BulkEmailService.send_bulk('Subject', 'emails/email_template.html', recipients, language='uz', batch_size=2)
+
+    assert get_template.call_count == 1
+
+
+@pytest.mark.django_db
+def test_failed_batch_is_reported(recipients, mocker):
+    mocker.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=[2, OSError('boom'), 1])
+
+    report = BulkEmailService.send_bulk('Subject', 'emails/email_template.html', recipients, batch_size=2)
+
+    assert report == {**report, 'sent': 3, 'failed': 2}
+
+
+@pytest.mark.django_db
+def test_failed_reconnect_still_returns_the_report(recipients, mocker):
+    mocker.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=[OSError('boom'), 2, 1])
+    connection = mail.get_connection()
+    mocker.patch.object(connection, 'close', side_effect=[OSError('already gone'), None])
+    open_ = mocker.spy(connection, 'open')
+
+    report = BulkEmailService.send_bulk('Subject', 'emails/email_template.html', recipients, batch_size=2,
+                                        connection=connection)
+
+    assert report == {**report, 'sent': 3, 'failed': 2}
+    # opened by the `with` block, then checked again before every batch
+    assert open_.call_count == 1 + 3
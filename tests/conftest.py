@@ -11,6 +11,18 @@ register(ArticleFactory)
 register(TopicFactory)
 
 
+@pytest.fixture(autouse=True)
+def disable_rate_limit(settings):
+    # redis keeps throttle windows between tests, tests that need limits enable them
+    settings.RATE_LIMIT_ENABLED = False
+
+
+@pytest.fixture(autouse=True)
+def accept_unrecorded_tokens(settings):
+    # the `tokens` fixture mints tokens without recording them, allowlist tests require them
+    settings.TOKEN_ALLOWLIST_REQUIRED_SINCE = float('inf')
+
+
 @pytest.fixture
 def api_client():
     def _api_client(token=None):
@@ -33,8 +45,22 @@ def tokens():
 
 
 @pytest.fixture
-def fake_redis():
-    return fakeredis.FakeRedis()
+def fake_redis_server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def fake_redis(fake_redis_server):
+    return fakeredis.FakeRedis(server=fake_redis_server)
+
+
+@pytest.fixture
+def fake_redis_clients(mocker, fake_redis, fake_redis_server):
+    """ Points every service's Redis client (see core.connections) at ``fake_redis``. """
+    mocker.patch('core.connections.get_redis_client', return_value=fake_redis)
+    mocker.patch('core.connections.get_async_redis_client',
+                 side_effect=lambda: fakeredis.aioredis.FakeRedis(server=fake_redis_server))
+    return fake_redis
 
 
 
@@ -0,0 +1,163 @@
+import datetime
+from io import BytesIO
+
+import pytest
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+from PIL import Image
+from articles.management.commands.collect_media_garbage import Command
+from articles.models import Article, MediaBlob
+from articles.storage import ContentAddressedStorage
+from articles.tasks import get_rendition_name
+
+
+def make_image(color='red'):
+    content = BytesIO()
+    Image.new('RGB', (32, 32), color).save(content, format='PNG')
+    return SimpleUploadedFile('Cover Photo.PNG', content.getvalue(), content_type='image/png')
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+@pytest.mark.django_db
+def test_same_thumbnail_is_stored_once(article_factory, media_root):
+    first, second = article_factory.create_batch(2, thumbnail=make_image())
+
+    assert first.thumbnail.name == second.thumbnail.name
+    digest = ContentAddressedStorage.get_digest(first.thumbnail.name)
+    assert first.thumbnail.name == f"articles/thumbnails/{digest[:2]}/{digest}.png"
+    assert len(list((media_root / 'articles/thumbnails').rglob('*.png'))) == 1
+    assert MediaBlob.objects.get(name=first.thumbnail.name).refcount == 2
+
+
+@pytest.mark.django_db
+def test_replaced_thumbnail_is_released(article_factory, media_root):
+    article = Article.objects.get(id=article_factory.create(thumbnail=make_image()).id)
+    old_name = article.thumbnail.name
+
+    article.thumbnail = make_image('blue')
+    article.save()
+
+    assert MediaBlob.objects.get(name=old_name).refcount == 0
+    assert MediaBlob.objects.get(name=article.thumbnail.name).refcount == 1
+
+
+@pytest.mark.django_db
+def test_derived_files_are_written_once(media_root):
+    storage = ContentAddressedStorage()
+    name = storage.save('uploads/photo.png', make_image())
+    thumb = f"{name[:-4]}_thumb.png"
+
+    assert storage.save(thumb, make_image()) == thumb
+    assert storage.save(thumb, make_image('blue')) == thumb
+    assert MediaBlob.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_digest_like_names_are_not_trusted(media_root):
+    storage = ContentAddressedStorage()
+    name = storage.save('uploads/photo.png', make_image())
+    digest = ContentAddressedStorage.get_digest(name)
+    lookalikes = [
+        # a user's file named like a blob
+        f"uploads/{digest}.png",
+        # the thumbnail shape outside the digest's directory
+        f"uploads/{digest}_thumb.png",
+        # the thumbnail shape of a blob that isn't stored
+        f"uploads/{'0' * 2}/{'0' * 64}_thumb.png",
+    ]
+
+    stored = [storage.save(lookalike, make_image('blue')) for lookalike in lookalikes]
+
+    # hashed like any upload into the directory they were given, nothing was overwritten
+    blue = ContentAddressedStorage.get_digest(stored[0])
+    assert stored == [f"uploads/{blue[:2]}/{blue}.png"] * 2 + [f"uploads/00/{blue[:2]}/{blue}.png"]
+    assert MediaBlob.objects.get(name=stored[0]).refcount == 2
+    assert MediaBlob.objects.get(name=stored[2]).refcount == 1
+    with storage.open(name) as f:
+        assert Image.open(f).getpixel((0, 0)) == (255, 0, 0)
+
+
+@pytest.mark.django_db
+def test_garbage_collection_deletes_unreferenced_blobs(article_factory, media_root):
+    storage = ContentAddressedStorage()
+    kept = Article.objects.get(id=article_factory.create(thumbnail=make_image()).id)
+    orphan = storage.save('uploads/orphan.png', make_image('green'))
+    in_content = storage.save('uploads/used.png', make_image('blue'))
+    article_factory.create(content=f'<img src="/media/{in_content}">')
+    orphan_rendition = default_storage.save(
+        get_rendition_name(ContentAddressedStorage.get_digest(orphan), 160, 'webp'), make_image())
+    MediaBlob.objects.update(updated_at=timezone.now() - datetime.timedelta(days=2))
+
+    call_command('collect_media_garbage', '--reconcile', '--batch-size', '1')
+
+    assert set(MediaBlob.objects.values_list('name', flat=True)) == {kept.thumbnail.name, in_content}
+    assert not storage.exists(orphan)
+    assert storage.exists(kept.thumbnail.name)
+    assert storage.exists(in_content)
+    assert not default_storage.exists(orphan_rendition)
+
+
+@pytest.mark.django_db
+def test_references_are_counted_with_one_scan_per_table(article_factory, media_root, django_assert_num_queries):
+    storage = ContentAddressedStorage()
+    names = [storage.save('uploads/photo.png', make_image(color)) for color in ('red', 'green', 'blue')]
+    article_factory.create(content=f'<img src="/media/{names[0]}"><img src="/media/{names[1]}">')
+    article_factory.create(content=f'<img src="/media/{names[0]}">')
+
+    # thumbnails, then article, comment and FAQ text, however many names are asked about
+    with django_assert_num_queries(4):
+        references = Command.count_references(names)
+
+    assert references == {names[0]: 2, names[1]: 1, names[2]: 0}
+
+
+@pytest.mark.django_db
+def test_files_survive_a_failed_garbage_batch(media_root, mocker):
+    name = ContentAddressedStorage().save('uploads/orphan.png', make_image('green'))
+    MediaBlob.objects.update(refcount=0, updated_at=timezone.now() - datetime.timedelta(days=2))
+    mocker.patch('django.db.models.query.QuerySet.delete', side_effect=RuntimeError("database went away"))
+
+    with pytest.raises(RuntimeError):
+        call_command('collect_media_garbage')
+
+    assert MediaBlob.objects.filter(name=name).exists()
+    assert default_storage.exists(name)
+
+
+@pytest.mark.django_db
+def test_files_are_deleted_while_the_rows_are_locked(media_root, mocker):
+    name = ContentAddressedStorage().save('uploads/orphan.png', make_image('green'))
+    MediaBlob.objects.update(refcount=0, updated_at=timezone.now() - datetime.timedelta(days=2))
+    depths = []
+    delete_files = Command.delete_files
+    mocker.patch.object(Command, 'delete_files', side_effect=lambda storage, blob: (
+        depths.append(len(connection.atomic_blocks)), delete_files(storage, blob)))
+
+    call_command('collect_media_garbage')
+
+    # inside the test's transaction and the batch's, which holds the row locks
+    assert depths == [2]
+    assert not default_storage.exists(name)
+
+    # an upload that waited for the lock finds no row and stores the file again
+    assert ContentAddressedStorage().save('uploads/again.png', make_image('green')) == name
+    assert MediaBlob.objects.get(name=name).refcount == 1
+    assert default_storage.exists(name)
+
+
+@pytest.mark.django_db
+def test_recent_blobs_survive_garbage_collection(media_root):
+    name = ContentAddressedStorage().save('uploads/fresh.png', make_image())
+
+    call_command('collect_media_garbage', '--reconcile')
+
+    assert MediaBlob.objects.get(name=name).refcount == 0
+    assert default_storage.exists(name)
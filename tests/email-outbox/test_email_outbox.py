@@ -0,0 +1,64 @@
+import datetime
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+from users.models import EmailOutbox, EmailStatus
+
+
+@pytest.fixture
+def queued_email(user_factory, api_client, mocker, fake_redis):
+    mocker.patch('users.services.OTPService.get_redis_conn', return_value=fake_redis)
+    user = user_factory.create()
+
+    resp = api_client().post('/users/password/forgot/', {'email': user.email}, format='json')
+    assert resp.status_code == 200
+    return user
+
+
+@pytest.mark.django_db
+def test_forgot_password_only_enqueues(queued_email):
+    assert len(mail.outbox) == 0
+    message = EmailOutbox.objects.get()
+    assert message.to == queued_email.email
+    assert message.status == EmailStatus.PENDING
+    assert message.body
+
+
+@pytest.mark.django_db
+def test_worker_delivers_queued_email(queued_email):
+    call_command('run_mail_worker', '--once')
+
+    assert len(mail.outbox) == 1
+    assert mail.outbox[0].to == [queued_email.email]
+    assert mail.outbox[0].content_subtype == 'html'
+    message = EmailOutbox.objects.get()
+    assert message.status == EmailStatus.SENT
+    assert message.attempts == 1
+    assert message.sent_at is not None
+    # the OTP code is not kept once delivered
+    assert message.body == ''
+
+
+@pytest.mark.django_db
+def test_worker_retries_with_backoff(queued_email, mocker, settings):
+    settings.EMAIL_OUTBOX_MAX_ATTEMPTS = 2
+    mocker.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('down'))
+
+    call_command('run_mail_worker', '--once')
+    message = EmailOutbox.objects.get()
+    assert message.status == EmailStatus.PENDING
+    assert message.last_error == 'down'
+    assert message.next_attempt_at > timezone.now() + datetime.timedelta(seconds=settings.EMAIL_OUTBOX_RETRY_BASE - 5)
+
+    # not due yet
+    call_command('run_mail_worker', '--once')
+    assert EmailOutbox.objects.get().attempts == 1
+
+    EmailOutbox.objects.update(next_attempt_at=timezone.now())
+    call_command('run_mail_worker', '--once')
+    message = EmailOutbox.objects.get()
+    assert message.status == EmailStatus.FAILED
+    assert message.attempts == 2
+    assert message.body == ''
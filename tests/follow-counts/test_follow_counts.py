@@ -0,0 +1,94 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from articles.models import Follow
+
+User = get_user_model()
+
+
+@pytest.fixture
+def client_for(tokens, api_client, fake_redis_clients):
+    return lambda user: api_client(tokens(user)[0])
+
+
+def counts(user):
+    user.refresh_from_db()
+    return user.followers_count, user.following_count
+
+
+@pytest.mark.django_db
+def test_follow_and_unfollow_keep_counts(client_for, user_factory, django_capture_on_commit_callbacks):
+    author, follower = user_factory.create_batch(2)
+    client = client_for(follower)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert client.post(f'/users/{author.id}/follow/').status_code == 201
+        assert client.post(f'/users/{author.id}/follow/').status_code == 200
+    assert counts(author) == (1, 0)
+    assert counts(follower) == (0, 1)
+
+    resp = client_for(author).get('/users/me/')
+    assert resp.json()['followers_count'] == 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert client.delete(f'/users/{author.id}/follow/').status_code == 204
+        assert client.delete(f'/users/{author.id}/follow/').status_code == 404
+    assert counts(author) == (0, 0)
+    assert counts(follower) == (0, 0)
+
+
+@pytest.mark.django_db
+def test_full_save_does_not_overwrite_counters(user_factory):
+    user = user_factory.create()
+    stale = User.objects.get(id=user.id)
+    User.objects.filter(id=user.id).update(followers_count=5)
+
+    stale.first_name = 'Renamed'
+    stale.save()
+
+    assert counts(user) == (5, 0)
+
+
+@pytest.mark.django_db
+def test_followers_list_takes_count_from_user(client_for, user_factory):
+    author = user_factory.create()
+    followers = user_factory.create_batch(3)
+    Follow.objects.bulk_create([Follow(follower=follower, followee=author) for follower in followers])
+    call_command('reconcile_follow_counts')
+    client = client_for(author)
+
+    resp = client.get('/users/followers/', {'limit': 2})
+    assert resp.json()['count'] == 3
+    assert len(resp.json()['results']) == 2
+    assert client.get('/users/following/').json()['count'] == 0
+
+
+@pytest.mark.django_db
+def test_next_link_ignores_deactivated_followers(client_for, user_factory):
+    author = user_factory.create()
+    followers = user_factory.create_batch(3)
+    Follow.objects.bulk_create([Follow(follower=follower, followee=author) for follower in followers])
+    call_command('reconcile_follow_counts')
+    User.objects.filter(id=followers[-1].id).update(is_active=False)
+    client = client_for(author)
+
+    first = client.get('/users/followers/', {'limit': 1}).json()
+    second = client.get(first['next']).json()
+
+    # the counter still counts the deactivated follower, the pages don't
+    assert first['count'] == second['count'] == 3
+    assert len(first['results']) == len(second['results']) == 1
+    assert second['next'] is None
+
+
+@pytest.mark.django_db
+def test_reconcile_fixes_drift(user_factory):
+    author, follower, other = user_factory.create_batch(3)
+    Follow.objects.create(follower=follower, followee=author)
+    User.objects.filter(id=other.id).update(followers_count=4, following_count=2)
+
+    call_command('reconcile_follow_counts', '--batch-size', '2')
+
+    assert counts(author) == (1, 0)
+    assert counts(follower) == (0, 1)
+    assert counts(other) == (0, 0)
@@ -0,0 +1,85 @@
+import importlib
+from unittest import mock
+
+import pytest
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from articles.models import Follow
+from articles.services import FollowService
+
+User = get_user_model()
+migration = importlib.import_module('articles.migrations.0018_follow_unique_follow')
+
+
+def counts(user):
+    user.refresh_from_db()
+    return user.followers_count, user.following_count
+
+
+@pytest.mark.django_db
+def test_follow_edges_are_unique(user_factory):
+    author, follower = user_factory.create_batch(2)
+    Follow.objects.create(follower=follower, followee=author)
+    with pytest.raises(IntegrityError):
+        Follow.objects.create(follower=follower, followee=author)
+
+
+def statements(queries):
+    return [query for query in queries if not query['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+
+
+@pytest.mark.django_db
+def test_follow_is_one_statement_per_change(user_factory):
+    author, follower = user_factory.create_batch(2)
+
+    # the edge and then the counters, a single statement on PostgreSQL
+    with CaptureQueriesContext(connection) as queries:
+        assert FollowService.follow(follower, author)
+    assert len(statements(queries)) == (1 if connection.vendor == 'postgresql' else 2)
+    with CaptureQueriesContext(connection) as queries:
+        assert not FollowService.follow(follower, author)
+    assert len(statements(queries)) == 1
+    assert Follow.objects.filter(follower=follower, followee=author).count() == 1
+    assert counts(author) == (1, 0)
+    assert counts(follower) == (0, 1)
+
+    assert FollowService.unfollow(follower, author)
+    assert not FollowService.unfollow(follower, author)
+    assert counts(author) == (0, 0)
+    assert counts(follower) == (0, 0)
+
+
+@pytest.mark.django_db
+def test_following_yourself_moves_both_counters(user_factory):
+    user = user_factory.create()
+    assert FollowService.follow(user, user)
+    assert counts(user) == (1, 1)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_migration_removes_duplicates(user_factory, mocker):
+    author, follower, other = user_factory.create_batch(3)
+    constraint = Follow._meta.constraints[0]
+    # SQLite drops a constraint by rebuilding the table from Meta.constraints
+    with mock.patch.object(Follow._meta, 'constraints', []), connection.schema_editor() as editor:
+        editor.remove_constraint(Follow, constraint)
+    try:
+        keep = Follow.objects.create(follower=follower, followee=author)
+        Follow.objects.bulk_create([Follow(follower=follower, followee=author) for _ in range(3)])
+        Follow.objects.create(follower=other, followee=author)
+        User.objects.filter(id=author.id).update(followers_count=5)
+        User.objects.filter(id=follower.id).update(following_count=4)
+        mocker.patch.object(migration, 'BATCH_SIZE', 2)
+
+        migration.delete_duplicate_follows(apps, None)
+
+        assert sorted(Follow.objects.values_list('follower_id', flat=True)) == sorted([follower.id, other.id])
+        assert Follow.objects.filter(follower=follower).get().id == keep.id
+        assert counts(author) == (2, 0)
+        assert counts(follower) == (0, 1)
+    finally:
+        Follow.objects.all().delete()
+        with connection.schema_editor() as editor:
+            editor.add_constraint(Follow, constraint)
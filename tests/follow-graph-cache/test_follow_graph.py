@@ -0,0 +1,93 @@
+import pytest
+import redis
+from articles.models import Follow
+from articles.services import FollowGraph
+
+
+@pytest.mark.django_db
+def test_membership_is_rebuilt_then_served_from_redis(fake_redis_clients, user_factory, tokens, api_client,
+                                                      django_assert_num_queries):
+    user, author, other = user_factory.create_batch(3)
+    Follow.objects.create(follower=user, followee=author)
+    client = api_client(tokens(user)[0])
+
+    assert client.get(f'/users/{author.id}/follow/').json() == {'is_following': True}
+    assert fake_redis_clients.sismember(FollowGraph.get_key(user.id, 'following'), FollowGraph.SENTINEL)
+
+    with django_assert_num_queries(0):
+        assert FollowGraph.is_following(user.id, author.id)
+        assert not FollowGraph.is_following(user.id, other.id)
+
+
+@pytest.mark.django_db
+def test_follows_are_written_through(fake_redis_clients, user_factory, tokens, api_client,
+                                     django_capture_on_commit_callbacks):
+    user, author = user_factory.create_batch(2)
+    client = api_client(tokens(user)[0])
+    assert FollowGraph.members(user.id, 'following') == set()
+    assert FollowGraph.members(author.id, 'followers') == set()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client.post(f'/users/{author.id}/follow/')
+    assert FollowGraph.members(user.id, 'following') == {author.id}
+    assert FollowGraph.members(author.id, 'followers') == {user.id}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client.delete(f'/users/{author.id}/follow/')
+    assert not FollowGraph.is_following(user.id, author.id)
+    assert FollowGraph.members(author.id, 'followers') == set()
+
+
+@pytest.mark.django_db
+def test_write_to_expired_set_does_not_look_loaded(fake_redis_clients, user_factory):
+    user, old, new = user_factory.create_batch(3)
+    Follow.objects.create(follower=user, followee=old)
+    Follow.objects.create(follower=user, followee=new)
+
+    # the key had expired, so a write-through creates a set holding only the new edge
+    FollowGraph.follow_changed(user.id, new.id, True)
+
+    assert FollowGraph.members(user.id, 'following') == {old.id, new.id}
+
+
+@pytest.mark.django_db
+def test_unfollow_racing_a_rebuild_is_not_resurrected(fake_redis_clients, user_factory, mocker):
+    user, author = user_factory.create_batch(2)
+    follow = Follow.objects.create(follower=user, followee=author)
+    query = FollowGraph.query
+
+    def unfollow_after_reading(*args, **kwargs):
+        # the rebuild has read the edge, then the unfollow commits and is written through
+        members = list(query(*args, **kwargs))
+        if Follow.objects.filter(id=follow.id).delete()[0]:
+            FollowGraph.follow_changed(user.id, author.id, False)
+        return members
+
+    mocker.patch.object(FollowGraph, 'query', side_effect=unfollow_after_reading)
+
+    assert FollowGraph.members(user.id, 'following') == set()
+    assert not FollowGraph.is_following(user.id, author.id)
+
+
+@pytest.mark.django_db
+def test_mutuals(fake_redis_clients, user_factory, tokens, api_client):
+    user, friend, fan, idol = user_factory.create_batch(4)
+    Follow.objects.bulk_create([
+        Follow(follower=user, followee=friend), Follow(follower=friend, followee=user),
+        Follow(follower=fan, followee=user), Follow(follower=user, followee=idol),
+    ])
+
+    assert FollowGraph.mutuals(user.id) == {friend.id}
+    resp = api_client(tokens(user)[0]).get('/users/mutuals/')
+    assert [row['id'] for row in resp.json()['results']] == [friend.id]
+
+
+@pytest.mark.django_db
+def test_falls_back_to_database_without_redis(user_factory, mocker):
+    mocker.patch('articles.services.FollowGraph.get_redis_client', side_effect=redis.ConnectionError)
+    user, author = user_factory.create_batch(2)
+    Follow.objects.create(follower=user, followee=author)
+    Follow.objects.create(follower=author, followee=user)
+
+    assert FollowGraph.is_following(user.id, author.id)
+    assert FollowGraph.mutuals(user.id) == {author.id}
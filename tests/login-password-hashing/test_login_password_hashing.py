@@ -0,0 +1,44 @@
+import pytest
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+
+User = get_user_model()
+
+
+@pytest.fixture
+def login_user(user_factory, mocker, fake_redis):
+    mocker.patch('users.services.TokenService.get_redis_client', return_value=fake_redis)
+    password = 'random_password'
+    user = user_factory.create(password=password)
+    return user, password
+
+
+def test_settings():
+    assert settings.PASSWORD_HASHERS[0] == 'users.hashers.TunedArgon2PasswordHasher'
+    assert 'rest_framework.authentication.BasicAuthentication' not in settings.REST_FRAMEWORK[
+        'DEFAULT_AUTHENTICATION_CLASSES']
+
+
+@pytest.mark.django_db
+def test_login_checks_password_once(login_user, api_client, mocker):
+    user, password = login_user
+    check_password = mocker.spy(User, 'check_password')
+
+    resp = api_client().post('/users/login/', {'username': user.username, 'password': password})
+
+    assert resp.status_code == 200
+    assert check_password.call_count == 1
+
+
+@pytest.mark.django_db
+def test_login_upgrades_legacy_hash(login_user, api_client):
+    user, password = login_user
+    User.objects.filter(id=user.id).update(password=make_password(password, hasher='pbkdf2_sha256'))
+
+    resp = api_client().post('/users/login/', {'username': user.username, 'password': password})
+
+    assert resp.status_code == 200
+    user.refresh_from_db()
+    assert user.password.startswith('argon2$argon2id$')
+    assert user.check_password(password)
@@ -200,7 +200,8 @@ def test_signup(signup_data, api_client):
             ['user', 'access', 'refresh']
         )
         assert sorted(resp_json['user'].keys()) == sorted(
-            ['id', 'username', 'first_name', 'last_name', 'middle_name', 'email', 'avatar']
+            ['id', 'username', 'first_name', 'last_name', 'middle_name', 'email', 'avatar',
+             'followers_count', 'following_count']
         )
 
         # check database and response
@@ -353,7 +354,8 @@ def test_user_me(user_me_data, api_client):
     if status_code == status.HTTP_200_OK:
         resp_json = resp.json()
         assert sorted(resp_json.keys()) == sorted(
-            ['id', 'first_name', 'last_name', 'middle_name', 'email', 'username', 'avatar']
+            ['id', 'first_name', 'last_name', 'middle_name', 'email', 'username', 'avatar',
+             'followers_count', 'following_count']
         )
         user = User.objects.get(id=resp_json['id'])
         assert resp_json['first_name'] == user.first_name
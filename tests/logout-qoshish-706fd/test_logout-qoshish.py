@@ -1,6 +1,8 @@
 import pytest
 from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.tokens import AccessToken
 from users.enums import TokenType
+from users.services import UserService
 
 User = get_user_model()
 
@@ -38,19 +40,22 @@ def logout_data(request, user_factory, api_client, tokens, mocker):
     ],
     indirect=True,
 )
-def test_logout(logout_data, mocker, fake_redis, request, tokens):
+def test_logout(logout_data, mocker, fake_redis, request, api_client, settings):
     status_code, client, user, access = logout_data()
     test_name = request.node.name
 
     mocker.patch('users.services.TokenService.get_redis_client', return_value=fake_redis)
 
-    # add tokens to fake_redis
+    # log in the way the login view does, recording both tokens in fake_redis
     if test_name == 'test_logout[valid_with_stored_tokens]':
-        _, refresh = tokens(user)
+        settings.TOKEN_ALLOWLIST_REQUIRED_SINCE = 0
+        stored = UserService.create_tokens(user)
+        access = stored['access']
+        client = api_client(access)
         access_token_key = f"user:{user.id}:{TokenType.ACCESS}"
         refresh_token_key = f"user:{user.id}:{TokenType.REFRESH}"
-        fake_redis.sadd(access_token_key, access)
-        fake_redis.sadd(refresh_token_key, str(refresh))
+        assert fake_redis.zrange(access_token_key, 0, -1) == [AccessToken(access)['jti'].encode()]
+        assert fake_redis.zcard(refresh_token_key) == 1
 
     # users-me get data
     if test_name == 'test_logout[valid_with_stored_tokens]':
@@ -69,5 +74,5 @@ def test_logout(logout_data, mocker, fake_redis, request, tokens):
     if test_name == 'test_logout[valid_with_stored_tokens]':
         access_token_key = f"user:{user.id}:{TokenType.ACCESS}"
         refresh_token_key = f"user:{user.id}:{TokenType.REFRESH}"
-        assert fake_redis.smembers(access_token_key) == {b'fake_token'}
-        assert fake_redis.smembers(refresh_token_key) == {b'fake_token'}
+        assert fake_redis.zrange(access_token_key, 0, -1) == []
+        assert fake_redis.zrange(refresh_token_key, 0, -1) == []
@@ -0,0 +1,122 @@
+import pytest
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from articles.models import Article, ArticleStatus
+from articles.tasks import get_rendition_name
+
+DATA = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def media_file(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return default_storage.save('uploads/file.bin', ContentFile(DATA))
+
+
+@pytest.fixture
+def draft_thumbnail(settings, tmp_path, article_factory, mocker, fake_redis):
+    settings.MEDIA_ROOT = tmp_path
+    mocker.patch('users.services.TokenService.get_redis_client', return_value=fake_redis)
+    article = article_factory.create(status=ArticleStatus.DRAFT, thumbnail=ContentFile(DATA, name='cover.png'))
+    return Article.objects.get(id=article.id)
+
+
+def body(response):
+    return b''.join(response.streaming_content)
+
+
+@pytest.mark.django_db
+def test_file_is_served(media_file, api_client):
+    resp = api_client().get(f'/media/{media_file}')
+
+    assert resp.status_code == 200
+    assert body(resp) == DATA
+    assert resp['Accept-Ranges'] == 'bytes'
+    assert int(resp['Content-Length']) == len(DATA)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('header, start, end', [
+    ('bytes=2-5', 2, 5),
+    ('bytes=1000-', 1000, len(DATA) - 1),
+    ('bytes=-3', len(DATA) - 3, len(DATA) - 1),
+    ('bytes=10-99999', 10, len(DATA) - 1),
+])
+def test_range_request(media_file, api_client, header, start, end):
+    resp = api_client().get(f'/media/{media_file}', HTTP_RANGE=header)
+
+    assert resp.status_code == 206
+    assert body(resp) == DATA[start:end + 1]
+    assert resp['Content-Range'] == f"bytes {start}-{end}/{len(DATA)}"
+    assert int(resp['Content-Length']) == end - start + 1
+
+
+@pytest.mark.django_db
+def test_unsatisfiable_range(media_file, api_client):
+    resp = api_client().get(f'/media/{media_file}', HTTP_RANGE='bytes=5000-')
+
+    assert resp.status_code == 416
+    assert resp['Content-Range'] == f"bytes */{len(DATA)}"
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('mode, header', [('x-accel', 'X-Accel-Redirect'), ('x-sendfile', 'X-Sendfile')])
+def test_proxy_modes_only_send_headers(media_file, api_client, settings, mode, header):
+    settings.MEDIA_SERVE_MODE = mode
+
+    resp = api_client().get(f'/media/{media_file}')
+
+    assert resp.status_code == 200
+    assert resp.content == b''
+    if mode == 'x-accel':
+        assert resp[header] == f'/protected-media/{media_file}'
+    else:
+        assert resp[header] == str(settings.MEDIA_ROOT / media_file)
+
+
+@pytest.mark.django_db
+def test_path_traversal_is_rejected(media_file, api_client):
+    assert api_client().get('/media/../settings.py').status_code == 404
+    assert api_client().get('/media/uploads/missing.bin').status_code == 404
+
+
+@pytest.mark.django_db
+def test_draft_thumbnail_is_private(draft_thumbnail, api_client, tokens, user_factory):
+    url = f'/media/{draft_thumbnail.thumbnail.name}'
+    author_access, _ = tokens(draft_thumbnail.author)
+    other_access, _ = tokens(user_factory.create())
+
+    assert api_client().get(url).status_code == 404
+    assert api_client(other_access).get(url).status_code == 404
+    assert api_client(author_access).get(url).status_code == 200
+
+    Article.objects.filter(id=draft_thumbnail.id).update(status=ArticleStatus.PUBLISH)
+    assert api_client().get(url).status_code == 200
+
+
+@pytest.mark.django_db
+def test_draft_renditions_are_private(draft_thumbnail, api_client, tokens, user_factory):
+    digest = 'ab' * 32
+    Article.objects.filter(id=draft_thumbnail.id).update(thumbnail_hash=digest)
+    url = f"/media/{default_storage.save(get_rendition_name(digest, 160, 'webp'), ContentFile(DATA))}"
+    author_access, _ = tokens(draft_thumbnail.author)
+
+    assert api_client().get(url).status_code == 404
+    assert api_client(tokens(user_factory.create())[0]).get(url).status_code == 404
+    resp = api_client(author_access).get(url)
+    assert resp.status_code == 200
+    assert resp['Cache-Control'] == 'private'
+
+    Article.objects.filter(id=draft_thumbnail.id).update(status=ArticleStatus.PUBLISH)
+    resp = api_client().get(url)
+    assert resp.status_code == 200
+    assert resp['Cache-Control'] == settings.RENDITION_CACHE_CONTROL
+
+
+@pytest.mark.django_db
+def test_thumbnail_access_takes_one_query(draft_thumbnail, api_client, django_assert_num_queries):
+    Article.objects.filter(id=draft_thumbnail.id).update(status=ArticleStatus.PUBLISH)
+
+    with django_assert_num_queries(1):
+        assert api_client().get(f'/media/{draft_thumbnail.thumbnail.name}').status_code == 200
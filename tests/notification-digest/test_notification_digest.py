@@ -0,0 +1,106 @@
+import time
+
+import pytest
+import redis
+from django.test import override_settings
+from django.utils import translation
+from articles.models import Notification
+from articles.services import NotificationDigest
+
+WINDOW = 300
+
+
+@pytest.fixture
+def follow(user_factory, tokens, api_client, fake_redis_clients):
+    def _follow(author):
+        follower = user_factory.create()
+        resp = api_client(tokens(follower)[0]).post(f'/users/{author.id}/follow/')
+        assert resp.status_code == 201
+        return follower
+
+    return _follow
+
+
+def next_window():
+    return (NotificationDigest.get_window() + 1) * WINDOW
+
+
+@pytest.mark.django_db
+@override_settings(NOTIFICATION_DIGEST_WINDOW=WINDOW)
+def test_follows_in_one_window_become_one_notification(follow, user_factory):
+    author = user_factory.create()
+    followers = [follow(author) for _ in range(3)]
+
+    assert not Notification.objects.filter(user=author).exists()
+    assert NotificationDigest.flush() == 0
+
+    assert NotificationDigest.flush(now=next_window()) == 1
+    notification = Notification.objects.get(user=author)
+    assert notification.message == f"{followers[-1].username} va yana 2 kishi sizga follow qildi."
+
+    assert NotificationDigest.flush(now=next_window()) == 0
+    assert Notification.objects.filter(user=author).count() == 1
+
+
+@pytest.mark.django_db
+@override_settings(NOTIFICATION_DIGEST_WINDOW=WINDOW)
+def test_single_follow_reads_like_before(follow, user_factory):
+    author = user_factory.create()
+    follower = follow(author)
+
+    NotificationDigest.flush(now=next_window())
+    assert Notification.objects.get(user=author).message == f"{follower.username} sizga follow qildi."
+
+
+@pytest.mark.django_db
+@override_settings(NOTIFICATION_DIGEST_WINDOW=WINDOW)
+def test_windows_are_flushed_separately(follow, user_factory, mocker):
+    author = user_factory.create()
+    follow(author)
+    mocker.patch('articles.services.time.time', return_value=time.time() + WINDOW)
+    follow(author)
+    follow(author)
+
+    assert NotificationDigest.flush(now=time.time() + 2 * WINDOW) == 2
+    assert sorted(n.message.split(' ', 1)[1] for n in Notification.objects.filter(user=author)) == [
+        "sizga follow qildi.", "va yana 1 kishi sizga follow qildi."
+    ]
+
+
+@pytest.mark.django_db
+def test_follow_notifies_directly_without_redis(follow, user_factory, mocker):
+    author = user_factory.create()
+    mocker.patch('articles.services.NotificationDigest.get_redis_client', side_effect=redis.ConnectionError)
+    follower = follow(author)
+
+    assert Notification.objects.get(user=author).message == f"{follower.username} sizga follow qildi."
+
+
+@pytest.mark.django_db
+@override_settings(NOTIFICATION_DIGEST_WINDOW=WINDOW)
+def test_refollow_in_a_later_window_is_not_announced_again(follow, user_factory, tokens, api_client, mocker):
+    author = user_factory.create()
+    follower = follow(author)
+    client = api_client(tokens(follower)[0])
+    assert NotificationDigest.flush(now=next_window()) == 1
+
+    mocker.patch('articles.services.time.time', return_value=time.time() + WINDOW)
+    assert client.delete(f'/users/{author.id}/follow/').status_code == 204
+    assert client.post(f'/users/{author.id}/follow/').status_code == 201
+
+    assert NotificationDigest.flush(now=time.time() + 3 * WINDOW) == 0
+    assert Notification.objects.filter(user=author).count() == 1
+
+
+@pytest.mark.django_db
+@override_settings(NOTIFICATION_DIGEST_WINDOW=WINDOW)
+def test_digest_is_written_in_the_language_of_the_follow(user_factory, tokens, api_client, mocker, fake_redis_clients):
+    mocker.patch('articles.services._', side_effect=lambda text: f"[{translation.get_language()}] {text}")
+    author, follower = user_factory.create_batch(2)
+
+    resp = api_client(tokens(follower)[0]).post(f'/users/{author.id}/follow/', HTTP_ACCEPT_LANGUAGE='ru')
+    assert resp.status_code == 201
+
+    with translation.override('en'):
+        NotificationDigest.flush(now=next_window())
+    assert Notification.objects.get(user=author).message.startswith("[ru] ")
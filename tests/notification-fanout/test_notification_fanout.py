@@ -0,0 +1,88 @@
+import time
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from articles.models import Article, ArticleStatus, Follow, Notification
+from articles.services import NotificationDigest, NotificationService
+
+
+@pytest.fixture
+def author_with_followers(user_factory):
+    author = user_factory.create()
+    followers = user_factory.create_batch(5)
+    Follow.objects.bulk_create([Follow(follower=follower, followee=author) for follower in followers])
+    return author, followers
+
+
+@pytest.mark.django_db
+def test_fan_out_batches_and_dedupes(author_with_followers, django_assert_max_num_queries):
+    author, followers = author_with_followers
+
+    # one follower query, then a lookup, an insert and a read-back of the new ids per batch,
+    # each batch inside its own atomic(), a SAVEPOINT and RELEASE under the test transaction
+    with django_assert_max_num_queries(1 + (3 + 2) * 3):
+        report = NotificationService.fan_out(author.id, 'hello', 'event:1', batch_size=2)
+    assert report['recipients'] == 5
+
+    NotificationService.fan_out(author.id, 'hello', 'event:1', batch_size=2)
+    assert sorted(Notification.objects.values_list('user_id', flat=True)) == sorted(f.id for f in followers)
+
+    NotificationService.fan_out(author.id, 'again', 'event:2')
+    assert Notification.objects.count() == 10
+
+
+@pytest.mark.django_db
+def test_fan_out_commits_each_batch_with_its_callbacks(author_with_followers, mocker,
+                                                      django_capture_on_commit_callbacks):
+    author, _ = author_with_followers
+    delivered = mocker.patch('articles.services.NotificationService.delivered')
+    bulk_create = Notification.objects.bulk_create
+    calls = []
+
+    def failing_second_batch(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 2:
+            raise RuntimeError("database went away")
+        return bulk_create(*args, **kwargs)
+
+    mocker.patch.object(Notification.objects, 'bulk_create', side_effect=failing_second_batch)
+    with django_capture_on_commit_callbacks(execute=True):
+        with pytest.raises(RuntimeError):
+            NotificationService.fan_out(author.id, 'hello', 'event:1', batch_size=2)
+
+    # the first batch is kept and announced, the failed one left nothing behind
+    assert Notification.objects.count() == 2
+    delivered.assert_called_once()
+    assert set(delivered.call_args.args[0]) == set(Notification.objects.values_list('user_id', flat=True))
+
+
+@pytest.mark.django_db
+def test_publishing_notifies_followers(author_with_followers, article_factory, django_capture_on_commit_callbacks,
+                                       fake_redis_clients):
+    author, followers = author_with_followers
+    article = Article.objects.get(id=article_factory.create(author=author, status=ArticleStatus.PENDING).id)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        article.status = ArticleStatus.PUBLISH
+        article.save()
+        article.save()
+    call_command('run_task_worker', '--once')
+
+    notifications = Notification.objects.filter(event=f"article_published:{article.id}")
+    assert notifications.count() == len(followers)
+    assert article.title in notifications.first().message
+
+
+@pytest.mark.django_db
+def test_refollow_does_not_notify_twice(user_factory, tokens, api_client, fake_redis_clients):
+    author, follower = user_factory.create_batch(2)
+    client = api_client(tokens(follower)[0])
+
+    assert client.post(f'/users/{author.id}/follow/').status_code == 201
+    assert client.delete(f'/users/{author.id}/follow/').status_code == 204
+    assert client.post(f'/users/{author.id}/follow/').status_code == 201
+
+    NotificationDigest.flush(now=time.time() + settings.NOTIFICATION_DIGEST_WINDOW)
+    assert Notification.objects.filter(user=author).count() == 1
+    assert Notification.objects.get(user=author).message == f"{follower.username} sizga follow qildi."
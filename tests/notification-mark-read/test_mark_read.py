@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from articles.models import Notification
+from articles.services import UnreadCounter
+
+
+@pytest.fixture
+def inbox(user_factory, tokens, api_client, fake_redis_clients):
+    user = user_factory.create()
+    notifications = Notification.objects.bulk_create(
+        [Notification(user=user, message=f"n{i}") for i in range(5)]
+    )
+    # spread creation times so the up_to cursor has something to cut
+    for i, notification in enumerate(notifications):
+        Notification.objects.filter(id=notification.id).update(created_at=timezone.now() - timedelta(minutes=10 - i))
+    return user, api_client(tokens(user)[0]), Notification.objects.filter(user=user).order_by('created_at')
+
+
+@pytest.mark.django_db
+def test_mark_read_by_ids(inbox, django_capture_on_commit_callbacks):
+    user, client, notifications = inbox
+    assert UnreadCounter.get(user.id) == 5
+    ids = [n.id for n in notifications[:3]]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        resp = client.post('/users/notifications/mark_read/', {'ids': ids}, format='json')
+    assert resp.status_code == 200
+    assert resp.json() == {'marked': 3}
+    assert UnreadCounter.get(user.id) == 2
+
+    # already read ones are not counted twice
+    with django_capture_on_commit_callbacks(execute=True):
+        resp = client.post('/users/notifications/mark_read/', {'ids': ids}, format='json')
+    assert resp.json() == {'marked': 0}
+    assert UnreadCounter.get(user.id) == 2
+
+
+@pytest.mark.django_db
+def test_mark_read_up_to_cursor(inbox, user_factory, django_capture_on_commit_callbacks):
+    user, client, notifications = inbox
+    other = Notification.objects.create(user=user_factory.create(), message='not mine')
+    cursor = notifications[3].created_at
+
+    with django_capture_on_commit_callbacks(execute=True):
+        resp = client.post('/users/notifications/mark_read/', {'up_to': cursor.isoformat()}, format='json')
+    assert resp.json() == {'marked': 4}
+    assert list(Notification.objects.filter(user=user, read_at__isnull=True)) == [notifications.last()]
+    other.refresh_from_db()
+    assert other.read_at is None
+    assert UnreadCounter.get(user.id) == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('payload', [{}, {'ids': [1], 'up_to': '2024-01-01T00:00:00Z'}])
+def test_mark_read_needs_exactly_one_selector(inbox, payload):
+    _, client, _ = inbox
+    assert client.post('/users/notifications/mark_read/', payload, format='json').status_code == 400
+
+
+@pytest.mark.django_db
+def test_notifications_cannot_be_created(inbox):
+    _, client, _ = inbox
+    assert client.post('/users/notifications/', {'message': 'x'}, format='json').status_code == 405
@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from articles.models import Notification, NotificationArchive
+
+
+def make_notification(user, days_old, read=True):
+    notification = Notification.objects.create(user=user, message=f"{days_old} days old")
+    created_at = timezone.now() - timedelta(days=days_old)
+    Notification.objects.filter(id=notification.id).update(created_at=created_at, read_at=created_at if read else None)
+    return notification
+
+
+@pytest.mark.django_db
+def test_archives_old_read_notifications_in_batches(user_factory):
+    user = user_factory.create()
+    old_read = [make_notification(user, 100 + i) for i in range(5)]
+    old_unread = make_notification(user, 120, read=False)
+    recent_read = make_notification(user, 10)
+
+    call_command('archive_notifications', '--days', '90', '--batch-size', '2')
+
+    assert set(Notification.objects.values_list('id', flat=True)) == {old_unread.id, recent_read.id}
+    archived = NotificationArchive.objects.order_by('id')
+    assert [n.id for n in archived] == [n.id for n in old_read]
+    assert archived[0].user_id == user.id
+    assert archived[0].message == old_read[0].message
+    assert archived[0].read_at is not None
+
+    call_command('archive_notifications', '--days', '90')
+    assert NotificationArchive.objects.count() == 5
+
+
+@pytest.mark.django_db
+def test_unread_inbox_query_uses_partial_index(user_factory):
+    user = user_factory.create()
+    plan = Notification.objects.filter(user=user, read_at__isnull=True).explain()
+    assert 'notification_unread_idx' in plan
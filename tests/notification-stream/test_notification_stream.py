@@ -0,0 +1,181 @@
+import asyncio
+import json
+
+import fakeredis
+import pytest
+import redis
+from django.test import override_settings
+from rest_framework_simplejwt.exceptions import InvalidToken
+from core import events
+from core.events import NotificationStream
+from articles.models import Follow, Notification
+from articles.services import NotificationService
+
+STREAM_PATH = '/users/notifications/stream/'
+
+
+@pytest.fixture
+def redis_server(mocker):
+    server = fakeredis.FakeServer()
+    mocker.patch('core.events.NotificationHub.get_redis_client',
+                 side_effect=lambda: fakeredis.FakeRedis(server=server))
+    mocker.patch('core.events.NotificationHub.get_async_redis_client',
+                 side_effect=lambda: fakeredis.aioredis.FakeRedis(server=server))
+    # user id is taken from the token itself, authenticate() is tested on its own
+    mocker.patch('core.events.authenticate', side_effect=lambda token: int(token))
+    return server
+
+
+class Client:
+    """ One SSE connection driven directly through the ASGI interface. """
+
+    def __init__(self, app, token=None):
+        headers = [(b'authorization', b'Bearer ' + token.encode())] if token else []
+        self.scope = {'type': 'http', 'method': 'GET', 'path': STREAM_PATH, 'headers': headers, 'query_string': b''}
+        self.incoming = asyncio.Queue()
+        self.messages = asyncio.Queue()
+        self.task = asyncio.create_task(app(self.scope, self.incoming.get, self.messages.put))
+
+    async def receive(self):
+        return await asyncio.wait_for(self.messages.get(), timeout=5)
+
+    async def close(self):
+        await self.incoming.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(self.task, timeout=5)
+
+
+def test_stream_requires_token(redis_server):
+    async def scenario():
+        client = Client(NotificationStream())
+        start = await client.receive()
+        body = await client.receive()
+        await client.task
+        return start, body
+
+    start, body = asyncio.run(scenario())
+    assert start['status'] == 401
+    assert 'detail' in json.loads(body['body'])
+
+
+@override_settings(NOTIFICATION_STREAM_HEARTBEAT=0.05)
+def test_stream_delivers_published_notifications(redis_server):
+    async def scenario():
+        app = NotificationStream()
+        client = Client(app, token='7')
+        start = await client.receive()
+        assert (await client.receive())['body'].startswith(b'retry:')
+
+        events.publish({7: {'message': 'hello'}, 8: {'message': 'hello'}})
+        bodies = [(await client.receive())['body'] for _ in range(2)]
+        await client.close()
+        return start, bodies, app.hub
+
+    start, bodies, hub = asyncio.run(scenario())
+    assert start['status'] == 200
+    assert (b'content-type', b'text/event-stream') in start['headers']
+    notification = next(body for body in bodies if body.startswith(b'event: notification'))
+    assert json.loads(notification.split(b'data: ')[1]) == {'message': 'hello'}
+    assert b': ping\n\n' in bodies
+    assert not hub.queues
+
+
+def test_idle_connections_share_one_redis_subscription(redis_server):
+    connections = 2000
+
+    async def scenario():
+        app = NotificationStream()
+        clients = [Client(app, token=str(user_id)) for user_id in range(connections)]
+        for client in clients:
+            await client.receive()
+            await client.receive()
+        subscribed = len(app.hub.queues)
+        events.publish({connections - 1: {'message': 'last'}})
+        body = (await clients[-1].receive())['body']
+        await asyncio.gather(*(client.close() for client in clients))
+        return subscribed, body, app.hub
+
+    subscribed, body, hub = asyncio.run(scenario())
+    assert subscribed == connections
+    assert b'"last"' in body
+    assert not hub.queues
+
+
+def test_failed_subscribe_is_retried_by_the_next_stream(redis_server, mocker):
+    async def scenario():
+        app = NotificationStream()
+        app.hub.pubsub = fakeredis.aioredis.FakeRedis(server=redis_server).pubsub(ignore_subscribe_messages=True)
+        subscribe = app.hub.pubsub.subscribe
+        outcomes = [redis.ConnectionError("Connection refused")]
+
+        async def flaky_subscribe(*channels):
+            if outcomes:
+                raise outcomes.pop()
+            return await subscribe(*channels)
+
+        mocker.patch.object(app.hub.pubsub, 'subscribe', side_effect=flaky_subscribe)
+
+        failed = Client(app, token='7')
+        with pytest.raises(redis.ConnectionError):
+            await asyncio.wait_for(failed.task, timeout=5)
+        leftover = dict(app.hub.queues)
+
+        client = Client(app, token='7')
+        await client.receive()
+        await client.receive()
+        events.publish({7: {'message': 'retried'}})
+        body = (await client.receive())['body']
+        await client.close()
+        return leftover, body, app.hub
+
+    leftover, body, hub = asyncio.run(scenario())
+    assert leftover == {}
+    assert b'"retried"' in body
+    assert not hub.queues
+
+
+@pytest.mark.django_db
+def test_authenticate_checks_the_access_token(user_factory, tokens, mocker, fake_redis):
+    mocker.patch('users.services.TokenService.get_redis_client', return_value=fake_redis)
+    user = user_factory.create()
+    access, _ = tokens(user)
+
+    assert events.authenticate(access.encode()) == user.id
+    with pytest.raises(InvalidToken):
+        events.authenticate(b'not-a-token')
+
+
+@pytest.mark.django_db
+def test_new_notifications_are_published_after_commit(user_factory, mocker, django_capture_on_commit_callbacks):
+    publish = mocker.patch('core.events.publish')
+    mocker.patch('articles.services.UnreadCounter.add')
+    user = user_factory.create()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        NotificationService.notify(user.id, 'hello', event='greeting')
+        NotificationService.notify(user.id, 'hello', event='greeting')
+
+    publish.assert_called_once()
+    payloads, = publish.call_args.args
+    assert list(payloads) == [user.id]
+    assert payloads[user.id]['message'] == 'hello'
+
+
+@pytest.mark.django_db
+def test_fan_out_publishes_each_follower_its_notification(user_factory, mocker, django_capture_on_commit_callbacks):
+    publish = mocker.patch('core.events.publish')
+    mocker.patch('articles.services.UnreadCounter.add')
+    author = user_factory.create()
+    followers = user_factory.create_batch(3)
+    Follow.objects.bulk_create([Follow(follower=follower, followee=author) for follower in followers])
+
+    with django_capture_on_commit_callbacks(execute=True):
+        NotificationService.fan_out(author.id, 'hello', 'article_published:1', batch_size=2)
+
+    payloads = {user_id: payload for call in publish.call_args_list for user_id, payload in call.args[0].items()}
+    notifications = Notification.objects.filter(event='article_published:1')
+    assert payloads == {
+        notification.user_id: {'id': notification.id, 'message': 'hello', 'event': 'article_published:1',
+                               'created_at': notification.created_at}
+        for notification in notifications
+    }
+    assert len(payloads) == len(followers)
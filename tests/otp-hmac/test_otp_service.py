@@ -0,0 +1,59 @@
+import pytest
+from users.exceptions import OTPException
+from users.services import OTPService
+
+EMAIL = 'test@test.com'
+
+
+@pytest.fixture
+def otp_redis(mocker, fake_redis, settings):
+    settings.OTP_MAX_ATTEMPTS = 3
+    mocker.patch('users.services.OTPService.get_redis_conn', return_value=fake_redis)
+    return fake_redis
+
+
+def test_otp_is_stored_as_hmac_digest(otp_redis):
+    otp_code, otp_secret = OTPService.generate_otp(EMAIL)
+
+    stored = otp_redis.hgetall(f"{EMAIL}:otp")
+    assert stored == {
+        b'digest': OTPService.get_otp_digest(otp_secret, otp_code).encode(),
+        b'attempts': b'0',
+    }
+    assert 0 < otp_redis.ttl(f"{EMAIL}:otp") <= 120
+    OTPService.check_otp(EMAIL, otp_code, otp_secret)
+
+
+@pytest.mark.parametrize('wrong', ['otp_code', 'otp_secret'])
+def test_wrong_otp_is_rejected(otp_redis, wrong):
+    otp_code, otp_secret = OTPService.generate_otp(EMAIL)
+    data = {'otp_code': otp_code, 'otp_secret': otp_secret, wrong: 'fake'}
+
+    with pytest.raises(OTPException):
+        OTPService.check_otp(EMAIL, **data)
+    assert otp_redis.hget(f"{EMAIL}:otp", 'attempts') == b'1'
+
+
+def test_otp_attempts_are_limited(otp_redis):
+    otp_code, otp_secret = OTPService.generate_otp(EMAIL)
+    for _ in range(3):
+        with pytest.raises(OTPException):
+            OTPService.check_otp(EMAIL, '000000', otp_secret)
+
+    # the right code no longer helps once the attempts are used up
+    with pytest.raises(OTPException):
+        OTPService.check_otp(EMAIL, otp_code, otp_secret)
+    assert not otp_redis.exists(f"{EMAIL}:otp")
+
+
+def test_expired_otp_is_not_recreated(otp_redis):
+    with pytest.raises(OTPException):
+        OTPService.check_otp(EMAIL, '000000', 'secret')
+    assert not otp_redis.exists(f"{EMAIL}:otp")
+
+
+def test_reset_token_key_hides_token():
+    key = OTPService.get_reset_token_key('token')
+    assert key.startswith('reset_token:') and 'token' not in key.removeprefix('reset_token:')
+    assert key == OTPService.get_reset_token_key('token')
+    assert key != OTPService.get_reset_token_key('other-token')
@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from articles.models import ArticleReadDaily, ArticleStatus, PopularAuthor, RankingPeriod
+from articles.services import PopularAuthorService
+
+
+def add_reads(article, days_ago, count):
+    ArticleReadDaily.objects.create(article=article, date=timezone.localdate() - timedelta(days=days_ago), count=count)
+
+
+def ranking(period, topic=None):
+    return list(PopularAuthor.objects.filter(period=period, topic=topic).order_by('rank')
+                .values_list('author_id', 'reads_count'))
+
+
+@pytest.mark.django_db
+def test_reads_are_counted_per_day(fake_redis_clients, user_factory, article_factory, tokens, api_client):
+    article = article_factory()
+    client = api_client(tokens(user_factory())[0])
+
+    for _ in range(2):
+        assert client.post(f'/articles/{article.id}/read/').status_code == 200
+
+    daily = ArticleReadDaily.objects.get(article=article)
+    assert (daily.date, daily.count) == (timezone.localdate(), 2)
+
+
+@pytest.mark.django_db
+def test_rankings_per_period_and_topic(user_factory, topic_factory, article_factory):
+    science, art = topic_factory.create_batch(2)
+    veteran, rising, inactive = user_factory.create_batch(3)
+    inactive.is_active = False
+    inactive.save()
+    old = article_factory(author=veteran, reads_count=100, topics=[science])
+    new = article_factory(author=rising, reads_count=12, topics=[science, art])
+    hidden = article_factory(author=inactive, reads_count=500, topics=[art])
+    draft = article_factory(author=rising, reads_count=900, status=ArticleStatus.DRAFT, topics=[art])
+    add_reads(old, days_ago=20, count=9)
+    add_reads(old, days_ago=40, count=91)
+    add_reads(new, days_ago=1, count=7)
+    add_reads(new, days_ago=0, count=5)
+    add_reads(hidden, days_ago=0, count=50)
+    add_reads(draft, days_ago=0, count=50)
+
+    PopularAuthorService.refresh()
+
+    assert ranking(RankingPeriod.ALL_TIME) == [(veteran.id, 100), (rising.id, 12)]
+    assert ranking(RankingPeriod.MONTH) == [(rising.id, 12), (veteran.id, 9)]
+    assert ranking(RankingPeriod.WEEK) == [(rising.id, 12)]
+    assert ranking(RankingPeriod.ALL_TIME, science) == [(veteran.id, 100), (rising.id, 12)]
+    assert ranking(RankingPeriod.WEEK, art) == [(rising.id, 12)]
+    assert list(PopularAuthor.objects.order_by('rank').values_list('rank', flat=True).distinct()) == [1, 2]
+    # buckets older than the 30 day window are dropped
+    assert not ArticleReadDaily.objects.filter(article=old, count=91).exists()
+
+
+@pytest.mark.django_db
+def test_refresh_replaces_rankings(user_factory, article_factory, settings):
+    settings.POPULAR_AUTHORS_LIMIT = 1
+    first, second = article_factory(reads_count=5), article_factory(reads_count=3)
+
+    PopularAuthorService.refresh()
+    assert ranking(RankingPeriod.ALL_TIME) == [(first.author_id, 5)]
+
+    second.reads_count = 8
+    second.save()
+    PopularAuthorService.refresh()
+    assert ranking(RankingPeriod.ALL_TIME) == [(second.author_id, 8)]
+
+
+@pytest.mark.django_db
+def test_endpoint_reads_the_stored_ranking(fake_redis_clients, user_factory, topic_factory, article_factory,
+                                           tokens, api_client):
+    topic = topic_factory()
+    article = article_factory(reads_count=3, topics=[topic])
+    add_reads(article, days_ago=0, count=3)
+    PopularAuthorService.refresh()
+    client = api_client(tokens(user_factory())[0])
+
+    for query in ['', '?period=7d', f'?period=30d&topic={topic.id}', f'?topic={topic.id}']:
+        response = client.get(f'/users/articles/popular/{query}')
+        assert [author['id'] for author in response.data['results']] == [article.author_id], query
+
+    assert client.get('/users/articles/popular/?period=1y').status_code == 400
+    assert client.get(f'/users/articles/popular/?period=7d&topic={topic.id + 1}').data['results'] == []
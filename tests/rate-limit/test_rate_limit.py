@@ -0,0 +1,85 @@
+import pytest
+from freezegun import freeze_time
+from users.throttling import SlidingWindowRateThrottle
+
+
+@pytest.fixture
+def rate_limit(settings, fake_redis_clients):
+    settings.RATE_LIMIT_ENABLED = True
+    SlidingWindowRateThrottle.clear_local()
+    yield settings
+    SlidingWindowRateThrottle.clear_local()
+
+
+@pytest.mark.django_db
+def test_login_is_limited_per_username_before_hashing(rate_limit, user_factory, api_client, mocker):
+    rate_limit.RATE_LIMITS = {'login': {'ip': '100/min', 'username': '3/min'}}
+    user = user_factory.create()
+    check_password = mocker.spy(type(user), 'check_password')
+
+    for _ in range(3):
+        resp = api_client().post('/users/login/', {'username': user.username, 'password': 'wrong'})
+        assert resp.status_code == 400
+
+    resp = api_client().post('/users/login/', {'username': user.username.upper(), 'password': 'wrong'})
+    assert resp.status_code == 429
+    assert 'Retry-After' in resp
+    assert check_password.call_count == 3
+
+    # other accounts from the same ip are not affected
+    resp = api_client().post('/users/login/', {'username': 'someone-else', 'password': 'wrong'})
+    assert resp.status_code == 400
+
+
+@pytest.mark.django_db
+def test_blocked_identity_is_rejected_locally(rate_limit, api_client, fake_redis, mocker):
+    rate_limit.RATE_LIMITS = {'signup': {'ip': '1/hour'}}
+    api_client().post('/users/signup/', {}, format='json')
+    assert api_client().post('/users/signup/', {}, format='json').status_code == 429
+
+    pipeline = mocker.spy(fake_redis, 'pipeline')
+    assert api_client().post('/users/signup/', {}, format='json').status_code == 429
+    assert pipeline.call_count == 0
+
+
+@pytest.mark.django_db
+def test_window_slides(rate_limit, api_client):
+    rate_limit.RATE_LIMITS = {'password_forgot': {'ip': '2/min'}}
+    url = '/users/password/forgot/'
+
+    with freeze_time() as frozen_time:
+        assert api_client().post(url, {}, format='json').status_code == 400
+        frozen_time.tick(30)
+        assert api_client().post(url, {}, format='json').status_code == 400
+        assert api_client().post(url, {}, format='json').status_code == 429
+
+        frozen_time.tick(31)
+        assert api_client().post(url, {}, format='json').status_code == 400
+
+
+@pytest.mark.django_db
+def test_limiter_fails_open(rate_limit, api_client, mocker):
+    from redis import ConnectionError
+    rate_limit.RATE_LIMITS = {'signup': {'ip': '1/hour'}}
+    mocker.patch('users.throttling.SlidingWindowRateThrottle.get_redis_client', side_effect=ConnectionError())
+
+    for _ in range(3):
+        assert api_client().post('/users/signup/', {}, format='json').status_code == 400
+
+
+@pytest.mark.django_db
+def test_forged_forwarded_for_does_not_reset_ip_window(rate_limit, api_client):
+    rate_limit.RATE_LIMITS = {'signup': {'ip': '2/hour'}}
+
+    def signup(forwarded_for):
+        return api_client().post('/users/signup/', {}, format='json', HTTP_X_FORWARDED_FOR=forwarded_for)
+
+    assert signup('10.0.0.1').status_code == 400
+    assert signup('10.0.0.2').status_code == 400
+    assert signup('10.0.0.3').status_code == 429
+
+    # behind one proxy the client is the address that proxy appended, not what the client sent
+    rate_limit.REST_FRAMEWORK = {**rate_limit.REST_FRAMEWORK, 'NUM_PROXIES': 1}
+    assert signup('10.0.0.4, 203.0.113.7').status_code == 400
+    assert signup('10.0.0.5, 203.0.113.7').status_code == 400
+    assert signup('10.0.0.6, 203.0.113.7').status_code == 429
@@ -4,7 +4,7 @@ import pytest
 from django.contrib.auth import get_user_model
 from rest_framework import status
 from users.exceptions import OTPException
-from django.contrib.auth.hashers import make_password
+from users.services import OTPService
 
 User = get_user_model()
 
@@ -88,16 +88,6 @@ def test_forgot_password_view(forgot_password_data, api_client, mocker):
         assert sorted(resp_json.keys()) == sorted(['email', 'otp_secret'])
         assert resp.data['email'] == user.email
 
-        # check send email error
-        key = f"{user.email}:otp"
-        mocker.patch(
-            'users.services.SendEmailService.send_email',
-            mock.Mock(side_effect=Exception('Error sending email.'))
-        )
-        resp = client.post('/users/password/forgot/', data, format='json')
-        assert resp.status_code == status.HTTP_400_BAD_REQUEST
-        mock_redis_conn.delete.assert_called_once_with(key)
-
 
 @pytest.fixture
 def forgot_password_verify_data(request, user_factory, mocker):
@@ -255,8 +245,8 @@ def test_forgot_password_verify_view(forgot_password_verify_data, api_client, mo
     redis_conn = mocker.Mock()
     mocker.patch('users.services.OTPService.get_redis_conn', return_value=redis_conn)
     mocker.patch('users.services.OTPService.check_otp', side_effect=check_otp_side_effect)
-    mock_token_hash = make_password(token_urlsafe())
-    mocker.patch('users.views.make_password', return_value=mock_token_hash)
+    mock_token = token_urlsafe()
+    mocker.patch('users.views.token_urlsafe', return_value=mock_token)
     client = api_client()
     resp = client.post(f'/users/password/forgot/verify/{otp_secret}/', data, format='json')
     assert resp.status_code == status_code
@@ -264,15 +254,17 @@ def test_forgot_password_verify_view(forgot_password_verify_data, api_client, mo
         resp_json = resp.json()
         key = f"{user.email}:otp"
         redis_conn.delete.assert_called_once_with(key)
-        redis_conn.set.assert_called_once_with(mock_token_hash, user.email, ex=2 * 60 * 60)
+        redis_conn.set.assert_called_once_with(
+            OTPService.get_reset_token_key(mock_token), user.email, ex=2 * 60 * 60
+        )
         assert 'token' in resp_json
-        assert resp_json['token'] == mock_token_hash
+        assert resp_json['token'] == mock_token
 
 
 @pytest.fixture
 def reset_password_view_data(request, user_factory):
     user = user_factory.create()
-    token_hash = make_password(token_urlsafe())
+    token_hash = token_urlsafe()
     new_password = "new_password123"
 
     def valid_data():
@@ -380,11 +372,11 @@ def test_reset_password_view(reset_password_view_data, api_client, mocker):
     resp = client.patch('/users/password/reset/', data, format='json')
 
     if resp.status_code != 400:
-        mock_redis_conn.get.assert_called_once_with(data['token'])
+        mock_redis_conn.get.assert_called_once_with(OTPService.get_reset_token_key(data['token']))
 
     assert resp.status_code == status_code
     if resp.status_code == status.HTTP_200_OK:
-        mock_redis_conn.delete.assert_called_once_with(data['token'])
+        mock_redis_conn.delete.assert_called_once_with(OTPService.get_reset_token_key(data['token']))
         resp_json = resp.json()
         assert sorted(resp_json.keys()) == sorted(['access', 'refresh'])
 
@@ -0,0 +1,86 @@
+import hashlib
+import os
+from io import BytesIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from articles.models import Article
+from articles.tasks import store_thumbnail_renditions
+from core.tasks import TaskQueue
+from core.uploads import HashingTemporaryFileUploadHandler
+
+
+@pytest.fixture
+def client_with_user(user_factory, tokens, api_client, settings, tmp_path, fake_redis_clients):
+    settings.MEDIA_ROOT = tmp_path
+    user = user_factory.create()
+    access, _ = tokens(user)
+    return user, api_client(access)
+
+
+def jpeg_bytes():
+    content = BytesIO()
+    Image.new('RGB', (64, 64), 'green').save(content, format='JPEG')
+    return content.getvalue()
+
+
+@pytest.mark.django_db
+def test_upload_is_hashed_while_streaming(client_with_user, mocker):
+    user, client = client_with_user
+    file_complete = mocker.spy(HashingTemporaryFileUploadHandler, 'file_complete')
+    data = jpeg_bytes()
+
+    resp = client.patch('/users/me/', {'avatar': SimpleUploadedFile('a.jpg', data)}, format='multipart')
+
+    assert resp.status_code == 200
+    uploaded = file_complete.spy_return
+    assert hasattr(uploaded, 'temporary_file_path')
+    assert uploaded.sha256 == hashlib.sha256(data).hexdigest()
+
+
+@pytest.mark.django_db
+def test_oversized_file_is_rejected_while_streaming(client_with_user, settings):
+    user, client = client_with_user
+    settings.UPLOAD_MAX_SIZE = 100 * 1024
+    avatar = user.avatar.name
+
+    resp = client.patch('/users/me/', {'avatar': SimpleUploadedFile('a.jpg', os.urandom(300 * 1024))},
+                        format='multipart')
+
+    assert resp.status_code == 413
+    user.refresh_from_db()
+    assert user.avatar.name == avatar
+
+
+@pytest.mark.django_db
+def test_oversized_body_is_rejected_before_reading(client_with_user, settings, mocker):
+    user, client = client_with_user
+    settings.UPLOAD_MAX_SIZE = 100 * 1024
+    settings.DATA_UPLOAD_MAX_MEMORY_SIZE = 1024
+    receive_data_chunk = mocker.spy(HashingTemporaryFileUploadHandler, 'receive_data_chunk')
+
+    resp = client.patch('/users/me/', {'avatar': SimpleUploadedFile('a.jpg', os.urandom(300 * 1024))},
+                        format='multipart')
+
+    assert resp.status_code == 413
+    assert receive_data_chunk.call_count == 0
+
+
+@pytest.mark.django_db
+def test_known_thumbnail_skips_rendition_job(client_with_user, topic_factory, fake_redis,
+                                             django_capture_on_commit_callbacks):
+    user, client = client_with_user
+    topic = topic_factory.create()
+    data = jpeg_bytes()
+    digest, width = store_thumbnail_renditions(data)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        resp = client.post('/articles/', {'title': 'title', 'summary': 'summary', 'content': 'content',
+                                          'topic_ids': topic.id, 'thumbnail': SimpleUploadedFile('b.jpg', data)},
+                           format='multipart')
+
+    assert resp.status_code == 201
+    article = Article.objects.get(id=resp.data['id'])
+    assert (article.thumbnail_hash, article.thumbnail_width) == (digest, width)
+    assert fake_redis.llen(TaskQueue.QUEUE_KEY) == 0
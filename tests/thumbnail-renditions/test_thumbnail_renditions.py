@@ -0,0 +1,109 @@
+from io import BytesIO
+
+import pytest
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from PIL import Image
+from articles.models import Article, ArticleStatus
+from articles.tasks import get_rendition_name, get_source_width, get_thumbnail_srcset
+
+
+def make_image(width=2000, height=1000):
+    content = BytesIO()
+    Image.new('RGB', (width, height), 'blue').save(content, format='JPEG')
+    return SimpleUploadedFile('cover.jpg', content.getvalue(), content_type='image/jpeg')
+
+
+@pytest.fixture
+def uploaded_article(user_factory, topic_factory, tokens, api_client, settings, tmp_path,
+                     django_capture_on_commit_callbacks, fake_redis_clients):
+    settings.MEDIA_ROOT = tmp_path
+    user = user_factory.create()
+    topic = topic_factory.create()
+    access, _ = tokens(user)
+
+    data = {'title': 'title', 'summary': 'summary', 'content': 'content', 'topic_ids': topic.id,
+            'thumbnail': make_image()}
+    with django_capture_on_commit_callbacks(execute=True):
+        resp = api_client(access).post('/articles/', data=data, format='multipart')
+    assert resp.status_code == 201
+    article = Article.objects.get(id=resp.data['id'])
+    Article.objects.filter(id=article.id).update(status=ArticleStatus.PUBLISH)
+    return article, access
+
+
+@pytest.mark.django_db
+def test_srcset_is_empty_until_renditions_exist(uploaded_article, api_client):
+    article, access = uploaded_article
+
+    resp = api_client(access).get('/articles/')
+    assert resp.status_code == 200
+    assert resp.json()['results'][0]['thumbnail_srcset'] is None
+
+
+@pytest.mark.django_db
+def test_worker_generates_renditions(uploaded_article, api_client, settings):
+    article, access = uploaded_article
+
+    call_command('run_task_worker', '--once')
+
+    article.refresh_from_db()
+    assert len(article.thumbnail_hash) == 64
+    assert article.thumbnail_width == 2000
+    for width in settings.THUMBNAIL_RENDITION_WIDTHS:
+        for ext in ('webp', 'jpg'):
+            with default_storage.open(get_rendition_name(article.thumbnail_hash, width, ext)) as f:
+                assert Image.open(f).size == (width, width // 2)
+
+    srcset = api_client(access).get('/articles/').json()['results'][0]['thumbnail_srcset']
+    assert set(srcset) == {'webp', 'jpg'}
+    assert srcset['webp'].endswith(f"/{article.thumbnail_hash}/1280.webp 1280w")
+    assert srcset['jpg'].startswith('http://testserver/media/articles/renditions/')
+
+    resp = api_client().get(f"/media/articles/renditions/{article.thumbnail_hash[:2]}/{article.thumbnail_hash}/160.webp")
+    assert resp.status_code == 200
+    assert resp['Cache-Control'] == settings.RENDITION_CACHE_CONTROL
+
+
+@pytest.mark.django_db
+def test_same_image_reuses_renditions(article_factory, mocker, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    save = mocker.spy(default_storage, 'save')
+    first, second = article_factory.create_batch(2, thumbnail=make_image(400, 300))
+
+    call_command('generate_thumbnail_renditions')
+
+    first.refresh_from_db()
+    second.refresh_from_db()
+    assert first.thumbnail_hash == second.thumbnail_hash
+    # one set of renditions for both articles
+    assert save.call_count == 2 * len(settings.THUMBNAIL_RENDITION_WIDTHS)
+    with default_storage.open(get_rendition_name(first.thumbnail_hash, 1280, 'jpg')) as f:
+        assert Image.open(f).size == (400, 300)
+
+
+@pytest.mark.django_db
+def test_srcset_lists_real_widths_of_small_images(article_factory, api_client, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    article = article_factory.create(thumbnail=make_image(400, 300))
+
+    call_command('generate_thumbnail_renditions')
+
+    article.refresh_from_db()
+    assert article.thumbnail_width == 400
+    srcset = get_thumbnail_srcset(article.thumbnail_hash, article.thumbnail_width)
+    # the 640 rendition holds the whole 400px source, 1280 would be the same image again
+    assert [candidate.split()[1] for candidate in srcset['webp'].split(', ')] == ['160w', '320w', '400w']
+    assert srcset['jpg'].endswith(f"/{article.thumbnail_hash}/640.jpg 400w")
+
+
+def test_source_width_follows_exif_rotation():
+    content = BytesIO()
+    exif = Image.Exif()
+    # rotated 90 degrees, shown 300px wide
+    exif[0x0112] = 6
+    Image.new('RGB', (1000, 300), 'blue').save(content, format='JPEG', exif=exif)
+    content.seek(0)
+
+    assert get_source_width(content) == 300
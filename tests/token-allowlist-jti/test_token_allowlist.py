@@ -0,0 +1,89 @@
+import pytest
+from django.core.management import call_command
+from rest_framework_simplejwt.tokens import AccessToken
+from users.enums import TokenType
+
+
+@pytest.fixture
+def login_sessions(user_factory, api_client, mocker, fake_redis, settings):
+    mocker.patch('users.services.TokenService.get_redis_client', return_value=fake_redis)
+    settings.TOKEN_ALLOWLIST_REQUIRED_SINCE = 0
+    password = 'random_password'
+    user = user_factory.create(password=password)
+
+    def _login_sessions(count):
+        sessions = []
+        for _ in range(count):
+            resp = api_client().post('/users/login/', {'username': user.username, 'password': password})
+            assert resp.status_code == 200
+            sessions.append(resp.json()['access'])
+        return user, sessions
+
+    return _login_sessions
+
+
+@pytest.mark.django_db
+def test_allowlist_stores_jti_per_session(login_sessions, api_client, fake_redis):
+    user, sessions = login_sessions(2)
+    access_token_key = f"user:{user.id}:{TokenType.ACCESS}"
+
+    members = set(fake_redis.zrange(access_token_key, 0, -1))
+    for access in sessions:
+        assert AccessToken(access)['jti'].encode() in members
+        assert access.encode() not in members
+
+    # both devices stay logged in
+    for access in sessions:
+        assert api_client(access).get('/users/me/').status_code == 200
+
+    # logging out one device keeps the other session alive, refresh tokens included
+    assert api_client(sessions[0]).post('/users/logout/').status_code == 200
+    assert api_client(sessions[0]).get('/users/me/').status_code == 401
+    assert api_client(sessions[1]).get('/users/me/').status_code == 200
+    assert fake_redis.zrange(f"user:{user.id}:{TokenType.REFRESH}", 0, -1) == [
+        AccessToken(sessions[1])['sid'].encode()
+    ]
+
+    # the last logout empties the allowlist, which must not reopen it
+    assert api_client(sessions[1]).post('/users/logout/').status_code == 200
+    assert api_client(sessions[1]).get('/users/me/').status_code == 401
+
+
+@pytest.mark.django_db
+def test_expired_session_is_rejected(login_sessions, api_client, fake_redis):
+    user, sessions = login_sessions(1)
+    access_token_key = f"user:{user.id}:{TokenType.ACCESS}"
+    fake_redis.zadd(access_token_key, {AccessToken(sessions[0])['jti']: 1})
+
+    assert api_client(sessions[0]).get('/users/me/').status_code == 401
+
+
+@pytest.mark.django_db
+def test_unrecorded_tokens_need_the_migration_window(user_factory, tokens, api_client, mocker, fake_redis,
+                                                     settings):
+    mocker.patch('users.services.TokenService.get_redis_client', return_value=fake_redis)
+    access, _ = tokens(user_factory.create())
+
+    settings.TOKEN_ALLOWLIST_REQUIRED_SINCE = AccessToken(access)['iat'] + 1
+    assert api_client(access).get('/users/me/').status_code == 200
+
+    settings.TOKEN_ALLOWLIST_REQUIRED_SINCE = AccessToken(access)['iat']
+    assert api_client(access).get('/users/me/').status_code == 401
+
+
+@pytest.mark.django_db
+def test_migrate_token_allowlist(user_factory, tokens, mocker, fake_redis):
+    mocker.patch('users.services.TokenService.get_redis_client', return_value=fake_redis)
+    user = user_factory.create()
+    access, refresh = tokens(user)
+    access_token_key = f"user:{user.id}:{TokenType.ACCESS}"
+    refresh_token_key = f"user:{user.id}:{TokenType.REFRESH}"
+    fake_redis.sadd(access_token_key, access)
+    fake_redis.sadd(refresh_token_key, 'fake_token')
+
+    call_command('migrate_token_allowlist')
+
+    assert fake_redis.type(access_token_key) == b'zset'
+    assert fake_redis.zscore(access_token_key, AccessToken(access)['jti']) == AccessToken(access)['exp']
+    assert fake_redis.zrange(refresh_token_key, 0, -1) == [b'guard']
+    assert fake_redis.ttl(access_token_key) > 0
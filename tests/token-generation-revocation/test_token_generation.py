@@ -0,0 +1,77 @@
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.tokens import AccessToken
+
+User = get_user_model()
+
+
+@pytest.fixture
+def generation_mode(settings, fake_redis_clients):
+    settings.TOKEN_REVOCATION_MODE = 'generation'
+    return fake_redis_clients
+
+
+@pytest.fixture
+def login(user_factory, api_client):
+    password = 'random_password'
+    user = user_factory.create(password=password)
+
+    def _login():
+        resp = api_client().post('/users/login/', {'username': user.username, 'password': password})
+        assert resp.status_code == 200
+        return resp.json()['access']
+
+    return user, password, _login
+
+
+@pytest.mark.django_db
+def test_tokens_embed_generation(generation_mode, login):
+    user, _, _login = login
+    access = _login()
+
+    assert AccessToken(access)['token_generation'] == 0
+    assert generation_mode.get(f"user:{user.id}:token_generation") == b'0'
+    # no per-token state is stored in this mode
+    assert generation_mode.keys(f"user:{user.id}:access") == []
+
+
+@pytest.mark.django_db
+def test_logout_bumps_generation(generation_mode, login, api_client):
+    user, _, _login = login
+    first_device, second_device = _login(), _login()
+
+    assert api_client(first_device).post('/users/logout/').status_code == 200
+
+    user.refresh_from_db()
+    assert user.token_generation == 1
+    assert api_client(first_device).get('/users/me/').status_code == 401
+    assert api_client(second_device).get('/users/me/').status_code == 401
+    assert api_client(_login()).get('/users/me/').status_code == 200
+
+
+@pytest.mark.django_db
+def test_change_password_bumps_generation(generation_mode, login, api_client):
+    user, password, _login = login
+    access = _login()
+
+    resp = api_client(access).put(
+        '/users/password/change/', {'old_password': password, 'new_password': 'N3w_passw0rd!'}, format='json'
+    )
+    assert resp.status_code == 200
+    assert AccessToken(resp.json()['access'])['token_generation'] == 1
+    assert api_client(access).get('/users/me/').status_code == 401
+    assert api_client(resp.json()['access']).get('/users/me/').status_code == 200
+
+
+@pytest.mark.django_db
+def test_generation_falls_back_to_database(generation_mode, login, mocker):
+    from redis import ConnectionError
+    from users.services import TokenGenerationService
+
+    user, _, _ = login
+    User.objects.filter(id=user.id).update(token_generation=7)
+    broken_redis = mocker.Mock()
+    broken_redis.get.side_effect = ConnectionError()
+    mocker.patch('users.services.TokenGenerationService.get_redis_client', return_value=broken_redis)
+
+    assert TokenGenerationService.get_generation(user.id) == 7
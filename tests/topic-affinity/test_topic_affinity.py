@@ -0,0 +1,91 @@
+import pytest
+import redis
+from django.test import override_settings
+from articles.affinity import CandidateSet
+from articles.models import Clap, Favorite, ReadingHistory, Recommendation, TopicFollow
+from articles.services import TopicAffinity
+
+WEIGHTS = {'more': 3.0, 'less': -3.0, 'follow': 2.0, 'favorite': 1.5, 'clap': 1.0, 'read': 0.5}
+
+
+@pytest.mark.django_db
+@override_settings(TOPIC_AFFINITY_WEIGHTS=WEIGHTS)
+def test_vector_combines_every_signal(user_factory, topic_factory, article_factory):
+    user = user_factory()
+    liked, disliked, followed, read = topic_factory.create_batch(4)
+    recommendation = Recommendation.objects.create(user=user)
+    recommendation.more.add(liked)
+    recommendation.less.add(disliked)
+    TopicFollow.objects.create(user=user, topic=followed)
+    article = article_factory(topics=[read, liked])
+    ReadingHistory.objects.create(user=user, article=article)
+    Clap.objects.create(user=user, article=article, count=3)
+    Favorite.objects.create(user=user, article=article_factory(topics=[read]))
+
+    assert TopicAffinity.compute([user.id]) == {user.id: {
+        liked.id: 3.0 + 0.5 + 1.0, disliked.id: -3.0, followed.id: 2.0, read.id: 0.5 + 1.0 + 1.5,
+    }}
+
+
+@pytest.mark.django_db
+@override_settings(TOPIC_AFFINITY_WEIGHTS=WEIGHTS)
+def test_signals_update_loaded_vectors(fake_redis_clients, user_factory, topic_factory, article_factory,
+                                       tokens, api_client, django_capture_on_commit_callbacks):
+    user = user_factory()
+    topic, other = topic_factory.create_batch(2)
+    article = article_factory(topics=[topic, other])
+    client = api_client(tokens(user)[0])
+
+    # nothing is written for a user whose vector isn't loaded
+    with django_capture_on_commit_callbacks(execute=True):
+        client.post(f'/articles/topics/{topic.id}/follow/')
+    assert not fake_redis_clients.exists(TopicAffinity.get_key(user.id))
+    assert TopicAffinity.get_many([user.id]) == {user.id: {topic.id: 2.0}}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client.get(f'/articles/{article.id}/')
+        client.post(f'/articles/{article.id}/clap/')
+        client.post(f'/articles/{article.id}/clap/')
+        client.delete(f'/articles/topics/{topic.id}/follow/')
+    assert TopicAffinity.get_many([user.id]) == {user.id: {topic.id: 1.5, other.id: 1.5}}
+    assert TopicAffinity.get_many([user.id]) == TopicAffinity.compute([user.id])
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client.post('/users/recommend/', data={'less_article_id': article.id}, format='json')
+    assert not fake_redis_clients.exists(TopicAffinity.get_key(user.id))
+    assert TopicAffinity.get_many([user.id]) == {user.id: {topic.id: -1.5, other.id: -1.5}}
+
+
+@pytest.mark.django_db
+def test_candidates_are_ranked_by_affinity(topic_factory, article_factory):
+    science, art, sport = topic_factory.create_batch(3)
+    newest = article_factory(topics=[art])
+    mixed = article_factory(topics=[science, art])
+    pure = article_factory(topics=[science])
+    disliked = article_factory(topics=[sport])
+    candidates = CandidateSet([newest.id, mixed.id, pure.id, disliked.id])
+
+    unknown_topic = max(science.id, art.id, sport.id) + 1
+    ranked = candidates.rank([{science.id: 2.0, sport.id: -1.0}, {}, {unknown_topic: 5.0}])
+
+    assert ranked[0] == [pure.id, mixed.id, newest.id]
+    # no signal yet: the candidates keep the order they were given in
+    assert ranked[1] == ranked[2] == [newest.id, mixed.id, pure.id, disliked.id]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('redis_down', [False, True])
+def test_recommended_feed_is_ranked(fake_redis_clients, user_factory, topic_factory, article_factory,
+                                    tokens, api_client, mocker, redis_down):
+    user = user_factory()
+    science, art = topic_factory.create_batch(2)
+    art_article = article_factory(topics=[art])
+    science_article = article_factory(topics=[science])
+    TopicFollow.objects.create(user=user, topic=science)
+    client = api_client(tokens(user)[0])
+    if redis_down:
+        mocker.patch('articles.services.TopicAffinity.get_redis_client', side_effect=redis.ConnectionError)
+
+    results = client.get('/articles/?is_recommend=true').data['results']
+
+    assert [article['id'] for article in results][:2] == [science_article.id, art_article.id]
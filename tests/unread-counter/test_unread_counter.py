@@ -0,0 +1,65 @@
+import pytest
+from django.core.management import call_command
+from articles.models import Follow, Notification
+from articles.services import NotificationService, UnreadCounter
+
+
+@pytest.fixture
+def reader(user_factory, tokens, api_client, fake_redis_clients):
+    user = user_factory.create()
+    return user, api_client(tokens(user)[0])
+
+
+def unread_count(client):
+    resp = client.get('/users/notifications/unread_count/')
+    assert resp.status_code == 200
+    return resp.json()['unread_count']
+
+
+@pytest.mark.django_db
+def test_counter_follows_inserts_and_reads(reader, user_factory, fake_redis, django_capture_on_commit_callbacks):
+    user, client = reader
+    Notification.objects.create(user=user, message='before the counter existed')
+
+    assert unread_count(client) == 1
+    assert fake_redis.get(UnreadCounter.get_key(user.id)) == b'1'
+
+    author = user_factory.create()
+    Follow.objects.create(follower=user, followee=author)
+    with django_capture_on_commit_callbacks(execute=True):
+        NotificationService.notify(user.id, 'hello')
+        NotificationService.fan_out(author.id, 'published', 'article_published:1')
+        NotificationService.fan_out(author.id, 'published', 'article_published:1')
+    assert unread_count(client) == 3
+
+    notification = Notification.objects.filter(user=user).first()
+    with django_capture_on_commit_callbacks(execute=True):
+        assert client.patch(f'/users/notifications/{notification.id}/').status_code == 204
+    assert unread_count(client) == 2
+
+
+@pytest.mark.django_db
+def test_uninitialized_counter_is_not_incremented(reader, fake_redis, django_capture_on_commit_callbacks):
+    user, client = reader
+    Notification.objects.create(user=user, message='old')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        NotificationService.notify(user.id, 'new')
+
+    assert fake_redis.get(UnreadCounter.get_key(user.id)) is None
+    assert unread_count(client) == 2
+
+
+@pytest.mark.django_db
+def test_reconcile_fixes_drift(reader, user_factory, fake_redis):
+    user, client = reader
+    other = user_factory.create()
+    Notification.objects.create(user=user, message='one')
+    fake_redis.set(UnreadCounter.get_key(user.id), 7)
+    fake_redis.set(UnreadCounter.get_key(other.id), 0)
+
+    call_command('reconcile_unread_counts', '--batch-size', '1')
+
+    assert fake_redis.get(UnreadCounter.get_key(user.id)) == b'1'
+    assert fake_redis.get(UnreadCounter.get_key(other.id)) == b'0'
+    assert unread_count(client) == 1
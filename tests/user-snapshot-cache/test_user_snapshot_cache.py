@@ -0,0 +1,107 @@
+import pytest
+from users.cache import UserSnapshotCache
+
+
+@pytest.fixture
+def snapshot_cache(fake_redis_clients):
+    UserSnapshotCache.clear_local()
+    yield fake_redis_clients
+    UserSnapshotCache.clear_local()
+
+
+@pytest.mark.django_db
+def test_authenticated_request_skips_user_query(snapshot_cache, user_factory, tokens, api_client,
+                                               django_assert_num_queries):
+    user = user_factory.create()
+    access, _ = tokens(user)
+    client = api_client(access)
+
+    assert client.get('/users/me/').status_code == 200
+    assert snapshot_cache.exists(UserSnapshotCache.get_snapshot_key(user.id))
+
+    with django_assert_num_queries(0):
+        resp = client.get('/users/me/')
+    assert resp.status_code == 200
+    assert resp.json()['username'] == user.username
+
+    # a cold process rebuilds the user from redis, still without a query
+    UserSnapshotCache.clear_local()
+    with django_assert_num_queries(0):
+        assert client.get('/users/me/').status_code == 200
+
+
+@pytest.mark.django_db
+def test_save_invalidates_snapshot(snapshot_cache, user_factory, tokens, api_client):
+    user = user_factory.create()
+    access, _ = tokens(user)
+    client = api_client(access)
+    assert client.get('/users/me/').status_code == 200
+
+    user.is_active = False
+    user.save()
+
+    assert not snapshot_cache.exists(UserSnapshotCache.get_snapshot_key(user.id))
+    assert client.get('/users/me/').status_code == 401
+
+
+@pytest.mark.django_db
+def test_snapshot_matches_database_row(snapshot_cache, user_factory):
+    user = user_factory.create(birth_year=1990)
+
+    cached = UserSnapshotCache.get(user.id)
+    UserSnapshotCache.clear_local()
+    from_redis = UserSnapshotCache.get(user.id)
+
+    for field in type(user)._meta.concrete_fields:
+        assert getattr(cached, field.attname) == getattr(user, field.attname)
+        assert getattr(from_redis, field.attname) == getattr(user, field.attname)
+    assert from_redis._state.adding is False
+    assert UserSnapshotCache.get(-1) is None
+
+
+@pytest.mark.django_db
+def test_snapshot_leaves_out_password(snapshot_cache, user_factory):
+    user = user_factory.create()
+    cached = UserSnapshotCache.get(user.id)
+
+    assert b'password' not in snapshot_cache.get(UserSnapshotCache.get_snapshot_key(user.id))
+    assert cached.get_deferred_fields() == {'password', 'token_generation'}
+
+    # another worker changes the password while this one holds the snapshot
+    user.set_password('changed-elsewhere')
+    user.save()
+    cached.first_name = 'Renamed'
+    cached.save()
+
+    user.refresh_from_db()
+    assert user.first_name == 'Renamed'
+    assert user.check_password('changed-elsewhere')
+
+
+@pytest.mark.django_db
+def test_queryset_delete_invalidates_snapshot(snapshot_cache, user_factory, tokens, api_client):
+    user = user_factory.create()
+    client = api_client(tokens(user)[0])
+    assert client.get('/users/me/').status_code == 200
+
+    # the admin's "delete selected" deletes through the queryset
+    type(user).objects.filter(id=user.id).delete()
+
+    assert not snapshot_cache.exists(UserSnapshotCache.get_snapshot_key(user.id))
+    assert client.get('/users/me/').status_code == 401
+
+
+@pytest.mark.django_db
+def test_snapshot_cached_before_commit_is_invalidated_again(snapshot_cache, user_factory,
+                                                           django_capture_on_commit_callbacks):
+    user = user_factory.create()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        user.is_active = False
+        user.save()
+        # another request caches the row as it was before the deactivation commits
+        UserSnapshotCache._set_redis(user.id, {**UserSnapshotCache._get_database(user.id), 'is_active': True})
+
+    UserSnapshotCache.clear_local()
+    assert not snapshot_cache.exists(UserSnapshotCache.get_snapshot_key(user.id))
+    assert UserSnapshotCache.get(user.id).is_active is False
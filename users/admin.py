@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser
+from .models import CustomUser, EmailOutbox
 
 
 @admin.register(CustomUser)  # register in the admin panel
@@ -15,4 +15,13 @@ class CustomUserAdmin(UserAdmin):
     search_fields = ('username', 'email', 'first_name', 'last_name', 'middle_name')
     list_filter = ('last_login', 'date_joined', 'is_staff', 'is_superuser', 'is_active')
 
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ('id', 'to', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_display_links = ('id', 'to')
+    search_fields = ('to', 'subject')
+    list_filter = ('status',)
+
+
 # admin.site.register(CustomUser, CustomUserAdmin)  # another way to register in the admin panel
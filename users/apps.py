@@ -7,3 +7,4 @@ class UsersConfig(AppConfig):
 
     def ready(self):
         import users.auth_extensions  # noqa
+        import users.signals  # noqa
@@ -1,13 +1,16 @@
 from typing import Optional
+from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth import get_user_model
-from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
 from rest_framework_simplejwt.tokens import Token
 
 from rest_framework_simplejwt.authentication import AuthUser, JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
 
-from users.enums import TokenType
-from users.services import TokenService
+from users.cache import UserSnapshotCache
+from users.enums import TokenType, TokenRevocationMode
+from users.services import TokenService, TokenGenerationService
 
 User = get_user_model()
 
@@ -27,12 +30,30 @@ class CustomJWTAuthentication(JWTAuthentication):
 
         return user, access_token
 
+    def get_user(self, validated_token: Token) -> AuthUser:
+        """ Same checks as simplejwt, but the user comes from the snapshot cache instead of a SELECT. """
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = UserSnapshotCache.get(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return user
+
     @classmethod
     def is_valid_access_token(cls, user: User, access_token: Token) -> bool:
-        valid_access_tokens = TokenService.get_valid_tokens(user.id, TokenType.ACCESS)
-        if (
-                valid_access_tokens
-                and str(access_token).encode() not in valid_access_tokens
-        ):
+        if settings.TOKEN_REVOCATION_MODE == TokenRevocationMode.GENERATION:
+            if not TokenGenerationService.is_valid_token(user.id, access_token):
+                raise AuthenticationFailed(_("Kirish ma'lumotlari yaroqsiz"))
+            return True
+
+        jti = access_token.get(settings.SIMPLE_JWT.get("JTI_CLAIM"))
+        if not TokenService.is_valid_token(user.id, jti, TokenType.ACCESS, access_token.get("iat", 0)):
             raise AuthenticationFailed(_("Kirish ma'lumotlari yaroqsiz"))
         return True
@@ -0,0 +1,139 @@
+import datetime
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import redis
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from loguru import logger
+
+from core import connections
+
+
+class SnapshotJSONEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder drops microseconds, which a later save() would write back
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class UserSnapshotCache:
+    """
+    Two level cache of user rows used by JWT authentication.
+
+    Snapshots hold the concrete fields of the user except ``SKIPPED_FIELDS``,
+    which authentication doesn't need and Redis shouldn't hold. The rebuilt
+    instance has those deferred, so they load on access and a plain
+    ``save()`` doesn't write them back. The in-process LRU is kept
+    short-lived because other workers can't invalidate it; Redis entries are
+    dropped by the user's ``post_save`` and ``post_delete`` signals. Queryset
+    ``update()`` sends no signal, so its callers invalidate themselves.
+    """
+    SKIPPED_FIELDS = ('password', 'token_generation')
+    _local = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_redis_client(cls) -> redis.Redis:
+        return connections.get_redis_client()
+
+    @classmethod
+    def get_snapshot_key(cls, user_id: int) -> str:
+        # v2: v1 snapshots held password hashes, they are left to expire unread
+        return f"user:{user_id}:snapshot:v2"
+
+    @classmethod
+    def get(cls, user_id: int):
+        """ Returns the user with ``user_id`` or ``None`` if it doesn't exist. """
+        snapshot = cls._get_local(user_id)
+        if snapshot is None:
+            snapshot = cls._get_redis(user_id)
+            if snapshot is None:
+                snapshot = cls._get_database(user_id)
+                if snapshot is None:
+                    return None
+                cls._set_redis(user_id, snapshot)
+            cls._set_local(user_id, snapshot)
+        return cls._to_instance(snapshot)
+
+    @classmethod
+    def invalidate(cls, user_id: int) -> None:
+        with cls._lock:
+            cls._local.pop(user_id, None)
+        try:
+            cls.get_redis_client().delete(cls.get_snapshot_key(user_id))
+        except redis.RedisError as e:
+            logger.warning(f"User snapshot invalidation failed for user {user_id}: {e}")
+
+    @classmethod
+    def clear_local(cls) -> None:
+        with cls._lock:
+            cls._local.clear()
+
+    @classmethod
+    def _get_local(cls, user_id: int) -> Optional[dict]:
+        with cls._lock:
+            entry = cls._local.get(user_id)
+            if entry is None:
+                return None
+            expires_at, snapshot = entry
+            if expires_at < time.monotonic():
+                del cls._local[user_id]
+                return None
+            cls._local.move_to_end(user_id)
+            return snapshot
+
+    @classmethod
+    def _set_local(cls, user_id: int, snapshot: dict) -> None:
+        with cls._lock:
+            cls._local[user_id] = (time.monotonic() + settings.USER_SNAPSHOT_LOCAL_TTL, snapshot)
+            cls._local.move_to_end(user_id)
+            while len(cls._local) > settings.USER_SNAPSHOT_LOCAL_MAXSIZE:
+                cls._local.popitem(last=False)
+
+    @classmethod
+    def _get_redis(cls, user_id: int) -> Optional[dict]:
+        try:
+            snapshot = cls.get_redis_client().get(cls.get_snapshot_key(user_id))
+        except redis.RedisError as e:
+            logger.warning(f"User snapshot lookup fell back to the database: {e}")
+            return None
+        return json.loads(snapshot) if snapshot else None
+
+    @classmethod
+    def _set_redis(cls, user_id: int, snapshot: dict) -> None:
+        try:
+            cls.get_redis_client().set(
+                cls.get_snapshot_key(user_id),
+                json.dumps(snapshot, cls=SnapshotJSONEncoder),
+                ex=settings.USER_SNAPSHOT_TTL,
+            )
+        except redis.RedisError as e:
+            logger.warning(f"User snapshot for user {user_id} was not stored: {e}")
+
+    @classmethod
+    def _get_database(cls, user_id: int) -> Optional[dict]:
+        User = get_user_model()  # noqa
+        field_names = cls._get_field_names()
+        values = User.objects.filter(id=user_id).values_list(*field_names).first()
+        if values is None:
+            return None
+        return json.loads(json.dumps(dict(zip(field_names, values)), cls=SnapshotJSONEncoder))
+
+    @classmethod
+    def _get_field_names(cls) -> list[str]:
+        User = get_user_model()  # noqa
+        return [field.attname for field in User._meta.concrete_fields if field.attname not in cls.SKIPPED_FIELDS]
+
+    @classmethod
+    def _to_instance(cls, snapshot: dict):
+        User = get_user_model()  # noqa
+        field_names = cls._get_field_names()
+        values = [User._meta.get_field(name).to_python(snapshot.get(name)) for name in field_names]
+        # the fields left out come back deferred
+        return User.from_db("default", field_names, values)
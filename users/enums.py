@@ -4,3 +4,8 @@ from enum import Enum
 class TokenType(str, Enum):
     ACCESS = "access"
     REFRESH = "refresh"
+
+
+class TokenRevocationMode(str, Enum):
+    ALLOWLIST = "allowlist"
+    GENERATION = "generation"
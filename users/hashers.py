@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2id with costs taken from settings. Keeping the ``argon2`` algorithm
+    name means hashes made with other costs still verify and are rehashed on
+    the next successful login.
+    """
+    time_cost = settings.ARGON2_TIME_COST
+    memory_cost = settings.ARGON2_MEMORY_COST
+    parallelism = settings.ARGON2_PARALLELISM
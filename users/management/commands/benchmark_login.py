@@ -0,0 +1,49 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import get_hashers
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from users.serializers import LoginSerializer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Reports single-core logins per second for each configured password hasher and the login pipeline."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--password', default='benchmark-Passw0rd')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        password = options['password']
+
+        self.stdout.write(f"{'hasher':<40} {'ms/login':>10} {'logins/s/core':>14}")
+        for hasher in get_hashers():
+            encoded = hasher.encode(password, hasher.salt())
+            elapsed = self.measure(lambda: hasher.verify(password, encoded), iterations)
+            self.report(type(hasher).__name__, elapsed, iterations)
+
+        # the whole LoginSerializer path: one user lookup and one password check
+        with transaction.atomic():
+            user = User(username='benchmark-login-user')
+            user.set_password(password)
+            user.save()
+            data = {'username': user.username, 'password': password}
+            elapsed = self.measure(lambda: LoginSerializer(data=data).is_valid(raise_exception=True), iterations)
+            self.report('LoginSerializer', elapsed, iterations)
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def measure(func, iterations: int) -> float:
+        func()  # warm up and let a legacy hash get upgraded
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        return time.perf_counter() - started
+
+    def report(self, name: str, elapsed: float, iterations: int) -> None:
+        self.stdout.write(f"{name:<40} {elapsed / iterations * 1000:>10.1f} {iterations / elapsed:>14.1f}")
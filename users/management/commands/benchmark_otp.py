@@ -0,0 +1,50 @@
+import time
+from secrets import token_urlsafe
+
+from django.contrib.auth.hashers import make_password, check_password
+from django.core.management.base import BaseCommand
+from django.utils.crypto import constant_time_compare
+
+from users.services import OTPService
+
+
+class Command(BaseCommand):
+    help = "Compares the CPU time of one forgot-password flow with password hashes and with HMAC digests."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=10)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        otp_code, otp_secret = "123456", token_urlsafe()
+
+        def hashed_flow(hasher):
+            # generate_otp, check_otp and the reset token of ForgotPasswordVerifyView
+            otp_hash = make_password(f"{otp_secret}:{otp_code}", hasher=hasher)
+            check_password(f"{otp_secret}:{otp_code}", otp_hash)
+            make_password(token_urlsafe(), hasher=hasher)
+
+        def hmac_flow():
+            otp_digest = OTPService.get_otp_digest(otp_secret, otp_code)
+            constant_time_compare(otp_digest, OTPService.get_otp_digest(otp_secret, otp_code))
+            OTPService.get_reset_token_key(token_urlsafe())
+
+        results = [
+            ('make_password (pbkdf2_sha256)', self.measure(lambda: hashed_flow('pbkdf2_sha256'), iterations)),
+            ('make_password (default hasher)', self.measure(lambda: hashed_flow('default'), iterations)),
+            ('salted_hmac (sha256)', self.measure(hmac_flow, iterations)),
+        ]
+
+        self.stdout.write(f"{'scheme':<34} {'CPU ms/flow':>12}")
+        for name, cpu_time in results:
+            self.stdout.write(f"{name:<34} {cpu_time * 1000:>12.3f}")
+        saved = results[0][1] - results[-1][1]
+        self.stdout.write(self.style.SUCCESS(f"CPU saved per flow against PBKDF2: {saved * 1000:.1f} ms"))
+
+    @staticmethod
+    def measure(func, iterations: int) -> float:
+        func()
+        started = time.process_time()
+        for _ in range(iterations):
+            func()
+        return (time.process_time() - started) / iterations
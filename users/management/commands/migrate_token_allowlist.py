@@ -0,0 +1,60 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import UntypedToken
+
+from users.enums import TokenType
+from users.services import TokenService
+
+
+class Command(BaseCommand):
+    help = "Converts legacy allowlists of full JWT strings into jti sorted sets (one-time migration)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        redis_client = TokenService.get_redis_client()
+        jti_claim = settings.SIMPLE_JWT.get("JTI_CLAIM")
+        migrated = skipped = 0
+
+        for token_type in TokenType:
+            pattern = TokenService.get_token_key("*", token_type)
+            for token_key in redis_client.scan_iter(match=pattern, count=options['batch_size']):
+                if redis_client.type(token_key) != b"set":
+                    skipped += 1
+                    continue
+
+                sessions = {}
+                for raw_token in redis_client.smembers(token_key):
+                    try:
+                        token = UntypedToken(raw_token)
+                    except TokenError:
+                        # expired or forged entries, also the old logout placeholder
+                        sessions[TokenService.ALLOWLIST_GUARD] = max(
+                            sessions.get(TokenService.ALLOWLIST_GUARD, 0), self.guard_expiry(token_type)
+                        )
+                        continue
+                    sessions[token[jti_claim]] = token["exp"]
+
+                if options['dry_run']:
+                    self.stdout.write(f"{token_key.decode()}: {len(sessions)} session(s)")
+                    migrated += 1
+                    continue
+
+                pipeline = redis_client.pipeline()
+                pipeline.delete(token_key)
+                pipeline.zadd(token_key, sessions)
+                pipeline.expireat(token_key, int(max(sessions.values())))
+                pipeline.execute()
+                migrated += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Migrated {migrated} key(s), skipped {skipped} key(s)."))
+
+    @staticmethod
+    def guard_expiry(token_type: TokenType) -> float:
+        lifetime_setting = f"{token_type.value.upper()}_TOKEN_LIFETIME"
+        return time.time() + settings.SIMPLE_JWT.get(lifetime_setting).total_seconds()
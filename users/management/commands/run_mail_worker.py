@@ -0,0 +1,56 @@
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from users.services import SendEmailService
+
+
+class Command(BaseCommand):
+    help = "Delivers queued EmailOutbox messages, reusing one SMTP connection per worker thread."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--concurrency', type=int, default=2, help="Maximum parallel SMTP connections.")
+        parser.add_argument('--poll-interval', type=float, default=2.0)
+        parser.add_argument('--once', action='store_true', help="Drain the due messages and exit.")
+
+    def handle(self, *args, **options):
+        self.local = threading.local()
+        self.connections = []
+        concurrency = max(options['concurrency'], 1)
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='mail-worker') as executor:
+            try:
+                while True:
+                    outbox = SendEmailService.claim_batch(options['batch_size'])
+                    if outbox:
+                        # threads only talk SMTP, the database is updated from this thread
+                        chunks = [outbox[i::concurrency] for i in range(concurrency) if outbox[i::concurrency]]
+                        results = list(itertools.chain.from_iterable(executor.map(self.deliver, chunks)))
+                        sent = SendEmailService.record_results(results)
+                        self.stdout.write(f"Sent {sent}/{len(outbox)} email(s).")
+                        continue
+                    if options['once']:
+                        break
+                    self.close_connections()
+                    time.sleep(options['poll_interval'])
+            except KeyboardInterrupt:
+                pass
+            finally:
+                self.close_connections()
+
+    def deliver(self, outbox):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = get_connection(fail_silently=False)
+            self.connections.append(connection)
+        return SendEmailService.deliver(outbox, connection)
+
+    def close_connections(self) -> None:
+        # idle SMTP sessions get dropped by the server anyway
+        for connection in self.connections:
+            connection.close()
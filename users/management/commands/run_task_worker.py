@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core.tasks import TaskQueue
+from users.tasks import resize_avatar
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Runs background jobs queued with TaskQueue.enqueue."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--timeout', type=int, default=5, help="Seconds to block waiting for a job.")
+        parser.add_argument('--once', action='store_true', help="Drain the queue and exit.")
+        parser.add_argument('--backfill-avatars', action='store_true',
+                            help="Queue a resize for every avatar that has no rendition yet.")
+
+    def handle(self, *args, **options):
+        if options['backfill_avatars']:
+            pending = User.objects.exclude(avatar='').filter(avatar_rendition='').values_list('id', 'avatar')
+            for user_id, avatar_name in pending.iterator():
+                TaskQueue.enqueue(resize_avatar, user_id, avatar_name)
+
+        done = failed = 0
+        try:
+            while True:
+                result = TaskQueue.run_next(timeout=0 if options['once'] else options['timeout'])
+                if result is None:
+                    if options['once']:
+                        break
+                    continue
+                done, failed = done + result, failed + (not result)
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f"Ran {done + failed} job(s), {failed} failed.")
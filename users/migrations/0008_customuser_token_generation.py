@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 05:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_remove_customuser_email_en_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='token_generation',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
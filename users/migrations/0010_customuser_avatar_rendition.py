@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-19 05:30
+
+from django.db import migrations, models
+import users.models
+import users.tasks
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='avatar_rendition',
+            field=models.ImageField(blank=True, editable=False, upload_to=users.tasks.avatar_rendition_upload),
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='avatar',
+            field=models.ImageField(blank=True, upload_to=users.models.file_upload),
+        ),
+    ]
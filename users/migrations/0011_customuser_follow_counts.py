@@ -0,0 +1,39 @@
+# Generated by Django 4.2 on 2026-10-19 06:01
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_follows(apps, schema_editor):
+    User = apps.get_model('users', 'CustomUser')
+    Follow = apps.get_model('articles', 'Follow')
+
+    def count(field):
+        rows = (Follow.objects.filter(**{field: OuterRef('pk')}).order_by().values(field)
+                .annotate(count=Count('id')).values('count'))
+        return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+    User.objects.update(followers_count=count('followee'), following_count=count('follower'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_customuser_avatar_rendition'),
+        ('articles', '0017_notification_indexes_notificationarchive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_follows, migrations.RunPython.noop),
+    ]
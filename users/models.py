@@ -3,11 +3,13 @@ from django.conf import settings
 from django.contrib.postgres.indexes import HashIndex
 from django.core import validators
 from django.core.exceptions import ValidationError
-from django_resized import ResizedImageField
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+from core.tasks import TaskQueue
 from users.errors import BIRTH_YEAR_ERROR_MSG
+from users.tasks import avatar_rendition_upload, resize_avatar
 
 
 def file_upload(instance, filename):
@@ -20,7 +22,9 @@ def file_upload(instance, filename):
 class CustomUser(AbstractUser):
     """  This model represents a custom user. """
     middle_name = models.CharField(max_length=30, blank=True, null=True)
-    avatar = ResizedImageField(size=[300, 300], crop=['top', 'left'], upload_to=file_upload, blank=True)
+    # original upload, resized into avatar_rendition by the task worker
+    avatar = models.ImageField(upload_to=file_upload, blank=True)
+    avatar_rendition = models.ImageField(upload_to=avatar_rendition_upload, blank=True, editable=False)
     birth_year = models.IntegerField(
         validators=[  # tug'ilgan yil oralig'ini tekshirish uchun birinchi variant
             validators.MinValueValidator(settings.BIRTH_YEAR_MIN),
@@ -29,6 +33,12 @@ class CustomUser(AbstractUser):
         null=True,
         blank=True
     )
+    token_generation = models.PositiveIntegerField(default=0)
+    # kept up to date with F() by FollowService, fixed by `manage.py reconcile_follow_counts`
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
+    following_count = models.PositiveIntegerField(default=0, editable=False)
+
+    COUNTER_FIELDS = ('followers_count', 'following_count')
 
     def clean(self):  # tug'ilgan yil oralig'ini tekshirish uchun ikkinchi variant
         super().clean()
@@ -37,7 +47,19 @@ class CustomUser(AbstractUser):
 
     def save(self, *args, **kwargs):
         self.clean()
+        avatar_changed = bool(self.avatar) and not self.avatar._committed
+        if avatar_changed or not self.avatar:
+            self.avatar_rendition = ''
+        if not self._state.adding and not args and kwargs.get('update_fields') is None:
+            # counters may be stale here (e.g. a cached snapshot), they are only written with F();
+            # deferred fields (the password of a snapshot) were never loaded, so never written
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in self.COUNTER_FIELDS
+                                       and field.attname not in deferred]
         super().save(*args, **kwargs)
+        if avatar_changed:
+            TaskQueue.enqueue(resize_avatar, self.pk, self.avatar.name)
 
     class Meta:
         db_table = "user"  # maʼlumotlar bazasi jadvali nomi
@@ -70,3 +92,35 @@ class CustomUser(AbstractUser):
     def full_name(self):
         """ Returns the user's full name. """
         return f"{self.last_name} {self.first_name} {self.middle_name}"
+
+
+class EmailStatus(models.TextChoices):
+    PENDING = "pending", "Pending"
+    SENT = "sent", "Sent"
+    FAILED = "failed", "Failed"
+
+
+class EmailOutbox(models.Model):
+    """ Email waiting for ``manage.py run_mail_worker`` to deliver it. """
+    to = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    content_subtype = models.CharField(max_length=20, default="html")
+    status = models.CharField(max_length=20, choices=EmailStatus.choices, default=EmailStatus.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = "email_outbox"
+        verbose_name = _("Email outbox")
+        verbose_name_plural = _("Email outbox")
+        ordering = ["next_attempt_at"]
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='email_outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.to} - {self.subject}"
@@ -12,13 +12,23 @@ from django.contrib.auth.password_validation import validate_password
 User = get_user_model()
 
 
+class AvatarField(serializers.ImageField):
+    """ Accepts the original upload, returns the resized rendition once the worker has made it. """
+
+    def to_representation(self, value):
+        rendition = getattr(value.instance, 'avatar_rendition', None) if value else None
+        return super().to_representation(rendition or value)
+
+
 class UserSerializer(serializers.ModelSerializer):
     first_name = serializers.CharField(required=True, min_length=1)
     last_name = serializers.CharField(required=True, min_length=1)
+    avatar = AvatarField(required=False)
 
     class Meta:
         model = User
-        fields = ['id', 'username', 'first_name', 'last_name', 'middle_name', 'email', 'avatar', 'password']
+        fields = ['id', 'username', 'first_name', 'last_name', 'middle_name', 'email', 'avatar',
+                  'followers_count', 'following_count', 'password']
         extra_kwargs = {
             'password': {'write_only': True}
         }
@@ -45,6 +55,8 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 class UserUpdateSerializer(serializers.ModelSerializer):
+    avatar = AvatarField(required=False)
+
     class Meta:
         model = User
         fields = ['id', 'first_name', 'last_name', 'middle_name', 'email', 'avatar', 'birth_year']
@@ -71,7 +83,7 @@ class LoginSerializer(serializers.Serializer):
         password = data.get('password')
 
         if username and password:
-            user = authenticate(username=username, password=password)
+            user = authenticate(self.context.get('request'), username=username, password=password)
             if user is None:
                 raise serializers.ValidationError(_('Kirish maʼlumotlari notoʻgʻri'))
         else:
@@ -1,67 +1,172 @@
 import datetime
 import random
 import string
+import time
 import uuid
 from secrets import token_urlsafe
+from typing import Optional
 
 import redis
-from decouple import config
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.contrib.auth.hashers import make_password, check_password
-from django.core.mail import EmailMessage
-from django.template.loader import render_to_string
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F, QuerySet
+from django.template.loader import get_template, render_to_string
+from django.utils import timezone, translation
+from django.utils.crypto import constant_time_compare, salted_hmac
 from django.utils.translation import gettext_lazy as _
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.tokens import RefreshToken, Token
 
-from users.enums import TokenType
+from core import connections
+from users.cache import UserSnapshotCache
+from users.enums import TokenType, TokenRevocationMode
 from loguru import logger
 from users.exceptions import OTPException
-
-REDIS_HOST = config("REDIS_HOST", None)
-REDIS_PORT = config("REDIS_PORT", None)
-REDIS_DB = config("REDIS_DB", None)
+from users.models import EmailOutbox, EmailStatus
 
 User = get_user_model()
 
 
 class TokenService:
+    """
+    Per-user allowlist of issued tokens.
+
+    Each ``user:{id}:{token_type}`` key is a sorted set whose members are token
+    ``jti`` fingerprints scored by the token's ``exp`` timestamp, so every
+    device session expires on its own. Every login is recorded; a token
+    missing from the allowlist is only accepted when it was issued before
+    ``TOKEN_ALLOWLIST_REQUIRED_SINCE``, while sessions from before the
+    allowlist still have no entry.
+
+    Access tokens carry the ``jti`` of their refresh token as ``sid``, so
+    logout revokes both halves of a session.
+    """
+    # keeps an allowlist active once its last legacy session logged out
+    ALLOWLIST_GUARD = "guard"
+    SESSION_CLAIM = "sid"
+
     @classmethod
     def get_redis_client(cls) -> redis.Redis:
-        return redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
+        return connections.get_redis_client()
+
+    @classmethod
+    def get_token_key(cls, user_id: int, token_type: TokenType) -> str:
+        return f"user:{user_id}:{token_type}"
 
     @classmethod
     def get_valid_tokens(cls, user_id: int, token_type: TokenType) -> set:
         redis_client = cls.get_redis_client()
-        token_key = f"user:{user_id}:{token_type}"
-        valid_tokens = redis_client.smembers(token_key)
-        return valid_tokens
+        token_key = cls.get_token_key(user_id, token_type)
+        valid_tokens = redis_client.zrangebyscore(token_key, time.time(), "+inf")
+        return set(valid_tokens)
+
+    @classmethod
+    def is_valid_token(cls, user_id: int, jti: str, token_type: TokenType, issued_at: float = 0) -> bool:
+        redis_client = cls.get_redis_client()
+        token_key = cls.get_token_key(user_id, token_type)
+
+        pipeline = redis_client.pipeline(transaction=False)
+        pipeline.exists(token_key)
+        pipeline.zscore(token_key, jti)
+        is_allowlist_active, expires_at = pipeline.execute()
+
+        if not is_allowlist_active:
+            return issued_at < settings.TOKEN_ALLOWLIST_REQUIRED_SINCE
+        return expires_at is not None and expires_at > time.time()
 
     @classmethod
     def add_token_to_redis(
             cls,
             user_id: int,
-            token: str,
+            jti: str,
             token_type: TokenType,
             expire_time: datetime.timedelta,
     ) -> None:
         redis_client = cls.get_redis_client()
+        token_key = cls.get_token_key(user_id, token_type)
+        now = time.time()
 
-        token_key = f"user:{user_id}:{token_type}"
+        pipeline = redis_client.pipeline()
+        pipeline.zremrangebyscore(token_key, "-inf", now)
+        pipeline.zadd(token_key, {jti: now + expire_time.total_seconds()})
+        # the newest session always outlives the others of the same type
+        pipeline.expire(token_key, expire_time)
+        pipeline.execute()
 
-        valid_tokens = cls.get_valid_tokens(user_id, token_type)
-        if valid_tokens:
-            cls.delete_tokens(user_id, token_type)
-        redis_client.sadd(token_key, token)
-        redis_client.expire(token_key, expire_time)
+    @classmethod
+    def revoke_token(
+            cls,
+            user_id: int,
+            jti: str,
+            token_type: TokenType,
+            expire_time: datetime.timedelta,
+    ) -> None:
+        """ Removes one session, the other sessions of the user stay valid. """
+        redis_client = cls.get_redis_client()
+        token_key = cls.get_token_key(user_id, token_type)
+        pipeline = redis_client.pipeline()
+        pipeline.zrem(token_key, jti)
+        pipeline.exists(token_key)
+        removed, is_allowlist_active = pipeline.execute()
+        if not removed and not is_allowlist_active:
+            # a session from before allowlists were recorded, like all others of this user:
+            # only activating the allowlist shuts it out
+            cls.add_token_to_redis(user_id, cls.ALLOWLIST_GUARD, token_type, expire_time)
 
     @classmethod
     def delete_tokens(cls, user_id: int, token_type: TokenType) -> None:
         redis_client = cls.get_redis_client()
-        token_key = f"user:{user_id}:{token_type}"
-        valid_tokens = redis_client.smembers(token_key)
-        if valid_tokens is not None:
-            redis_client.delete(token_key)
+        token_key = cls.get_token_key(user_id, token_type)
+        redis_client.delete(token_key)
+
+
+class TokenGenerationService:
+    """
+    Stateless revocation: every token carries the user's generation number and
+    stays valid only while it matches the current one. Redis holds the hot
+    value, ``CustomUser.token_generation`` is the durable fallback.
+    """
+    CLAIM = "token_generation"
+
+    @classmethod
+    def get_redis_client(cls) -> redis.Redis:
+        return connections.get_redis_client()
+
+    @classmethod
+    def get_generation_key(cls, user_id: int) -> str:
+        return f"user:{user_id}:token_generation"
+
+    @classmethod
+    def get_generation(cls, user_id: int) -> int:
+        generation_key = cls.get_generation_key(user_id)
+        try:
+            redis_client = cls.get_redis_client()
+            generation = redis_client.get(generation_key)
+            if generation is not None:
+                return int(generation)
+        except redis.RedisError as e:
+            logger.warning(f"Token generation lookup fell back to the database: {e}")
+            redis_client = None
+
+        generation = User.objects.filter(id=user_id).values_list("token_generation", flat=True).first() or 0
+        if redis_client is not None:
+            # nx: never overwrite a value written by a concurrent bump
+            redis_client.set(generation_key, generation, nx=True)
+        return generation
+
+    @classmethod
+    def bump_generation(cls, user_id: int) -> int:
+        User.objects.filter(id=user_id).update(token_generation=F("token_generation") + 1)
+        generation = User.objects.filter(id=user_id).values_list("token_generation", flat=True).first() or 0
+        redis_client = cls.get_redis_client()
+        redis_client.set(cls.get_generation_key(user_id), generation)
+        UserSnapshotCache.invalidate(user_id)
+        return generation
+
+    @classmethod
+    def is_valid_token(cls, user_id: int, token: Token) -> bool:
+        return token.get(cls.CLAIM, 0) == cls.get_generation(user_id)
 
 
 class UserService:
@@ -70,42 +175,76 @@ class UserService:
     def create_tokens(
             cls,
             user: User,
-            access: str = None,
-            refresh: str = None,
             is_force_add_to_redis: bool = False
     ) -> dict[str, str]:
-        if not access or not refresh:
+        """
+        Issues a new token pair. A forced add (password change or reset) drops
+        every other session of the user before registering the new one.
+        """
+        if settings.TOKEN_REVOCATION_MODE == TokenRevocationMode.GENERATION:
+            if is_force_add_to_redis:
+                TokenGenerationService.bump_generation(user.id)
             refresh = RefreshToken.for_user(user)
-            access = str(getattr(refresh, "access_token"))
-            refresh = str(refresh)
-        valid_access_tokens = TokenService.get_valid_tokens(
-            user_id=user.id, token_type=TokenType.ACCESS
-        )
-        if valid_access_tokens or is_force_add_to_redis:
-            TokenService.add_token_to_redis(
-                user.id,
-                access,
-                TokenType.ACCESS,
-                settings.SIMPLE_JWT.get("ACCESS_TOKEN_LIFETIME"),
-            )
+            refresh[TokenGenerationService.CLAIM] = TokenGenerationService.get_generation(user.id)
+            return {"access": str(getattr(refresh, "access_token")), "refresh": str(refresh)}
+
+        jti_claim = settings.SIMPLE_JWT.get("JTI_CLAIM")
+        refresh = RefreshToken.for_user(user)
+        # copied into the access token, which is all logout gets to see
+        refresh[TokenService.SESSION_CLAIM] = refresh[jti_claim]
+        access = getattr(refresh, "access_token")
 
-        valid_refresh_tokens = TokenService.get_valid_tokens(
-            user_id=user.id, token_type=TokenType.REFRESH
+        for token, token_type, lifetime in (
+                (access, TokenType.ACCESS, settings.SIMPLE_JWT.get("ACCESS_TOKEN_LIFETIME")),
+                (refresh, TokenType.REFRESH, settings.SIMPLE_JWT.get("REFRESH_TOKEN_LIFETIME")),
+        ):
+            if is_force_add_to_redis:
+                TokenService.delete_tokens(user.id, token_type)
+            TokenService.add_token_to_redis(user.id, token[jti_claim], token_type, lifetime)
+
+        return {"access": str(access), "refresh": str(refresh)}
+
+    @classmethod
+    def revoke_tokens(cls, user: User, access_token: Token) -> None:
+        """ Logs out the session of ``access_token`` (every session in generation mode). """
+        if settings.TOKEN_REVOCATION_MODE == TokenRevocationMode.GENERATION:
+            TokenGenerationService.bump_generation(user.id)
+            return
+
+        TokenService.revoke_token(
+            user.id,
+            access_token[settings.SIMPLE_JWT.get("JTI_CLAIM")],
+            TokenType.ACCESS,
+            settings.SIMPLE_JWT.get("ACCESS_TOKEN_LIFETIME"),
         )
-        if valid_refresh_tokens or is_force_add_to_redis:
-            TokenService.add_token_to_redis(
-                user.id,
-                refresh,
-                TokenType.REFRESH,
-                settings.SIMPLE_JWT.get("REFRESH_TOKEN_LIFETIME"),
+        refresh_jti = access_token.get(TokenService.SESSION_CLAIM)
+        if refresh_jti:
+            TokenService.revoke_token(
+                user.id, refresh_jti, TokenType.REFRESH, settings.SIMPLE_JWT.get("REFRESH_TOKEN_LIFETIME")
             )
-        return {"access": access, "refresh": refresh}
 
 
 class OTPService:
+    """
+    OTP codes and password reset tokens live for minutes, so they are stored
+    as keyed HMAC-SHA256 digests instead of slow password hashes. Each OTP is
+    a Redis hash holding the digest and the number of verification attempts.
+    """
+    OTP_SALT = "users.services.OTPService.otp"
+    RESET_TOKEN_SALT = "users.services.OTPService.reset_token"
+
     @classmethod
     def get_redis_conn(cls) -> redis.Redis:
-        return redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
+        return connections.get_redis_client()
+
+    @classmethod
+    def get_otp_digest(cls, secret_token: str, otp_code: str) -> str:
+        return salted_hmac(cls.OTP_SALT, f"{secret_token}:{otp_code}", algorithm="sha256").hexdigest()
+
+    @classmethod
+    def get_reset_token_key(cls, token: str) -> str:
+        digest = salted_hmac(cls.RESET_TOKEN_SALT, token, algorithm="sha256").hexdigest()
+        return f"reset_token:{digest}"
 
     @classmethod
     def generate_otp(
@@ -117,8 +256,8 @@ class OTPService:
         redis_conn = cls.get_redis_conn()
         otp_code = "".join(random.choices(string.digits, k=6))
         secret_token = token_urlsafe()
-        otp_hash = make_password(f"{secret_token}:{otp_code}")
-        logger.debug(f"generate_otp called: otp_code={otp_code}; secret_token={secret_token}, otp_hash={otp_hash}")
+        otp_digest = cls.get_otp_digest(secret_token, otp_code)
+        logger.debug(f"generate_otp called: otp_code={otp_code}; secret_token={secret_token}, otp_digest={otp_digest}")
         key = f"{email}:otp"
 
         if check_if_exists and redis_conn.exists(key):
@@ -126,16 +265,35 @@ class OTPService:
             raise OTPException(
                 _("Sizda yaroqli OTP kodingiz bor. {ttl} soniyadan keyin qayta urinib koʻring.").format(ttl=ttl)
             )
-        redis_conn.set(key, otp_hash, ex=expire_in)
+        pipeline = redis_conn.pipeline()
+        pipeline.delete(key)
+        pipeline.hset(key, mapping={"digest": otp_digest, "attempts": 0})
+        pipeline.expire(key, expire_in)
+        pipeline.execute()
         return otp_code, secret_token
 
     @classmethod
     def check_otp(cls, email: str, otp_code: str, otp_secret: str) -> None:
         redis_conn = cls.get_redis_conn()
-        stored_hash = redis_conn.get(f"{email}:otp")
-        logger.debug(f"check_otp called: email={email}; otp_code={otp_code}; otp_secret={otp_secret}")
+        key = f"{email}:otp"
+        logger.debug(f"check_otp called: email={email}; otp_code={otp_code}")
+
+        pipeline = redis_conn.pipeline()
+        pipeline.hincrby(key, "attempts", 1)
+        pipeline.hget(key, "digest")
+        pipeline.ttl(key)
+        attempts, stored_digest, ttl = pipeline.execute()
+
+        if stored_digest is None or ttl < 0:
+            # hincrby recreated an already expired OTP, don't leave it behind
+            redis_conn.delete(key)
+            raise OTPException(_("Yaroqsiz OTP kodi."))
+
+        if attempts > settings.OTP_MAX_ATTEMPTS:
+            redis_conn.delete(key)
+            raise OTPException(_("Urinishlar soni tugadi. Yangi OTP kodini so'rang."))
 
-        if not stored_hash or not check_password(f"{otp_secret}:{otp_code}", stored_hash.decode()):
+        if not constant_time_compare(stored_digest.decode(), cls.get_otp_digest(otp_secret, otp_code)):
             raise OTPException(_("Yaroqsiz OTP kodi."))
 
     @classmethod
@@ -144,19 +302,163 @@ class OTPService:
 
 
 class SendEmailService:
+    """
+    Emails are written to the ``EmailOutbox`` table and delivered by
+    ``manage.py run_mail_worker``, so requests never wait for SMTP.
+    """
+
     @staticmethod
-    def send_email(email, otp_code):
+    def send_email(email, otp_code) -> EmailOutbox:
         subject = 'Welcome to Our Service!'
         message = render_to_string('emails/email_template.html', {
             'email': email,
             'otp_code': otp_code
         })
+        return EmailOutbox.objects.create(to=email, subject=subject, body=message)
 
-        email = EmailMessage(
-            subject,
-            message,
-            settings.EMAIL_HOST_USER,
-            [email]
+    @staticmethod
+    def claim_batch(batch_size: int) -> list[EmailOutbox]:
+        """
+        Leases due messages to the caller. A worker that dies mid-batch leaves
+        the rows due again once ``EMAIL_OUTBOX_LEASE`` passes.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            outbox = list(
+                EmailOutbox.objects.select_for_update(skip_locked=True).filter(
+                    status=EmailStatus.PENDING, next_attempt_at__lte=now
+                )[:batch_size]
+            )
+            EmailOutbox.objects.filter(id__in=[message.id for message in outbox]).update(
+                attempts=F("attempts") + 1,
+                next_attempt_at=now + datetime.timedelta(seconds=settings.EMAIL_OUTBOX_LEASE),
+            )
+        for message in outbox:
+            message.attempts += 1
+        return outbox
+
+    @staticmethod
+    def deliver(outbox: list[EmailOutbox], connection) -> list[tuple[EmailOutbox, Optional[str]]]:
+        """
+        Sends the messages over one connection without touching the database,
+        so it can run in worker threads. Returns each message with its error.
+        """
+        results = []
+        for message in outbox:
+            email = EmailMessage(
+                message.subject, message.body, settings.EMAIL_HOST_USER, [message.to], connection=connection
+            )
+            email.content_subtype = message.content_subtype
+            try:
+                # no-op while the connection is still open
+                connection.open()
+                email.send(fail_silently=False)
+            except Exception as e:
+                logger.warning(f"Email {message.id} to {message.to} failed on attempt {message.attempts}: {e}")
+                results.append((message, str(e)))
+                # the connection may be broken, the next message reopens it
+                connection.close()
+                continue
+            results.append((message, None))
+        return results
+
+    @staticmethod
+    def record_results(results: list[tuple[EmailOutbox, Optional[str]]]) -> int:
+        sent_ids = [message.id for message, error in results if error is None]
+        # bodies carry OTP codes, nothing needs them once a message is settled
+        EmailOutbox.objects.filter(id__in=sent_ids).update(status=EmailStatus.SENT, sent_at=timezone.now(), body="")
+        for message, error in results:
+            if error is not None:
+                SendEmailService.schedule_retry(message, error)
+        return len(sent_ids)
+
+    @staticmethod
+    def schedule_retry(message: EmailOutbox, error: str) -> None:
+        if message.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            EmailOutbox.objects.filter(id=message.id).update(status=EmailStatus.FAILED, last_error=error, body="")
+            return
+        backoff = min(
+            settings.EMAIL_OUTBOX_RETRY_BASE * 2 ** (message.attempts - 1),
+            settings.EMAIL_OUTBOX_RETRY_MAX,
         )
-        email.content_subtype = 'html'
-        email.send(fail_silently=False)
+        EmailOutbox.objects.filter(id=message.id).update(
+            next_attempt_at=timezone.now() + datetime.timedelta(seconds=backoff), last_error=error
+        )
+
+
+class BulkEmailService:
+    """
+    Sends one templated email per recipient of a queryset. The template is
+    looked up once per ``send_bulk`` call; compiling it is left to Django's
+    cached template loader, which keeps it across calls and languages since
+    translations are only applied at render time. Recipients are streamed
+    with ``iterator()`` and every batch goes through the same SMTP connection.
+    """
+
+    @classmethod
+    def send_bulk(
+            cls,
+            subject: str,
+            template_name: str,
+            recipients: QuerySet,
+            get_context=None,
+            batch_size: int = 100,
+            language: str = None,
+            connection=None,
+    ) -> dict[str, float]:
+        """
+        ``get_context(recipient)`` can add template variables, ``email`` and
+        ``user`` are always present. Returns the sent/failed counts and the
+        throughput in messages per second.
+        """
+        language = language or translation.get_language() or settings.LANGUAGE_CODE
+        connection = connection or get_connection(fail_silently=False)
+        started = time.perf_counter()
+        sent = failed = 0
+
+        with translation.override(language), connection:
+            template = get_template(template_name)
+            batch = []
+            for recipient in recipients.iterator(chunk_size=batch_size):
+                if not recipient.email:
+                    continue
+                context = {'email': recipient.email, 'user': recipient}
+                if get_context is not None:
+                    context.update(get_context(recipient))
+                message = EmailMessage(
+                    subject, template.render(context), settings.EMAIL_HOST_USER, [recipient.email],
+                    connection=connection,
+                )
+                message.content_subtype = 'html'
+                batch.append(message)
+                if len(batch) >= batch_size:
+                    batch_sent = cls.send_batch(connection, batch)
+                    sent, failed, batch = sent + batch_sent, failed + len(batch) - batch_sent, []
+            if batch:
+                batch_sent = cls.send_batch(connection, batch)
+                sent, failed = sent + batch_sent, failed + len(batch) - batch_sent
+
+        seconds = time.perf_counter() - started
+        report = {
+            'sent': sent,
+            'failed': failed,
+            'seconds': seconds,
+            'per_second': sent / seconds if seconds else 0.0,
+        }
+        logger.info(f"Bulk email '{subject}': {sent} sent, {failed} failed, {report['per_second']:.1f} msg/s")
+        return report
+
+    @staticmethod
+    def send_batch(connection, batch: list[EmailMessage]) -> int:
+        try:
+            # no-op while the connection is still open
+            connection.open()
+            return connection.send_messages(batch) or 0
+        except Exception as e:
+            logger.warning(f"Bulk email batch of {len(batch)} failed: {e}")
+        # the connection may be broken, the next batch reopens it
+        try:
+            connection.close()
+        except Exception as e:
+            logger.warning(f"Bulk email connection did not close cleanly: {e}")
+        return 0
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.cache import UserSnapshotCache
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_snapshot(sender, instance, **kwargs):
+    """ Drops the cached user, also for queryset deletes such as the admin's "delete selected". """
+    user_id = instance.pk
+    UserSnapshotCache.invalidate(user_id)
+    # a request between this write and the commit caches the old row again
+    transaction.on_commit(lambda: UserSnapshotCache.invalidate(user_id))
@@ -0,0 +1,58 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+from loguru import logger
+
+from core.tasks import TaskQueue
+from users.cache import UserSnapshotCache
+
+
+def avatar_rendition_upload(instance, filename):
+    """ Resized copies of avatars live next to the originals. """
+    ext = filename.split('.')[-1]
+    return os.path.join('users/avatars/renditions/', f'{instance.username}.{ext}')
+
+
+def render_avatar(source, size: tuple[int, int], quality: int) -> tuple[bytes, str]:
+    """ Crops ``source`` to ``size`` from the top left corner, returns the encoded image and its format. """
+    image = Image.open(source)
+    image_format = image.format or 'JPEG'
+    # JPEG decoder scales by 1/2, 1/4 or 1/8 while decoding, so a phone photo is never fully loaded
+    image.draft('RGB', (size[0] * 2, size[1] * 2))
+    image = ImageOps.exif_transpose(image)
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    thumb = ImageOps.fit(image, size, Image.Resampling.LANCZOS, centering=(0, 0))
+    content = BytesIO()
+    thumb.save(content, format=image_format, quality=quality)
+    return content.getvalue(), image_format
+
+
+@TaskQueue.register
+def resize_avatar(user_id: int, avatar_name: str) -> None:
+    User = get_user_model()  # noqa
+    user = User.objects.filter(id=user_id, avatar=avatar_name).first()
+    if user is None:
+        # the avatar was replaced or removed after the job was queued
+        return
+
+    with user.avatar.open('rb') as source:
+        data, image_format = render_avatar(source, settings.AVATAR_RENDITION_SIZE, settings.AVATAR_RENDITION_QUALITY)
+
+    storage = user.avatar_rendition.storage
+    name = user.avatar_rendition.field.generate_filename(user, f'{user.username}.{image_format.lower()}')
+    # the previous rendition of this user, if any
+    storage.delete(name)
+    name = storage.save(name, ContentFile(data))
+
+    # update() so a concurrent avatar change isn't overwritten and save() doesn't queue another job
+    if User.objects.filter(id=user_id, avatar=avatar_name).update(avatar_rendition=name):
+        UserSnapshotCache.invalidate(user_id)
+        logger.info(f"Avatar rendition for user {user_id} stored at {name}")
+    else:
+        storage.delete(name)
@@ -0,0 +1,125 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+import redis
+from django.conf import settings
+from loguru import logger
+from rest_framework.throttling import BaseThrottle
+
+from core import connections
+
+
+class SlidingWindowRateThrottle(BaseThrottle):
+    """
+    Sliding window limiter backed by Redis sorted sets.
+
+    Limits come from ``settings.RATE_LIMITS[view.throttle_scope]`` and are
+    keyed per client IP (``ip``, trusting ``X-Forwarded-For`` only as far as
+    ``REST_FRAMEWORK['NUM_PROXIES']``) and per request field such as
+    ``username`` or ``email``. Identities that Redis already rejected are remembered in
+    process, so a burst from the same source is refused without a round trip.
+    DRF runs throttles before the view, so rejected requests never reach the
+    password hasher or the database.
+    """
+    durations = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+    local_blocklist_size = 10000
+
+    _blocked = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.wait_time = None
+
+    @classmethod
+    def get_redis_client(cls) -> redis.Redis:
+        return connections.get_redis_client()
+
+    @classmethod
+    def parse_rate(cls, rate: str) -> tuple[int, int]:
+        """ '5/min' -> (5, 60) """
+        num, period = rate.split('/')
+        return int(num), cls.durations[period[0]]
+
+    def allow_request(self, request, view) -> bool:
+        scope = getattr(view, 'throttle_scope', None)
+        limits = settings.RATE_LIMITS.get(scope)
+        if not settings.RATE_LIMIT_ENABLED or not limits:
+            return True
+
+        now = time.time()
+        for kind, rate in limits.items():
+            ident = self.get_ident(request) if kind == 'ip' else self.get_field_ident(request, kind)
+            if not ident:
+                continue
+            key = f"throttle:{scope}:{kind}:{ident}"
+
+            blocked_until = self._get_blocked_until(key, now)
+            if blocked_until is None:
+                blocked_until = self._hit(key, rate, now)
+            if blocked_until is not None:
+                self.wait_time = blocked_until - now
+                return False
+        return True
+
+    def wait(self) -> Optional[float]:
+        return self.wait_time
+
+    @staticmethod
+    def get_field_ident(request, field: str) -> Optional[str]:
+        try:
+            value = request.data.get(field)
+        except AttributeError:
+            return None
+        if not value:
+            return None
+        return hashlib.sha256(str(value).strip().lower().encode()).hexdigest()[:32]
+
+    def _hit(self, key: str, rate: str, now: float) -> Optional[float]:
+        """ Records the request and returns the time the key is blocked until, if over the limit. """
+        num_requests, duration = self.parse_rate(rate)
+        member = f"{now}:{uuid.uuid4().hex[:8]}"
+        try:
+            redis_client = self.get_redis_client()
+            pipeline = redis_client.pipeline()
+            pipeline.zremrangebyscore(key, "-inf", now - duration)
+            pipeline.zadd(key, {member: now})
+            pipeline.zcard(key)
+            pipeline.zrange(key, 0, 0, withscores=True)
+            pipeline.expire(key, duration)
+            _, _, count, oldest, _ = pipeline.execute()
+
+            if count <= num_requests:
+                return None
+            # rejected requests don't use up the window
+            redis_client.zrem(key, member)
+        except redis.RedisError as e:
+            # limiter outage must not take the login down with it
+            logger.warning(f"Rate limiter is unavailable, letting the request through: {e}")
+            return None
+
+        blocked_until = oldest[0][1] + duration
+        with self._lock:
+            self._blocked[key] = blocked_until
+            self._blocked.move_to_end(key)
+            while len(self._blocked) > self.local_blocklist_size:
+                self._blocked.popitem(last=False)
+        return blocked_until
+
+    def _get_blocked_until(self, key: str, now: float) -> Optional[float]:
+        with self._lock:
+            blocked_until = self._blocked.get(key)
+            if blocked_until is None:
+                return None
+            if blocked_until <= now:
+                del self._blocked[key]
+                return None
+            return blocked_until
+
+    @classmethod
+    def clear_local(cls) -> None:
+        with cls._lock:
+            cls._blocked.clear()
@@ -3,7 +3,7 @@ from . import views
 from rest_framework.routers import DefaultRouter
 from articles.views import ( UserNotificationView, UserPinnedArticles, AuthorFollowView,
     PopularAuthorsView, UserFavoritesListView, ReadingHistoryView, FollowersListView,
-    FollowingListView, RecommendationView)
+    FollowingListView, MutualFollowsView, RecommendationView)
 
 router = DefaultRouter()
 router.register(r'notifications', UserNotificationView, basename='notification')
@@ -31,5 +31,6 @@ urlpatterns = [
          FollowersListView.as_view(), name='followers'),
     path('following/',
          FollowingListView.as_view(), name='following'),
+    path('mutuals/', MutualFollowsView.as_view(), name='mutuals'),
     path('recommend/', RecommendationView.as_view(), name='recommend'),
 ]
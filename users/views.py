@@ -2,17 +2,16 @@ from secrets import token_urlsafe
 
 from django.contrib.auth import authenticate, update_session_auth_hash
 from django.contrib.auth import get_user_model
-from django.contrib.auth.hashers import make_password
 from django.utils.translation import gettext_lazy as _
 from django_redis import get_redis_connection
 from drf_spectacular.utils import extend_schema, extend_schema_view
-from rest_framework import status, permissions, generics, parsers, exceptions
-from rest_framework.exceptions import ValidationError, AuthenticationFailed
+from rest_framework import status, permissions, generics, exceptions
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 
+from core.uploads import StreamingMultiPartParser
 from .errors import ACTIVE_USER_NOT_FOUND_ERROR_MSG
 from .serializers import (
     UserSerializer,
@@ -31,6 +30,7 @@ from .services import (
     UserService,
     OTPService, SendEmailService,
 )
+from .throttling import SlidingWindowRateThrottle
 
 User = get_user_model()
 
@@ -48,17 +48,19 @@ User = get_user_model()
 class SignupView(APIView):
     serializer_class = UserSerializer
     permission_classes = (permissions.AllowAny,)
+    throttle_classes = [SlidingWindowRateThrottle]
+    throttle_scope = 'signup'
 
     def post(self, request):
         serializer = UserSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
-            refresh = RefreshToken.for_user(user)
+            tokens = UserService.create_tokens(user)
             user_data = UserSerializer(user).data
             return Response({
                 'user': user_data,
-                'refresh': str(refresh),
-                'access': str(refresh.access_token),
+                'refresh': tokens['refresh'],
+                'access': tokens['access'],
             }, status=status.HTTP_201_CREATED)
         raise ValidationError(serializer.errors)
 
@@ -76,22 +78,16 @@ class SignupView(APIView):
 class LoginView(APIView):
     serializer_class = LoginSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [SlidingWindowRateThrottle]
+    throttle_scope = 'login'
 
     def post(self, request):
-        serializer = self.serializer_class(data=request.data)
+        serializer = self.serializer_class(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
 
-        user = authenticate(
-            request,
-            username=serializer.validated_data['username'],
-            password=serializer.validated_data['password']
-        )
-
-        if user is not None:
-            tokens = UserService.create_tokens(user)
-            return Response(tokens)
-        else:
-            raise AuthenticationFailed(_('Hisob maʼlumotlari yaroqsiz'))
+        # the serializer already checked the password, don't hash it a second time
+        tokens = UserService.create_tokens(serializer.validated_data['user'])
+        return Response(tokens)
 
 
 @extend_schema_view(
@@ -114,7 +110,7 @@ class LoginView(APIView):
 class UsersMe(generics.RetrieveAPIView, generics.UpdateAPIView):
     http_method_names = ['get', 'patch']
     queryset = User.objects.filter(is_active=True)
-    parser_classes = [parsers.MultiPartParser]
+    parser_classes = [StreamingMultiPartParser]
     permission_classes = (IsAuthenticated,)
 
     def get_object(self):
@@ -149,7 +145,7 @@ class LogoutView(generics.GenericAPIView):
 
     @extend_schema(responses=None)
     def post(self, request, *args, **kwargs):
-        UserService.create_tokens(request.user, access='fake_token', refresh='fake_token', is_force_add_to_redis=True)
+        UserService.revoke_tokens(request.user, request.auth)
         return Response({"detail": _("Mufaqqiyatli chiqildi.")})
 
 
@@ -203,6 +199,8 @@ class ForgotPasswordView(generics.CreateAPIView):
     permission_classes = [permissions.AllowAny]
     serializer_class = ForgotPasswordRequestSerializer
     authentication_classes = []
+    throttle_classes = [SlidingWindowRateThrottle]
+    throttle_scope = 'password_forgot'
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -214,16 +212,11 @@ class ForgotPasswordView(generics.CreateAPIView):
 
         otp_code, otp_secret = OTPService.generate_otp(email=email, expire_in=2 * 60)
 
-        try:
-            SendEmailService.send_email(email, otp_code)
-            return Response({
-                "email": email,
-                "otp_secret": otp_secret,
-            })
-        except Exception:
-            redis_conn = OTPService.get_redis_conn()
-            redis_conn.delete(f"{email}:otp")
-            raise ValidationError(_("Emailga xabar yuborishda xatolik yuz berdi"))
+        SendEmailService.send_email(email, otp_code)
+        return Response({
+            "email": email,
+            "otp_secret": otp_secret,
+        })
 
 
 @extend_schema_view(
@@ -242,6 +235,8 @@ class ForgotPasswordVerifyView(generics.CreateAPIView):
     permission_classes = [permissions.AllowAny]
     serializer_class = ForgotPasswordVerifyRequestSerializer
     authentication_classes = []
+    throttle_classes = [SlidingWindowRateThrottle]
+    throttle_scope = 'password_forgot_verify'
 
     def post(self, request, *args, **kwargs):
         redis_conn = OTPService.get_redis_conn()
@@ -255,9 +250,9 @@ class ForgotPasswordVerifyView(generics.CreateAPIView):
             raise exceptions.NotFound(ACTIVE_USER_NOT_FOUND_ERROR_MSG)
         OTPService.check_otp(email, otp_code, otp_secret)
         redis_conn.delete(f"{email}:otp")
-        token_hash = make_password(token_urlsafe())
-        redis_conn.set(token_hash, email, ex=2 * 60 * 60)
-        return Response({"token": token_hash})
+        token = token_urlsafe()
+        redis_conn.set(OTPService.get_reset_token_key(token), email, ex=2 * 60 * 60)
+        return Response({"token": token})
 
 
 @extend_schema_view(
@@ -283,8 +278,8 @@ class ResetPasswordView(generics.UpdateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        token_hash = serializer.validated_data['token']
-        email = redis_conn.get(token_hash)
+        token_key = OTPService.get_reset_token_key(serializer.validated_data['token'])
+        email = redis_conn.get(token_key)
 
         if not email:
             raise ValidationError(_("Token yaroqsiz"))
@@ -300,5 +295,5 @@ class ResetPasswordView(generics.UpdateAPIView):
 
         update_session_auth_hash(request, user)
         tokens = UserService.create_tokens(user, is_force_add_to_redis=True)
-        redis_conn.delete(token_hash)
+        redis_conn.delete(token_key)
         return Response(tokens)